@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Publish the approved course catalog as versioned binary bundles for offline clients.
+
+Native clients fetch course, tee and hole data from the API whenever someone
+picks a course. With a local copy of the catalog, course search and
+selection work without a connection; this builds that copy from the same
+scripts/sql/ files the generators write, and versions it so clients only
+download what changed:
+
+    manifest.json       latest version, and per version its size, checksum
+                        and the number of changed and removed courses
+    catalog-vN.bin      the whole approved catalog at version N
+    delta-vN.bin        the courses added or changed since version N - 1,
+                        and the keys of courses removed
+    state.json          content hash per course at the latest version
+                        (publisher side, not downloaded)
+
+A course is identified by (name, city, country), as in course_diff.py, and
+its content hash covers every approved tee and hole. Publishing an
+unchanged catalog writes nothing, so versions only advance with real
+changes. Only the latest full bundle is kept; a client at version M < N
+applies delta-v(M+1) .. delta-vN in order, or downloads catalog-vN when
+those deltas add up to more than the full bundle (see sync_plan()).
+
+Both files share one container:
+
+    b"GCB1"             magic
+    uint32 LE           header length
+    header              UTF-8 JSON: kind ("full" or "delta"), version, base
+                        version, removed course keys and the column list
+                        [[name, dtype, length], ...]
+    body                zlib-compressed little-endian column data, in
+                        header order
+
+The columns are course_store.py's: parallel arrays for courses, tees and
+holes linked by offset arrays, with strings interned into one UTF-8 blob.
+
+Usage:
+    python scripts/course_bundle.py publish [--sql-dir scripts/sql] [--out .course-bundles]
+    python scripts/course_bundle.py info [--out .course-bundles]
+    python scripts/course_bundle.py verify [--out .course-bundles]
+"""
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from course_catalog import DEFAULT_SQL_DIR, CatalogCourse, CatalogHole, CatalogTee, load_catalog
+from course_store import (
+    APPROVAL_STATUSES,
+    COLUMNS,
+    DISTANCE_MEASUREMENTS,
+    GENDERS,
+    NO_STRING,
+    build_columns,
+)
+
+
+DEFAULT_BUNDLE_DIR = ".course-bundles"
+BUNDLE_FORMAT_VERSION = 1
+MAGIC = b"GCB1"
+MANIFEST_FILE = "manifest.json"
+STATE_FILE = "state.json"
+
+CourseKey = Tuple[str, str, str]
+
+
+def course_key(course: CatalogCourse) -> CourseKey:
+    return (course.name, course.city, course.country)
+
+
+def approved_catalog(courses: List[CatalogCourse]) -> List[CatalogCourse]:
+    """Approved courses with only their approved tees, sorted by key."""
+    approved = [
+        dataclasses.replace(course, source=None,
+                            tees=[tee for tee in course.tees if tee.approval_status == "approved"])
+        for course in courses if course.approval_status == "approved"
+    ]
+    return sorted(approved, key=course_key)
+
+
+def content_hash(course: CatalogCourse) -> str:
+    payload = json.dumps(dataclasses.asdict(course), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def encode_bundle(kind: str, version: int, base: Optional[int], courses: List[CatalogCourse],
+                  removed: List[CourseKey]) -> bytes:
+    arrays = build_columns(courses)
+    columns = []
+    body = []
+    for name in COLUMNS:
+        array = arrays[name].astype(arrays[name].dtype.newbyteorder("<"), copy=False)
+        columns.append([name, array.dtype.str, int(len(array))])
+        body.append(array.tobytes())
+    header = json.dumps({
+        "format": BUNDLE_FORMAT_VERSION,
+        "kind": kind,
+        "version": version,
+        "base": base,
+        "courses": len(courses),
+        "removed": [list(key) for key in removed],
+        "columns": columns,
+    }, ensure_ascii=False).encode("utf-8")
+    return MAGIC + struct.pack("<I", len(header)) + header + zlib.compress(b"".join(body), 9)
+
+
+def decode_bundle(data: bytes) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Return the header and the column arrays of a bundle."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a course bundle")
+    (header_length,) = struct.unpack_from("<I", data, 4)
+    header = json.loads(data[8:8 + header_length].decode("utf-8"))
+    if header.get("format") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {header.get('format')}, expected {BUNDLE_FORMAT_VERSION}")
+
+    body = zlib.decompress(data[8 + header_length:])
+    arrays = {}
+    offset = 0
+    for name, dtype, length in header["columns"]:
+        array = np.frombuffer(body, dtype=np.dtype(dtype), count=length, offset=offset)
+        arrays[name] = array
+        offset += array.nbytes
+    return header, arrays
+
+
+def courses_from_columns(arrays: Dict[str, np.ndarray]) -> List[CatalogCourse]:
+    """Rebuild catalog records from bundle columns (ratings come back as float32, rounded to 0.01)."""
+    blob = arrays["strings_blob"].tobytes()
+    offsets = arrays["strings_offsets"].tolist()
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+    cols = {name: array.tolist() for name, array in arrays.items() if not name.startswith("strings_")}
+
+    def string(string_id: int) -> Optional[str]:
+        return None if string_id == NO_STRING else strings[string_id]
+
+    courses = []
+    for c in range(len(cols["course_name"])):
+        course = CatalogCourse(
+            name=string(cols["course_name"][c]),
+            city=string(cols["course_city"][c]),
+            country=string(cols["course_country"][c]),
+            website=string(cols["course_website"][c]),
+            approval_status=APPROVAL_STATUSES[cols["course_approval_status"][c]],
+        )
+        for t in range(cols["course_tee_offsets"][c], cols["course_tee_offsets"][c + 1]):
+            tee = CatalogTee(
+                name=string(cols["tee_name"][t]),
+                gender=GENDERS[cols["tee_gender"][t]],
+                course_rating_18=round(cols["tee_course_rating_18"][t], 2),
+                slope_rating_18=cols["tee_slope_rating_18"][t],
+                course_rating_front_9=round(cols["tee_course_rating_front_9"][t], 2),
+                slope_rating_front_9=cols["tee_slope_rating_front_9"][t],
+                course_rating_back_9=round(cols["tee_course_rating_back_9"][t], 2),
+                slope_rating_back_9=cols["tee_slope_rating_back_9"][t],
+                out_par=cols["tee_out_par"][t],
+                in_par=cols["tee_in_par"][t],
+                total_par=cols["tee_total_par"][t],
+                out_distance=cols["tee_out_distance"][t],
+                in_distance=cols["tee_in_distance"][t],
+                total_distance=cols["tee_total_distance"][t],
+                distance_measurement=DISTANCE_MEASUREMENTS[cols["tee_distance_measurement"][t]],
+                approval_status=APPROVAL_STATUSES[cols["tee_approval_status"][t]],
+            )
+            tee.holes = [
+                CatalogHole(hole_number=cols["hole_number"][h], par=cols["hole_par"][h],
+                            distance=cols["hole_distance"][h], hcp=cols["hole_hcp"][h])
+                for h in range(cols["tee_hole_offsets"][t], cols["tee_hole_offsets"][t + 1])
+            ]
+            course.tees.append(tee)
+        courses.append(course)
+    return courses
+
+
+def apply_delta(catalog: Dict[CourseKey, CatalogCourse], data: bytes) -> int:
+    """Apply one delta bundle to a key -> course mapping in place and return its version."""
+    header, arrays = decode_bundle(data)
+    if header["kind"] != "delta":
+        raise ValueError(f"Expected a delta bundle, got {header['kind']}")
+    for key in header["removed"]:
+        catalog.pop(tuple(key), None)
+    for course in courses_from_columns(arrays):
+        catalog[course_key(course)] = course
+    return header["version"]
+
+
+def sync_plan(manifest: dict, client_version: int) -> List[str]:
+    """
+    Files a client at client_version downloads to reach the latest version:
+    the deltas in order, or the full bundle when that is smaller (or the
+    deltas are incomplete). Empty when the client is current.
+    """
+    latest = manifest["latest"]
+    if client_version >= latest:
+        return []
+    versions = {entry["version"]: entry for entry in manifest["versions"]}
+    full = versions[latest]
+    needed = [versions.get(v) for v in range(client_version + 1, latest + 1)]
+    if client_version > 0 and all(entry and entry.get("delta") for entry in needed):
+        if sum(entry["delta_bytes"] for entry in needed) < full["full_bytes"]:
+            return [entry["delta"] for entry in needed]
+    return [full["full"]]
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str, default: dict) -> dict:
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish(courses: List[CatalogCourse], out_dir: str = DEFAULT_BUNDLE_DIR) -> Optional[dict]:
+    """
+    Publish a new version if the approved catalog changed since the last one.
+
+    Returns the new version's manifest entry, or None when nothing changed.
+    Bundles are written before the manifest and state, each renamed into
+    place, so clients never see a manifest naming a file that is missing.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_json(os.path.join(out_dir, MANIFEST_FILE),
+                          {"format": BUNDLE_FORMAT_VERSION, "latest": 0, "versions": []})
+    previous = _read_json(os.path.join(out_dir, STATE_FILE), {"hashes": {}})["hashes"]
+
+    catalog = approved_catalog(courses)
+    # state.json keys are the JSON-encoded (name, city, country)
+    keys = [json.dumps(course_key(course), ensure_ascii=False) for course in catalog]
+    hashes = {key: content_hash(course) for key, course in zip(keys, catalog)}
+    changed = [course for key, course in zip(keys, catalog) if previous.get(key) != hashes[key]]
+    removed = sorted(tuple(json.loads(key)) for key in previous.keys() - hashes.keys())
+    if manifest["latest"] and not changed and not removed:
+        return None
+
+    base = manifest["latest"]
+    version = base + 1
+    full = encode_bundle("full", version, None, catalog, [])
+    entry = {
+        "version": version,
+        "built_at": int(time.time()),
+        "courses": len(catalog),
+        "changed": len(changed),
+        "removed": len(removed),
+        "full": f"catalog-v{version}.bin",
+        "full_bytes": len(full),
+        "full_sha256": hashlib.sha256(full).hexdigest(),
+    }
+    _write_atomic(os.path.join(out_dir, entry["full"]), full)
+    if base:
+        delta = encode_bundle("delta", version, base, changed, removed)
+        entry.update(delta=f"delta-v{version}.bin", delta_bytes=len(delta),
+                     delta_sha256=hashlib.sha256(delta).hexdigest())
+        _write_atomic(os.path.join(out_dir, entry["delta"]), delta)
+
+    stale = [e["full"] for e in manifest["versions"] if e.get("full")]
+    for e in manifest["versions"]:
+        e.pop("full", None)
+        e.pop("full_bytes", None)
+        e.pop("full_sha256", None)
+    manifest["versions"].append(entry)
+    manifest["latest"] = version
+    _write_atomic(os.path.join(out_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode("utf-8"))
+    _write_atomic(os.path.join(out_dir, STATE_FILE),
+                  json.dumps({"version": version, "hashes": hashes}, ensure_ascii=False).encode("utf-8"))
+    for name in stale:
+        path = os.path.join(out_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    return entry
+
+
+def verify(out_dir: str = DEFAULT_BUNDLE_DIR) -> Tuple[int, int]:
+    """
+    Replay every delta from the first version it can start from and compare
+    the result with the latest full bundle. Returns (deltas applied, courses).
+    """
+    manifest = _read_json(os.path.join(out_dir, MANIFEST_FILE), {})
+    if not manifest.get("latest"):
+        raise FileNotFoundError(f"No published bundles in {out_dir}")
+    latest = manifest["versions"][-1]
+    with open(os.path.join(out_dir, latest["full"]), "rb") as f:
+        data = f.read()
+    if hashlib.sha256(data).hexdigest() != latest["full_sha256"]:
+        raise ValueError(f"Checksum mismatch for {latest['full']}")
+    header, arrays = decode_bundle(data)
+    expected = {course_key(course): course for course in courses_from_columns(arrays)}
+
+    catalog: Dict[CourseKey, CatalogCourse] = {}
+    applied = 0
+    for entry in manifest["versions"]:
+        if not entry.get("delta"):
+            continue
+        with open(os.path.join(out_dir, entry["delta"]), "rb") as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != entry["delta_sha256"]:
+            raise ValueError(f"Checksum mismatch for {entry['delta']}")
+        apply_delta(catalog, data)
+        applied += 1
+
+    # Deltas start at version 2, so the replay only holds courses changed since
+    # version 1; every one of them must match the latest full bundle.
+    for key, course in catalog.items():
+        if expected.get(key) != course:
+            raise ValueError(f"Delta replay disagrees with {latest['full']} on {key}")
+    return applied, len(expected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Versioned binary course bundles for offline clients")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    publish_parser = subparsers.add_parser("publish", help="Publish a new version if the catalog changed")
+    publish_parser.add_argument("--sql-dir", default=DEFAULT_SQL_DIR)
+    publish_parser.add_argument("--out", default=DEFAULT_BUNDLE_DIR)
+
+    info_parser = subparsers.add_parser("info", help="List published versions")
+    info_parser.add_argument("--out", default=DEFAULT_BUNDLE_DIR)
+
+    verify_parser = subparsers.add_parser("verify", help="Check checksums and replay the deltas")
+    verify_parser.add_argument("--out", default=DEFAULT_BUNDLE_DIR)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        if not os.path.isdir(args.sql_dir):
+            print(f"Error: {args.sql_dir} is not a directory")
+            sys.exit(1)
+        started = time.perf_counter()
+        entry = publish(load_catalog(args.sql_dir), args.out)
+        elapsed = time.perf_counter() - started
+        if entry is None:
+            print(f"Catalog unchanged; nothing published ({elapsed:.2f}s)")
+            return
+        delta = (f", delta {entry['delta_bytes'] / 1024:.1f} KiB with {entry['changed']} changed "
+                 f"and {entry['removed']} removed courses" if entry.get("delta") else "")
+        print(f"Published v{entry['version']}: {entry['courses']} courses, "
+              f"full {entry['full_bytes'] / 1024:.1f} KiB{delta} -> {args.out} in {elapsed:.2f}s")
+        return
+
+    manifest = _read_json(os.path.join(args.out, MANIFEST_FILE), {})
+    if not manifest.get("latest"):
+        print(f"Error: no bundles at {args.out}; run `publish` first")
+        sys.exit(1)
+
+    if args.command == "info":
+        print(f"Bundles: {args.out} (format v{manifest['format']}, latest v{manifest['latest']})")
+        for entry in manifest["versions"]:
+            sizes = []
+            if entry.get("full"):
+                sizes.append(f"full {entry['full_bytes'] / 1024:.1f} KiB")
+            if entry.get("delta"):
+                sizes.append(f"delta {entry['delta_bytes'] / 1024:.1f} KiB")
+            print(f"  - v{entry['version']}: {entry['courses']} courses, {entry['changed']} changed, "
+                  f"{entry['removed']} removed ({', '.join(sizes)})")
+        return
+
+    try:
+        applied, courses = verify(args.out)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"OK: {applied} deltas replayed against v{manifest['latest']} ({courses} courses)")
+
+
+if __name__ == "__main__":
+    main()
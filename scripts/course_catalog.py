@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Read the course seed files in scripts/sql/ back into course/tee/hole records.
+
+The files are the `do $$ ... $$` blocks written by parse_scorecard.py,
+parse_scorecard_transposed.py and the course-ingest generator. They only ever
+use single-row `insert into ... values (...)` statements and bind ids through
+`returning id into <variable>`, so a small quote-aware scanner is enough to
+recover the data without a database.
+
+Usage:
+    python scripts/course_catalog.py [scripts/sql]
+
+Prints a one-line summary per course file.
+"""
+
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Iterator, NamedTuple, Optional
+
+
+DEFAULT_SQL_DIR = "scripts/sql"
+
+COURSE_TABLE = "public.course"
+TEE_TABLE = 'public."teeInfo"'
+HOLE_TABLE = "public.hole"
+
+# Same rule as is_course_seed() in build-seed.sh: a course seed file inserts
+# into public.course; helper queries and runbook templates never do.
+COURSE_SEED_PATTERN = re.compile(r'^\s*insert into public\.course\s*\(', re.IGNORECASE | re.MULTILINE)
+
+INSERT_PATTERN = re.compile(
+    r'insert\s+into\s+(public\.(?:course|"teeInfo"|hole))\s*\(',
+    re.IGNORECASE,
+)
+VALUES_PATTERN = re.compile(r'\s*values\s*\(', re.IGNORECASE)
+RETURNING_PATTERN = re.compile(r'\s*returning\s+id\s+into\s+(\w+)\s*;', re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r'^-?\d+(\.\d+)?$')
+# A quoted string ('' escapes a quote), a delimiter, a run of anything else,
+# or a lone quote that opens a string never closed
+LIST_TOKEN_PATTERN = re.compile(r"'(?:[^']+|'')*'|[(),]|[^'(),]+|'")
+
+
+# The statement records are NamedTuples rather than frozen dataclasses: every
+# light ingest subcommand imports this module, and building them costs a
+# fraction of the dataclass machinery at startup.
+class SqlVariable(NamedTuple):
+    """A bare plpgsql identifier used as a value, e.g. v_course_id."""
+    name: str
+
+
+class InsertStatement(NamedTuple):
+    table: str  # As written, e.g. 'public."teeInfo"'
+    columns: tuple[str, ...]  # Unquoted column names
+    values: tuple  # str, int, float, None or SqlVariable per column
+    returning_into: Optional[str]
+    line: int  # 1-based line of the `insert` keyword
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.columns, self.values))
+
+
+@dataclass
+class CatalogHole:
+    hole_number: int
+    par: int
+    distance: int
+    hcp: int
+
+
+@dataclass
+class CatalogTee:
+    name: str
+    gender: str  # "mens" or "ladies"
+    course_rating_18: float
+    slope_rating_18: int
+    course_rating_front_9: float
+    slope_rating_front_9: int
+    course_rating_back_9: float
+    slope_rating_back_9: int
+    out_par: int
+    in_par: int
+    total_par: int
+    out_distance: int
+    in_distance: int
+    total_distance: int
+    distance_measurement: str  # "meters" or "yards"
+    approval_status: str
+    holes: list[CatalogHole] = field(default_factory=list)
+
+
+@dataclass
+class CatalogCourse:
+    name: str
+    city: str
+    country: str
+    website: Optional[str]
+    approval_status: str
+    tees: list[CatalogTee] = field(default_factory=list)
+    source: Optional[str] = None  # File the course was read from
+
+
+def _scan_until_close(text: str, pos: int, line_starts: list[int]) -> tuple[list[str], int]:
+    """
+    Split a parenthesised list into raw items, starting just after the '('.
+
+    Commas and parentheses inside single-quoted strings are ignored; '' is an
+    escaped quote. Returns (raw_items, position_after_closing_paren); errors
+    name the line they occur on.
+    """
+    # Most lists (column lists, hole values) have no strings or nesting
+    close = text.find(')', pos)
+    if close != -1:
+        segment = text[pos:close]
+        if "'" not in segment and '(' not in segment:
+            return [item.strip() for item in segment.split(',')], close + 1
+
+    items = []
+    current = []
+    depth = 0
+
+    # Whole tokens rather than characters: the seed files hold ~20k inserts
+    for match in LIST_TOKEN_PATTERN.finditer(text, pos):
+        token = match.group()
+        if token == '(':
+            depth += 1
+            current.append(token)
+        elif token == ')':
+            if depth == 0:
+                items.append(''.join(current).strip())
+                return items, match.end()
+            depth -= 1
+            current.append(token)
+        elif token == ',' and depth == 0:
+            items.append(''.join(current).strip())
+            current = []
+        elif token == "'":
+            raise ValueError(f"line {_line_of(line_starts, match.start())}: Unterminated string literal")
+        else:
+            current.append(token)
+
+    raise ValueError(f"line {_line_of(line_starts, pos - 1)}: Unterminated parenthesised list")
+
+
+def parse_sql_value(raw: str):
+    """Convert a raw SQL value token into a Python value."""
+    if raw.startswith("'") and raw.endswith("'") and len(raw) >= 2:
+        return raw[1:-1].replace("''", "'")
+    if raw.lower() == 'null':
+        return None
+    if NUMBER_PATTERN.match(raw):
+        return float(raw) if '.' in raw else int(raw)
+    if re.match(r'^[A-Za-z_]\w*$', raw):
+        return SqlVariable(raw)
+    raise ValueError(f"Unsupported SQL value: {raw}")
+
+
+def iter_insert_statements(sql_text: str) -> Iterator[InsertStatement]:
+    """Yield every course/teeInfo/hole insert in a SQL file, in order."""
+    # Precompute line starts so statement offsets map to line numbers cheaply
+    line_starts = [0] + [m.end() for m in re.finditer('\n', sql_text)]
+
+    pos = 0
+    while True:
+        match = INSERT_PATTERN.search(sql_text, pos)
+        if not match:
+            return
+
+        line = _line_of(line_starts, match.start())
+        raw_columns, after_columns = _scan_until_close(sql_text, match.end(), line_starts)
+
+        values_match = VALUES_PATTERN.match(sql_text, after_columns)
+        if not values_match:
+            raise ValueError(f"line {line}: expected VALUES after column list")
+        raw_values, after_values = _scan_until_close(sql_text, values_match.end(), line_starts)
+        try:
+            values = tuple(parse_sql_value(v) for v in raw_values)
+        except ValueError as e:
+            raise ValueError(f"line {_line_of(line_starts, values_match.end())}: {e}") from None
+
+        returning_into = None
+        returning_match = RETURNING_PATTERN.match(sql_text, after_values)
+        if returning_match:
+            returning_into = returning_match.group(1)
+            pos = returning_match.end()
+        else:
+            pos = after_values
+
+        yield InsertStatement(
+            table=match.group(1),
+            columns=tuple(c.strip().strip('"') for c in raw_columns),
+            values=values,
+            returning_into=returning_into,
+            line=line,
+        )
+
+
+def _line_of(line_starts: list[int], offset: int) -> int:
+    lo, hi = 0, len(line_starts)
+    while lo + 1 < hi:
+        mid = (lo + hi) // 2
+        if line_starts[mid] <= offset:
+            lo = mid
+        else:
+            hi = mid
+    return lo + 1
+
+
+def parse_course_sql(sql_text: str, source: Optional[str] = None) -> list[CatalogCourse]:
+    """
+    Rebuild the courses inserted by a generated SQL file.
+
+    Tee inserts attach to the course bound to their "courseId" variable and
+    hole inserts to the tee bound to their "teeId" variable. Variables are
+    resolved by their most recent assignment, which covers both the
+    v_tee_id_N style and the reused v_tee_id style.
+    """
+    courses = []
+    bound = {}  # variable name -> CatalogCourse or CatalogTee
+
+    for stmt in iter_insert_statements(sql_text):
+        row = stmt.as_dict()
+        table = stmt.table.lower()
+
+        if table == COURSE_TABLE:
+            target = CatalogCourse(
+                name=row['name'],
+                city=row['city'],
+                country=row['country'],
+                website=row.get('website'),
+                approval_status=row.get('approvalStatus', 'pending'),
+                source=source,
+            )
+            courses.append(target)
+        elif table == TEE_TABLE.lower():
+            course = _resolve(bound, row['courseId'], CatalogCourse, stmt)
+            target = CatalogTee(
+                name=row['name'],
+                gender=row['gender'],
+                course_rating_18=float(row['courseRating18']),
+                slope_rating_18=int(row['slopeRating18']),
+                course_rating_front_9=float(row['courseRatingFront9']),
+                slope_rating_front_9=int(row['slopeRatingFront9']),
+                course_rating_back_9=float(row['courseRatingBack9']),
+                slope_rating_back_9=int(row['slopeRatingBack9']),
+                out_par=int(row['outPar']),
+                in_par=int(row['inPar']),
+                total_par=int(row['totalPar']),
+                out_distance=int(row['outDistance']),
+                in_distance=int(row['inDistance']),
+                total_distance=int(row['totalDistance']),
+                distance_measurement=row.get('distanceMeasurement', 'yards'),
+                approval_status=row.get('approvalStatus', 'pending'),
+            )
+            course.tees.append(target)
+        else:
+            tee = _resolve(bound, row['teeId'], CatalogTee, stmt)
+            tee.holes.append(CatalogHole(
+                hole_number=int(row['holeNumber']),
+                par=int(row['par']),
+                distance=int(row['distance']),
+                hcp=int(row['hcp']),
+            ))
+            continue
+
+        if stmt.returning_into:
+            bound[stmt.returning_into] = target
+
+    return courses
+
+
+def _resolve(bound: dict, value, expected_type: type, stmt: InsertStatement):
+    if not isinstance(value, SqlVariable) or value.name not in bound:
+        raise ValueError(f"line {stmt.line}: unbound reference {value!r}")
+    target = bound[value.name]
+    if not isinstance(target, expected_type):
+        raise ValueError(f"line {stmt.line}: {value.name} does not refer to a {expected_type.__name__}")
+    return target
+
+
+def is_course_seed(sql_text: str) -> bool:
+    return COURSE_SEED_PATTERN.search(sql_text) is not None
+
+
+def iter_course_files(sql_dir: str = DEFAULT_SQL_DIR) -> Iterator[str]:
+    """Yield the course seed files in a directory, sorted like the seed build."""
+    for filename in sorted(os.listdir(sql_dir)):
+        if not filename.endswith('.sql'):
+            continue
+        path = os.path.join(sql_dir, filename)
+        if not os.path.isfile(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            if is_course_seed(f.read()):
+                yield path
+
+
+def load_course_file(path: str) -> list[CatalogCourse]:
+    with open(path, encoding='utf-8') as f:
+        return parse_course_sql(f.read(), source=path)
+
+
+def load_catalog(sql_dir: str = DEFAULT_SQL_DIR) -> list[CatalogCourse]:
+    """Load every course seed file in sql_dir."""
+    courses = []
+    for path in iter_course_files(sql_dir):
+        courses.extend(load_course_file(path))
+    return courses
+
+
+def main():
+    sql_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SQL_DIR
+    total_tees = 0
+    total_holes = 0
+    courses = load_catalog(sql_dir)
+
+    for course in courses:
+        holes = sum(len(t.holes) for t in course.tees)
+        total_tees += len(course.tees)
+        total_holes += holes
+        print(f"{os.path.basename(course.source)}: {course.name} ({course.city}, {course.country}) "
+              f"- {len(course.tees)} tees, {holes} holes")
+
+    print()
+    print(f"{len(courses)} courses, {total_tees} tees, {total_holes} holes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Emit the minimal SQL that turns an existing course into a freshly parsed one.
+
+Regenerating a course with parse_scorecard.py rewrites every tee and hole.
+This compares the new file with the existing version of the course and
+writes a single `do $$` block that only touches what changed:
+
+- tees are matched by (name, gender); new tees are inserted with their holes
+- changed tee columns are updated in place, changed holes in one
+  `update ... from (values ...)`, and added hole numbers are inserted
+- tees missing from the new card are archived ("isArchived" = true) rather
+  than deleted, because rounds reference tees with `on delete restrict`
+- removed hole numbers (which includes renumbered holes) are deleted only
+  when no round was played on the tee, since scores reference holes with
+  `on delete restrict` too; a played tee is archived instead and the new
+  card inserted as its next version ("version" + 1, "parentTeeId"), so its
+  rounds keep the holes they were scored on
+
+When a rating, slope, par or stroke index changes, every user with a round
+on the affected tees is queued for handicap recalculation, as in the
+20260716121000_fix_ballerud_yellow_tee_ratings migration.
+
+The existing version comes from scripts/sql/ (the file holding the same
+name/city/country, or --against) or from a database snapshot (--snapshot), a
+JSON course object or list of them with the table's column names:
+
+    select json_build_object(
+      'name', c.name, 'city', c.city, 'country', c.country,
+      'website', c.website, 'approvalStatus', c."approvalStatus",
+      'teeInfo', (select json_agg(to_jsonb(t) || jsonb_build_object('hole',
+        (select json_agg(h order by h."holeNumber") from public.hole h where h."teeId" = t.id)))
+        from public."teeInfo" t
+        where t."courseId" = c.id and not t."isArchived" and t."approvalStatus" = 'approved'))
+    from public.course c where c.name = '...';
+
+Usage:
+    python scripts/course_diff.py NEW.sql [--against OLD.sql | --snapshot course.json] [--out diff.sql]
+"""
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Optional
+
+from course_catalog import (
+    DEFAULT_SQL_DIR,
+    CatalogCourse,
+    CatalogHole,
+    CatalogTee,
+    load_catalog,
+    load_course_file,
+)
+
+
+# CatalogTee attribute -> teeInfo column, in the generators' column order
+TEE_COLUMNS = [
+    ("course_rating_18", "courseRating18"),
+    ("slope_rating_18", "slopeRating18"),
+    ("course_rating_front_9", "courseRatingFront9"),
+    ("slope_rating_front_9", "slopeRatingFront9"),
+    ("course_rating_back_9", "courseRatingBack9"),
+    ("slope_rating_back_9", "slopeRatingBack9"),
+    ("out_par", "outPar"),
+    ("in_par", "inPar"),
+    ("total_par", "totalPar"),
+    ("out_distance", "outDistance"),
+    ("in_distance", "inDistance"),
+    ("total_distance", "totalDistance"),
+    ("distance_measurement", "distanceMeasurement"),
+]
+
+# Changes to these feed into score differentials, so affected rounds are requeued
+HANDICAP_TEE_ATTRS = {
+    "course_rating_18", "slope_rating_18",
+    "course_rating_front_9", "slope_rating_front_9",
+    "course_rating_back_9", "slope_rating_back_9",
+    "out_par", "in_par", "total_par",
+}
+HANDICAP_HOLE_ATTRS = {"par", "hcp"}
+HOLE_ATTRS = ("par", "distance", "hcp")
+
+
+@dataclass
+class TeeDiff:
+    name: str
+    gender: str
+    kind: str  # "insert", "update" or "archive"
+    tee: Optional[CatalogTee] = None  # New tee for "insert", and an "update" that may need a new version
+    columns: dict[str, object] = field(default_factory=dict)  # teeInfo column -> new value
+    hole_updates: list[CatalogHole] = field(default_factory=list)
+    hole_update_attrs: set[str] = field(default_factory=set)
+    hole_inserts: list[CatalogHole] = field(default_factory=list)
+    hole_deletes: list[int] = field(default_factory=list)
+    affects_handicaps: bool = False
+
+
+@dataclass
+class CourseDiff:
+    course: CatalogCourse  # The new version
+    website_changed: bool
+    tees: list[TeeDiff]
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.website_changed and not self.tees
+
+
+def diff_tee(old: CatalogTee, new: CatalogTee) -> Optional[TeeDiff]:
+    tee_diff = TeeDiff(name=new.name, gender=new.gender, kind="update", tee=new)
+
+    for attr, column in TEE_COLUMNS:
+        if getattr(old, attr) != getattr(new, attr):
+            tee_diff.columns[column] = getattr(new, attr)
+            if attr in HANDICAP_TEE_ATTRS:
+                tee_diff.affects_handicaps = True
+
+    old_holes = {h.hole_number: h for h in old.holes}
+    new_holes = {h.hole_number: h for h in new.holes}
+
+    for number, hole in sorted(new_holes.items()):
+        previous = old_holes.get(number)
+        if previous is None:
+            tee_diff.hole_inserts.append(hole)
+            tee_diff.affects_handicaps = True
+            continue
+        changed = {a for a in HOLE_ATTRS if getattr(previous, a) != getattr(hole, a)}
+        if changed:
+            tee_diff.hole_updates.append(hole)
+            tee_diff.hole_update_attrs |= changed
+            if changed & HANDICAP_HOLE_ATTRS:
+                tee_diff.affects_handicaps = True
+
+    tee_diff.hole_deletes = sorted(set(old_holes) - set(new_holes))
+    if tee_diff.hole_deletes:
+        tee_diff.affects_handicaps = True
+
+    if tee_diff.columns or tee_diff.hole_updates or tee_diff.hole_inserts or tee_diff.hole_deletes:
+        return tee_diff
+    return None
+
+
+def diff_courses(old: CatalogCourse, new: CatalogCourse) -> CourseDiff:
+    """Compare two versions of a course, matching tees by (name, gender)."""
+    old_tees = {(t.name, t.gender): t for t in old.tees}
+    new_keys = set()
+    tee_diffs = []
+
+    for tee in new.tees:
+        key = (tee.name, tee.gender)
+        new_keys.add(key)
+        previous = old_tees.get(key)
+        if previous is None:
+            tee_diffs.append(TeeDiff(name=tee.name, gender=tee.gender, kind="insert", tee=tee))
+        else:
+            tee_diff = diff_tee(previous, tee)
+            if tee_diff:
+                tee_diffs.append(tee_diff)
+
+    for tee in old.tees:
+        if (tee.name, tee.gender) not in new_keys:
+            tee_diffs.append(TeeDiff(name=tee.name, gender=tee.gender, kind="archive"))
+
+    return CourseDiff(course=new, website_changed=old.website != new.website, tees=tee_diffs)
+
+
+def sql_literal(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def _find_tee_sql(tee_diff: TeeDiff) -> str:
+    name = sql_literal(tee_diff.name)
+    gender = sql_literal(tee_diff.gender)
+    return f"""    select id into v_tee_id from public."teeInfo"
+    where "courseId" = v_course_id and name = {name} and gender = {gender}
+      and "isArchived" = false and "approvalStatus" = 'approved';
+    if v_tee_id is null then
+        raise exception 'Active tee % (%) not found', {name}, {gender};
+    end if;"""
+
+
+def _insert_holes_sql(holes: list[CatalogHole]) -> list[str]:
+    return [f"""    insert into public.hole ("teeId", "holeNumber", par, distance, hcp)
+    values (v_tee_id, {h.hole_number}, {h.par}, {h.distance}, {h.hcp});""" for h in holes]
+
+
+def _insert_tee_sql(tee: CatalogTee, new_version: bool = False) -> str:
+    """Insert a tee into v_tee_id; as a new version it follows the tee in v_parent_tee_id."""
+    version_columns = ', "version", "parentTeeId"' if new_version else ""
+    version_values = ", v_version + 1, v_parent_tee_id" if new_version else ""
+    return f"""    insert into public."teeInfo" (
+        "courseId", name, gender,
+        "courseRating18", "slopeRating18",
+        "courseRatingFront9", "slopeRatingFront9",
+        "courseRatingBack9", "slopeRatingBack9",
+        "outPar", "inPar", "totalPar",
+        "outDistance", "inDistance", "totalDistance",
+        "distanceMeasurement", "approvalStatus", "submittedBy"{version_columns}
+    )
+    values (
+        v_course_id, {sql_literal(tee.name)}, {sql_literal(tee.gender)},
+        {tee.course_rating_18}, {tee.slope_rating_18},
+        {tee.course_rating_front_9}, {tee.slope_rating_front_9},
+        {tee.course_rating_back_9}, {tee.slope_rating_back_9},
+        {tee.out_par}, {tee.in_par}, {tee.total_par},
+        {tee.out_distance}, {tee.in_distance}, {tee.total_distance},
+        {sql_literal(tee.distance_measurement)}, {sql_literal(tee.approval_status)}, null{version_values}
+    )
+    returning id into v_tee_id;"""
+
+
+def _indent(parts: list[str]) -> list[str]:
+    return ["\n".join("    " + line if line else line for line in part.split("\n")) for part in parts]
+
+
+def generate_diff_sql(diff: CourseDiff, against: Optional[str] = None) -> str:
+    course = diff.course
+    sql_parts = []
+
+    sql_parts.append(f"-- Diff: {course.name}")
+    sql_parts.append(f"-- Location: {course.city}, {course.country}")
+    if against:
+        sql_parts.append(f"-- Against: {against}")
+    sql_parts.append("-- Generated by course_diff.py")
+    sql_parts.append("")
+
+    if diff.is_empty:
+        sql_parts.append("-- No changes")
+        return '\n'.join(sql_parts)
+
+    sql_parts.append("do $$")
+    sql_parts.append("declare")
+    sql_parts.append("    v_course_id integer;")
+    sql_parts.append("    v_tee_id integer;")
+    if any(t.hole_deletes for t in diff.tees):
+        sql_parts.append("    v_parent_tee_id integer;")
+        sql_parts.append("    v_version integer;")
+    sql_parts.append("    v_tee_ids integer[] := '{}';")
+    sql_parts.append("    v_queued integer;")
+    sql_parts.append("begin")
+    sql_parts.append("")
+
+    sql_parts.append(f"""    select id into v_course_id from public.course
+    where name = {sql_literal(course.name)} and country = {sql_literal(course.country)} and city = {sql_literal(course.city)};
+    if v_course_id is null then
+        raise exception 'Course % not found', {sql_literal(course.name)};
+    end if;""")
+    sql_parts.append("")
+
+    if diff.website_changed:
+        sql_parts.append("    -- Update course")
+        sql_parts.append(f"    update public.course set website = {sql_literal(course.website)} where id = v_course_id;")
+        sql_parts.append("")
+
+    for tee_diff in diff.tees:
+        if tee_diff.kind == "insert":
+            tee = tee_diff.tee
+            sql_parts.append(f"    -- Insert {tee.name} tee ({tee.gender})")
+            sql_parts.append(_insert_tee_sql(tee))
+            sql_parts.extend(_insert_holes_sql(tee.holes))
+            sql_parts.append("")
+            continue
+
+        if tee_diff.kind == "archive":
+            sql_parts.append(f"    -- Archive {tee_diff.name} tee ({tee_diff.gender}): no longer on the card")
+            sql_parts.append(_find_tee_sql(tee_diff))
+            sql_parts.append('    update public."teeInfo" set "isArchived" = true where id = v_tee_id;')
+            sql_parts.append("")
+            continue
+
+        sql_parts.append(f"    -- Update {tee_diff.name} tee ({tee_diff.gender})")
+        sql_parts.append(_find_tee_sql(tee_diff))
+
+        edits = []
+        if tee_diff.columns:
+            assignments = ",\n        ".join(
+                f'"{column}" = {sql_literal(value)}' for column, value in tee_diff.columns.items())
+            edits.append(f"""    update public."teeInfo" set
+        {assignments}
+    where id = v_tee_id;""")
+
+        if tee_diff.hole_updates:
+            attrs = [a for a in HOLE_ATTRS if a in tee_diff.hole_update_attrs]
+            rows = ", ".join(
+                "(" + ", ".join(str(v) for v in [h.hole_number] + [getattr(h, a) for a in attrs]) + ")"
+                for h in tee_diff.hole_updates)
+            assignments = ", ".join(f"{a} = v.{a}" for a in attrs)
+            edits.append(f"""    update public.hole h set {assignments}
+    from (values {rows}) as v("holeNumber", {', '.join(attrs)})
+    where h."teeId" = v_tee_id and h."holeNumber" = v."holeNumber";""")
+
+        edits.extend(_insert_holes_sql(tee_diff.hole_inserts))
+
+        if tee_diff.affects_handicaps:
+            edits.append("    v_tee_ids := v_tee_ids || v_tee_id;")
+
+        if not tee_diff.hole_deletes:
+            sql_parts.extend(edits)
+            sql_parts.append("")
+            continue
+
+        # Scores reference holes with on delete restrict: a played tee gets a new
+        # version, and its rounds stay on the archived one with their holes
+        numbers = ", ".join(str(n) for n in tee_diff.hole_deletes)
+        sql_parts.append("""    if exists (select 1 from public.round where "teeId" = v_tee_id) then""")
+        sql_parts.extend(_indent([
+            f"""    -- Hole(s) {numbers} left the card: archive the played tee and insert a new version
+    select id, "version" into v_parent_tee_id, v_version from public."teeInfo" where id = v_tee_id;
+    update public."teeInfo" set "isArchived" = true where id = v_parent_tee_id;""",
+            _insert_tee_sql(tee_diff.tee, new_version=True),
+            *_insert_holes_sql(tee_diff.tee.holes),
+        ]))
+        sql_parts.append("    else")
+        sql_parts.extend(_indent(edits + [
+            f"""    delete from public.hole where "teeId" = v_tee_id and "holeNumber" in ({numbers});"""]))
+        sql_parts.append("    end if;")
+        sql_parts.append("")
+
+    if any(t.affects_handicaps for t in diff.tees):
+        sql_parts.append("""    -- Ratings, pars or stroke indexes changed: recompute handicaps of everyone
+    -- with a round on those tees. Mirrors enqueue_handicap_calculation()'s upsert.
+    insert into public.handicap_calculation_queue (user_id, event_type, last_updated)
+    select distinct r."userId", 'round_update', now()
+    from public.round r
+    where r."teeId" = any(v_tee_ids)
+    on conflict (user_id) do update set
+        event_type = excluded.event_type,
+        last_updated = excluded.last_updated,
+        status = 'pending',
+        attempts = 0,
+        error_message = null;
+    get diagnostics v_queued = row_count;
+    raise notice 'Queued % user(s) for handicap recalculation', v_queued;""")
+        sql_parts.append("")
+
+    sql_parts.append("    raise notice 'Updated course: %', v_course_id;")
+    sql_parts.append("end $$;")
+
+    return '\n'.join(sql_parts)
+
+
+def course_from_snapshot(obj: dict) -> CatalogCourse:
+    """Build a CatalogCourse from a JSON course object using the table's column names."""
+    course = CatalogCourse(
+        name=obj["name"],
+        city=obj["city"],
+        country=obj["country"],
+        website=obj.get("website"),
+        approval_status=obj.get("approvalStatus", "approved"),
+        source="snapshot",
+    )
+    for tee_obj in obj.get("teeInfo") or []:
+        tee = CatalogTee(
+            name=tee_obj["name"],
+            gender=tee_obj["gender"],
+            distance_measurement=tee_obj.get("distanceMeasurement", "yards"),
+            approval_status=tee_obj.get("approvalStatus", "approved"),
+            **{attr: _number(tee_obj[column]) for attr, column in TEE_COLUMNS
+               if attr != "distance_measurement"},
+        )
+        for hole_obj in tee_obj.get("hole") or []:
+            tee.holes.append(CatalogHole(
+                hole_number=int(hole_obj["holeNumber"]),
+                par=int(hole_obj["par"]),
+                distance=int(hole_obj["distance"]),
+                hcp=int(hole_obj["hcp"]),
+            ))
+        course.tees.append(tee)
+    return course
+
+
+def _number(value):
+    # Postgres numeric columns arrive as strings from some JSON exporters
+    if isinstance(value, str):
+        return float(value) if "." in value else int(value)
+    return value
+
+
+def find_existing(new: CatalogCourse, sql_dir: str = DEFAULT_SQL_DIR,
+                  exclude: Optional[str] = None) -> Optional[CatalogCourse]:
+    """Find the course with the same (name, country, city) key in sql_dir."""
+    key = (new.name, new.country, new.city)
+    excluded = os.path.abspath(exclude) if exclude else None
+    for course in load_catalog(sql_dir):
+        if (course.name, course.country, course.city) == key and os.path.abspath(course.source) != excluded:
+            return course
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minimal SQL diff between two versions of a course")
+    parser.add_argument("new", help="Freshly generated course SQL file")
+    parser.add_argument("--against", help="Existing course SQL file (default: search --sql-dir)")
+    parser.add_argument("--snapshot", help="Existing course as a JSON database snapshot")
+    parser.add_argument("--sql-dir", default=DEFAULT_SQL_DIR)
+    parser.add_argument("--out", help="Write the diff here instead of stdout")
+    args = parser.parse_args(argv)
+
+    new_courses = load_course_file(args.new)
+    if len(new_courses) != 1:
+        print(f"Error: expected one course in {args.new}, found {len(new_courses)}")
+        sys.exit(1)
+    new = new_courses[0]
+
+    if args.snapshot:
+        import json
+
+        with open(args.snapshot, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        candidates = [course_from_snapshot(obj) for obj in (snapshot if isinstance(snapshot, list) else [snapshot])]
+        old = next((c for c in candidates if (c.name, c.country, c.city) == (new.name, new.country, new.city)), None)
+        against = args.snapshot
+    elif args.against:
+        old = load_course_file(args.against)[0]
+        against = args.against
+    else:
+        old = find_existing(new, args.sql_dir, exclude=args.new)
+        against = old.source if old else None
+
+    if old is None:
+        print(f"Error: no existing version of '{new.name}' ({new.city}, {new.country}) found")
+        sys.exit(1)
+
+    diff = diff_courses(old, new)
+    sql = generate_diff_sql(diff, against)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(sql)
+        print(f"Saved to {args.out}")
+    else:
+        print(sql)
+
+    changed = [t for t in diff.tees if t.kind == "update"]
+    print(f"Tees: {sum(t.kind == 'insert' for t in diff.tees)} added, {len(changed)} changed, "
+          f"{sum(t.kind == 'archive' for t in diff.tees)} archived; "
+          f"holes: {sum(len(t.hole_updates) for t in changed)} updated, "
+          f"{sum(len(t.hole_inserts) for t in changed)} added, "
+          f"{sum(len(t.hole_deletes) for t in changed)} removed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
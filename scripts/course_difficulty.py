@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Corpus-wide difficulty of every course and tee, from all players' rounds.
+
+calculateCoursePerformance and calculateDistancePerformance (lib/statistics/
+calculations.ts) only see one player's scorecards. How hard a tee plays for
+everyone needs every round on it, which is far too much to gather per
+request, so this aggregates the whole round table in one batch and stores
+one JSON row per tee and per course that a screen can read as is:
+
+  per tee      rounds, mean and spread of the score versus par over complete
+               rounds, percentiles of that score (from a to-par histogram),
+               average over par per hole number, and the tee's percentile
+               rank of slopeRating18 and totalDistance among all tees
+  per course   the same over all its tees, its tees ranked by average over
+               par, and the course's percentile rank of mean slope and of its
+               longest tee among all courses
+
+Each tee reduces to a vector of sums (round counts, to-par sums and squares,
+the to-par histogram, per-hole counts, strokes and par) computed with NumPy
+bincounts over tee keys for any set of rounds; vectors of the same tee add,
+and a course's vector is the sum of its tees'. `build` runs over every
+eligible round (approved, not quarantined). `refresh` fingerprints the source
+rounds against the store as player_stats.py does: new rounds are added into
+their tee's vector, and tees with an edited or deleted round are recomputed
+from their own rounds (the fingerprints, the refresh plan and the store
+plumbing are shared with player_stats.py in stats_store.py). Percentile ranks
+come from the tee table and are recomputed on every run (one sort); only tees
+whose vector or rank changed, and their courses, are re-rendered.
+
+The source is a database with the app's round, score, hole, teeInfo and
+course tables (a sqlite export, or the stand-in from queue_load.py --db,
+whose teeInfo has no totalDistance; the holes' distances are summed then).
+
+Usage:
+    python scripts/course_difficulty.py build SOURCE.sqlite [--store course_difficulty.sqlite]
+    python scripts/course_difficulty.py refresh SOURCE.sqlite [--store course_difficulty.sqlite]
+    python scripts/course_difficulty.py show (--tee ID | --course ID) [--store course_difficulty.sqlite]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from stats_store import (
+    as_columns,
+    fill_wanted,
+    open_store as _open_store,
+    partial_states,
+    plan_refresh,
+    refresh_batches,
+    set_affected,
+    show_row,
+    stored_fingerprints,
+    table_columns,
+)
+
+
+DEFAULT_STORE = "course_difficulty.sqlite"
+HOLES = 18
+TO_PAR_MIN, TO_PAR_MAX = -20, 80  # Histogram range; scores beyond it land in the end bins
+TO_PAR_BINS = TO_PAR_MAX - TO_PAR_MIN + 1
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Tee vector layout: name -> columns, all merged by addition
+FIELDS: Dict[str, slice] = {}
+for _name, _size in (("rounds", 1), ("full_rounds", 1), ("sum_to_par", 1), ("sum_to_par_sq", 1),
+                     ("to_par_hist", TO_PAR_BINS), ("hole_n", HOLES), ("hole_strokes", HOLES),
+                     ("hole_par", HOLES)):
+    _start = FIELDS[list(FIELDS)[-1]].stop if FIELDS else 0
+    FIELDS[_name] = slice(_start, _start + _size)
+WIDTH = FIELDS["hole_par"].stop
+
+
+# ---------------------------------------------------------------------------
+# Source data
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Batch:
+    """Columnar rounds and scores of some tees; scores point at their round's position."""
+    tee_ids: np.ndarray  # Distinct tee ids; `tee` columns index into this
+    round_id: np.ndarray
+    tee: np.ndarray
+    to_par: np.ndarray  # totalStrokes - parPlayed
+    complete: np.ndarray  # A score on every hole of the tee
+    score_round: np.ndarray
+    strokes: np.ndarray
+    par: np.ndarray
+    hole_number: np.ndarray
+    found: np.ndarray  # Score's hole belongs to the tee played
+
+
+@dataclass
+class TeeTable:
+    """Approved, unarchived tees with what the percentile ranks need."""
+    course_of: Dict[int, int]  # Every tee, archived and pending ones too
+    tee_id: np.ndarray
+    course_id: np.ndarray
+    slope: np.ndarray
+    distance: np.ndarray
+    holes: np.ndarray
+
+
+def _eligible(db: sqlite3.Connection) -> str:
+    columns = table_columns(db, "round")
+    filters = ["1"]
+    if "approvalStatus" in columns:
+        filters.append("r.\"approvalStatus\" = 'approved'")
+    if "quarantined" in columns:
+        filters.append("not r.quarantined")
+    return " and ".join(filters)
+
+
+def round_fingerprints(source: sqlite3.Connection) -> Dict[int, Tuple[int, int]]:
+    """Eligible round id -> (tee id, fingerprint of everything the aggregates read from it)."""
+    rows = source.execute(
+        f'select r.id, r."teeId", r."totalStrokes", r."parPlayed", s.n, s.total '
+        f'from round r left join (select "roundId", count(*) n, sum(strokes) total from score group by "roundId") s '
+        f'on s."roundId" = r.id where {_eligible(source)}')
+    return {row[0]: (row[1], zlib.crc32(repr(row[1:]).encode())) for row in rows}
+
+
+def load_tees(source: sqlite3.Connection) -> TeeTable:
+    columns = table_columns(source, "teeInfo")
+    filters = ["1"]
+    if "approvalStatus" in columns:
+        filters.append("t.\"approvalStatus\" = 'approved'")
+    if "isArchived" in columns:
+        filters.append('not t."isArchived"')
+    distance = 't."totalDistance"' if "totalDistance" in columns else "sum(h.distance)"
+    rows = source.execute(
+        f'select t.id, t."courseId", t."slopeRating18", {distance}, count(h.id) from "teeInfo" t '
+        f'left join hole h on h."teeId" = t.id where {" and ".join(filters)} group by t.id order by t.id').fetchall()
+    columns = as_columns(rows, 5)
+    return TeeTable(
+        course_of=dict(source.execute('select id, "courseId" from "teeInfo"')),
+        tee_id=np.array(columns[0], dtype=np.int64),
+        course_id=np.array(columns[1], dtype=np.int64),
+        slope=np.array([np.nan if value is None else value for value in columns[2]], dtype=np.float64),
+        distance=np.array([np.nan if value is None else value for value in columns[3]], dtype=np.float64),
+        holes=np.array(columns[4], dtype=np.int64),
+    )
+
+
+def load_batch(source: sqlite3.Connection, round_ids: Sequence[int]) -> Batch:
+    """Rounds (with their scores and holes) by id, as columns."""
+    fill_wanted(source, round_ids)
+
+    rounds = source.execute(
+        'select r.id, r."teeId", r."totalStrokes" - r."parPlayed", '
+        '(select count(*) from score s where s."roundId" = r.id), '
+        '(select count(*) from hole h where h."teeId" = r."teeId") '
+        'from round r join temp.wanted w on w.id = r.id order by r.id').fetchall()
+    scores = source.execute(
+        'select s."roundId", s.strokes, h.par, h."holeNumber", h.id is not null and h."teeId" = r."teeId" '
+        'from score s join temp.wanted w on w.id = s."roundId" join round r on r.id = s."roundId" '
+        'left join hole h on h.id = s."holeId"').fetchall()
+
+    columns = as_columns(rounds, 5)
+    tee_ids, tee = np.unique(np.array(columns[1], dtype=np.int64), return_inverse=True)
+    round_id = np.array(columns[0], dtype=np.int64)
+    score_count = np.array(columns[3], dtype=np.int64)
+    hole_count = np.array(columns[4], dtype=np.int64)
+
+    score_columns = as_columns(scores, 5)
+    found = np.array([bool(value) for value in score_columns[4]], dtype=bool)
+    return Batch(
+        tee_ids=tee_ids,
+        round_id=round_id,
+        tee=tee.astype(np.int64),
+        to_par=np.array([np.nan if value is None else value for value in columns[2]], dtype=np.float64),
+        complete=(score_count > 0) & (score_count >= hole_count),
+        score_round=np.searchsorted(round_id, np.array(score_columns[0], dtype=np.int64)).astype(np.int64),
+        strokes=np.array(score_columns[1], dtype=np.float64),
+        par=np.array([0 if value is None else value for value in score_columns[2]], dtype=np.float64),
+        hole_number=np.array([0 if value is None else value for value in score_columns[3]], dtype=np.int64),
+        found=found,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Kernel
+# ---------------------------------------------------------------------------
+
+def _per_key(keys: np.ndarray, size: int, weights=None) -> np.ndarray:
+    return np.bincount(keys, weights=weights, minlength=size).astype(np.float64)
+
+
+def compute_vectors(batch: Batch) -> np.ndarray:
+    """The sum vector of every tee in the batch."""
+    tees = len(batch.tee_ids)
+    out = np.zeros((tees, WIDTH))
+
+    def put(name: str, values: np.ndarray) -> None:
+        out[:, FIELDS[name]] = values.reshape(tees, -1)
+
+    t = batch.tee
+    put("rounds", _per_key(t, tees))
+    full = batch.complete & np.isfinite(batch.to_par)
+    to_par = batch.to_par[full]
+    put("full_rounds", _per_key(t[full], tees))
+    put("sum_to_par", _per_key(t[full], tees, to_par))
+    put("sum_to_par_sq", _per_key(t[full], tees, to_par ** 2))
+    bins = (np.clip(to_par, TO_PAR_MIN, TO_PAR_MAX) - TO_PAR_MIN).astype(np.int64)
+    put("to_par_hist", _per_key(t[full] * TO_PAR_BINS + bins, tees * TO_PAR_BINS))
+
+    numbered = batch.found & (batch.hole_number >= 1) & (batch.hole_number <= HOLES)
+    keys = t[batch.score_round][numbered] * HOLES + batch.hole_number[numbered] - 1
+    put("hole_n", _per_key(keys, tees * HOLES))
+    put("hole_strokes", _per_key(keys, tees * HOLES, batch.strokes[numbered]))
+    put("hole_par", _per_key(keys, tees * HOLES, batch.par[numbered]))
+    return out
+
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Percentile rank (0..100) of each value among the finite values: share below plus half the ties."""
+    ranks = np.full(len(values), np.nan)
+    finite = np.isfinite(values)
+    ordered = np.sort(values[finite])
+    if len(ordered):
+        below = np.searchsorted(ordered, values[finite], side="left")
+        at_or_below = np.searchsorted(ordered, values[finite], side="right")
+        ranks[finite] = (below + at_or_below) / 2 / len(ordered) * 100
+    return ranks
+
+
+def rank_tees(tees: TeeTable) -> Dict[int, Tuple[float, float]]:
+    """tee id -> (slope percentile, distance percentile) among all tees."""
+    slope = np.round(percentile_ranks(tees.slope), 1)
+    distance = np.round(percentile_ranks(tees.distance), 1)
+    return {tee_id: (s, d) for tee_id, s, d in zip(tees.tee_id.tolist(), slope.tolist(), distance.tolist())}
+
+
+def rank_courses(tees: TeeTable) -> Dict[int, Tuple[float, float]]:
+    """course id -> (percentile of mean slope, percentile of longest tee) among all courses."""
+    courses, group = np.unique(tees.course_id, return_inverse=True)
+    n = len(courses)
+    finite = np.isfinite(tees.slope)
+    mean_slope = _per_key(group[finite], n, tees.slope[finite]) / np.maximum(_per_key(group[finite], n), 1)
+    mean_slope[_per_key(group[finite], n) == 0] = np.nan
+    longest = np.full(n, np.nan)
+    np.fmax.at(longest, group, tees.distance)
+    slope = np.round(percentile_ranks(mean_slope), 1)
+    distance = np.round(percentile_ranks(longest), 1)
+    return {course_id: (s, d) for course_id, s, d in zip(courses.tolist(), slope.tolist(), distance.tolist())}
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+STORE_SCHEMA = """
+create table if not exists difficulty_round (round_id integer primary key, tee_id integer not null,
+    fingerprint integer not null);
+create index if not exists difficulty_round_tee on difficulty_round (tee_id);
+create table if not exists difficulty_partial (tee_id integer primary key, state blob not null);
+create table if not exists difficulty_rank (tee_id integer primary key, course_id integer not null,
+    slope_percentile real, distance_percentile real, slope real, distance real);
+create table if not exists tee_difficulty (tee_id integer primary key, course_id integer,
+    computed_at text not null, stats text not null);
+create table if not exists course_difficulty (course_id integer primary key, computed_at text not null,
+    stats text not null);
+"""
+
+TEE_TABLES = ("difficulty_round", "difficulty_partial")
+
+
+def open_store(path: str) -> sqlite3.Connection:
+    return _open_store(path, STORE_SCHEMA, "tee_id integer")
+
+
+def apply_batch(store: sqlite3.Connection, batch: Batch, fingerprints: Dict[int, Tuple[int, int]],
+                replace: bool) -> None:
+    """
+    Fold a batch into the store: added to the tees' existing vectors, or
+    replacing them (the batch then holds all their rounds).
+    """
+    ids = batch.tee_ids.tolist()
+    vectors = compute_vectors(batch)
+    if not replace:
+        set_affected(store, ids)
+        existing = partial_states(store, "difficulty_partial", "tee_id")
+        for row, tee_id in enumerate(ids):
+            if tee_id in existing:
+                vectors[row] += np.frombuffer(existing[tee_id], dtype=np.float64)
+    store.executemany("insert or replace into difficulty_partial values (?, ?)",
+                      ((tee_id, vectors[row].tobytes()) for row, tee_id in enumerate(ids)))
+    store.executemany("insert or replace into difficulty_round values (?, ?, ?)",
+                      ((round_id, ids[tee], fingerprints[round_id][1])
+                       for round_id, tee in zip(batch.round_id.tolist(), batch.tee.tolist())))
+
+
+def update_ranks(store: sqlite3.Connection, tees: TeeTable) -> Set[int]:
+    """Replace the stored tee ranks; returns the tees whose rank or attributes changed."""
+    ranks = rank_tees(tees)
+    rows = [(tee_id, course_id, *ranks[tee_id], None if np.isnan(slope) else slope,
+             None if np.isnan(distance) else distance)
+            for tee_id, course_id, slope, distance in zip(tees.tee_id.tolist(), tees.course_id.tolist(),
+                                                          tees.slope.tolist(), tees.distance.tolist())]
+    rows = [tuple(None if isinstance(value, float) and np.isnan(value) else value for value in row) for row in rows]
+    previous = {row[0]: row for row in store.execute("select * from difficulty_rank")}
+    changed = {row[0] for row in rows if previous.get(row[0]) != row} | (previous.keys() - ranks.keys())
+    store.execute("delete from difficulty_rank")
+    store.executemany("insert into difficulty_rank values (?, ?, ?, ?, ?, ?)", rows)
+    return changed
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _mean(total: float, count: float) -> Optional[float]:
+    return float(total / count) if count else None
+
+
+def _summary(v: np.ndarray) -> dict:
+    """The statistics shared by tees and courses, from a sum vector."""
+    one = {name: float(v[field][0]) for name, field in FIELDS.items() if field.stop - field.start == 1}
+    full = one["full_rounds"]
+    mean = _mean(one["sum_to_par"], full)
+    std = float(np.sqrt(max(0.0, one["sum_to_par_sq"] / full - mean ** 2))) if full >= 2 else None
+
+    cumulative = np.cumsum(v[FIELDS["to_par_hist"]])
+    percentiles = {f"p{q}": int(np.searchsorted(cumulative, q / 100 * full) + TO_PAR_MIN) if full else None
+                   for q in PERCENTILES}
+
+    hole_n, strokes, par = v[FIELDS["hole_n"]], v[FIELDS["hole_strokes"]], v[FIELDS["hole_par"]]
+    holes = [{"holeNumber": h + 1, "avgOverPar": (strokes[h] - par[h]) / hole_n[h], "played": int(hole_n[h])}
+             for h in range(HOLES) if hole_n[h]]
+    return {
+        "roundCount": int(one["rounds"]),
+        "completeRounds": int(full),
+        "avgOverPar": mean,
+        "stdOverPar": std,
+        "overParPercentiles": percentiles,
+        "holes": holes,
+        "hardestHole": max(holes, key=lambda hole: hole["avgOverPar"])["holeNumber"] if holes else None,
+        "easiestHole": min(holes, key=lambda hole: hole["avgOverPar"])["holeNumber"] if holes else None,
+    }
+
+
+def materialize(store: sqlite3.Connection, tee_ids: Set[int], tees: TeeTable,
+                now: Optional[datetime] = None) -> Tuple[int, int]:
+    """Re-render the given tees and their courses; returns (tees, courses) written."""
+    computed_at = (now or datetime.now()).isoformat(timespec="seconds")
+    ranks = {row[0]: row[1:] for row in store.execute("select * from difficulty_rank")}
+    course_of = tees.course_of
+    courses = {course_of[tee_id] for tee_id in tee_ids if tee_id in course_of}
+    members: Dict[int, List[int]] = {}
+    for tee_id, course_id in course_of.items():
+        if course_id in courses:
+            members.setdefault(course_id, []).append(tee_id)
+
+    vectors: Dict[int, np.ndarray] = {}
+    set_affected(store, [tee_id for course in members.values() for tee_id in course] + list(tee_ids))
+    for tee_id, state in partial_states(store, "difficulty_partial", "tee_id").items():
+        vectors[tee_id] = np.frombuffer(state, dtype=np.float64)
+
+    tee_rows = []
+    for tee_id in sorted(tee_ids):
+        if tee_id not in vectors and tee_id not in ranks:
+            store.execute("delete from tee_difficulty where tee_id = ?", (tee_id,))
+            continue
+        _, slope_pct, distance_pct, slope, distance = ranks.get(tee_id, (None,) * 5)
+        course_id = course_of.get(tee_id)
+        stats = {"teeId": tee_id, "courseId": course_id,
+                 **_summary(vectors.get(tee_id, np.zeros(WIDTH))),
+                 "slopeRating18": slope, "slopePercentile": slope_pct,
+                 "totalDistance": distance, "distancePercentile": distance_pct}
+        tee_rows.append((tee_id, course_id, computed_at, json.dumps(stats)))
+    store.executemany("insert or replace into tee_difficulty values (?, ?, ?, ?)", tee_rows)
+
+    course_ranks = rank_courses(tees)
+    course_rows = []
+    for course_id in sorted(courses):
+        played = sorted(tee_id for tee_id in members[course_id] if tee_id in vectors)
+        if not played and course_id not in course_ranks:
+            store.execute("delete from course_difficulty where course_id = ?", (course_id,))
+            continue
+        total = np.sum([vectors[tee_id] for tee_id in played], axis=0) if played else np.zeros(WIDTH)
+        tee_summaries = sorted(
+            ({"teeId": tee_id, "roundCount": int(vectors[tee_id][FIELDS["rounds"]][0]),
+              "avgOverPar": _mean(vectors[tee_id][FIELDS["sum_to_par"]][0],
+                                  vectors[tee_id][FIELDS["full_rounds"]][0])} for tee_id in played),
+            key=lambda tee: (tee["avgOverPar"] is None, -(tee["avgOverPar"] or 0), tee["teeId"]))
+        slope_pct, distance_pct = course_ranks.get(course_id, (None, None))
+        stats = {"courseId": course_id, **_summary(total), "tees": tee_summaries,
+                 "slopePercentile": slope_pct, "longestTeePercentile": distance_pct}
+        course_rows.append((course_id, computed_at, json.dumps(stats)))
+    store.executemany("insert or replace into course_difficulty values (?, ?, ?)", course_rows)
+    return len(tee_rows), len(course_rows)
+
+
+# ---------------------------------------------------------------------------
+# Build and refresh
+# ---------------------------------------------------------------------------
+
+def build(store: sqlite3.Connection, source: sqlite3.Connection) -> Tuple[int, int]:
+    """Recompute every tee and course; returns (tees, courses) written."""
+    fingerprints = round_fingerprints(source)
+    batch = load_batch(source, sorted(fingerprints))
+    tees = load_tees(source)
+    store.execute("begin")
+    for table in ("difficulty_round", "difficulty_partial", "difficulty_rank", "tee_difficulty",
+                  "course_difficulty"):
+        store.execute(f"delete from {table}")
+    apply_batch(store, batch, fingerprints, replace=True)
+    update_ranks(store, tees)
+    written = materialize(store, set(batch.tee_ids.tolist()) | set(tees.tee_id.tolist()), tees)
+    store.execute("commit")
+    return written
+
+
+def refresh(store: sqlite3.Connection, source: sqlite3.Connection) -> Tuple[int, int, int, Tuple[int, int]]:
+    """
+    Bring the store up to date with the source.
+
+    Returns (tees with only new rounds, tees recomputed, new rounds, (tees, courses) re-rendered).
+    """
+    fingerprints = round_fingerprints(source)
+    plan = plan_refresh(fingerprints, stored_fingerprints(store, "difficulty_round", "tee_id"))
+    tees = load_tees(source)
+    store.execute("begin")
+    appended_tees = refresh_batches(
+        store, source, plan, TEE_TABLES, "tee_id", load_batch,
+        lambda batch, replace: apply_batch(store, batch, fingerprints, replace),
+        lambda batch: batch.tee_ids.tolist())
+    touched = appended_tees | plan.recompute | update_ranks(store, tees)
+    written = materialize(store, touched, tees) if touched else (0, 0)
+    store.execute("commit")
+    return len(appended_tees - plan.recompute), len(plan.recompute), plan.new_rounds, written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corpus-wide course and tee difficulty")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("build", "Recompute every tee and course"),
+                            ("refresh", "Apply new, changed and deleted rounds")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("source", help="sqlite database with the app's round/score/hole/teeInfo tables")
+        sub.add_argument("--store", default=DEFAULT_STORE)
+    show_parser = subparsers.add_parser("show", help="Print one tee's or course's row")
+    target = show_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--tee", type=int)
+    target.add_argument("--course", type=int)
+    show_parser.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        if not os.path.isfile(args.store):
+            print(f"Error: {args.store} not found")
+            sys.exit(1)
+        table, key, value = (("tee_difficulty", "tee_id", args.tee) if args.tee is not None
+                             else ("course_difficulty", "course_id", args.course))
+        show_row(open_store(args.store), table, key, value, f"no difficulty row for {key.replace('_id', '')} {value}")
+        return
+
+    if not os.path.isfile(args.source):
+        print(f"Error: {args.source} not found")
+        sys.exit(1)
+
+    source = sqlite3.connect(args.source)
+    store = open_store(args.store)
+    started = time.perf_counter()
+    if args.command == "build":
+        tees, courses = build(store, source)
+        print(f"Built difficulty for {tees} tees and {courses} courses in "
+              f"{time.perf_counter() - started:.2f}s -> {args.store}")
+    else:
+        appended, recomputed, new_rounds, (tees, courses) = refresh(store, source)
+        print(f"Refreshed in {time.perf_counter() - started:.2f}s: {new_rounds} new rounds added to {appended} tees, "
+              f"{recomputed} tees recomputed, {tees} tees and {courses} courses re-rendered -> {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Find duplicate courses in the catalog by the holes they describe.
+
+find_duplicate_courses.sql pairs courses whose names contain each other in
+the same city, which misses the usual duplicates: a club entered once under
+the club's name and once under the course's, "Links" versus "Golf Club", or
+a neighbouring town as the city. The holes give such pairs away. This
+fingerprints every tee by its par sequence, stroke-index permutation and
+distance vector:
+
+    features    per hole: par, stroke index and the distance (in meters) in
+                20 m bands at two offsets, so a few meters' difference still
+                shares a band
+    MinHash     60 hashes of each tee's feature set, computed for all tees
+                at once with NumPy
+    LSH         12 bands of 5 hashes; tees sharing any band bucket become a
+                candidate pair (tees agreeing on 70% of their features
+                collide nine times in ten; unrelated tees almost never do),
+                kept when at least half their MinHashes agree
+
+Only candidate pairs of different courses are scored, so the pass is
+near-linear in the number of tees. Each candidate course pair is scored on
+its tees: every tee of the course with fewer tees is matched to its most
+similar tee of the other (par and stroke-index agreement, distances within
+a few meters), and the mean of those matches ranks the pair. Pairs at or
+above --min-score are written to --out, best first, with the number of
+tees that are identical (same pars, stroke indexes and distances to the
+meter), which marks a structurally identical course. Name similarity is
+listed for review; a high score with a low name similarity is the case the
+SQL helper cannot find. Merge with merge_courses_template.sql.
+
+Tees with neither distances nor stroke indexes carry too little to
+fingerprint and are skipped.
+
+Usage:
+    python scripts/course_fingerprint.py [--sql-dir scripts/sql] [--out course_duplicates.csv] [--min-score 0.8]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from course_catalog import CatalogCourse, CatalogTee
+from course_matcher import jaccard, name_tokens
+
+
+DEFAULT_OUT = "course_duplicates.csv"
+MIN_SCORE = 0.8
+HASHES = 60
+BANDS = 12
+ROWS_PER_BAND = HASHES // BANDS
+BAND_WIDTH_M = 20
+MAX_BUCKET_SIZE = 50  # Buckets this full hold a common layout, not a duplicate
+MIN_ESTIMATE = 0.5  # Share of equal MinHashes (estimated Jaccard) a candidate tee pair needs
+DISTANCE_SCALE_M = 10.0  # A hole this many meters off counts about a third as a match
+YARD_M = 0.9144
+PRIME = np.uint64(4294967311)  # Smallest prime above 2**32
+# Weights of par, stroke index and distance agreement in tee similarity
+WEIGHTS = (0.3, 0.3, 0.4)
+
+PAR, HCP, BAND_A, BAND_B = range(4)
+
+
+@dataclass
+class TeeLayout:
+    course: int  # Index into the courses list
+    name: str
+    par: np.ndarray
+    hcp: np.ndarray  # Zeros when the tee has no stroke indexes
+    meters: np.ndarray  # Zeros when the tee has no distances
+
+
+@dataclass
+class DuplicateCandidate:
+    a: CatalogCourse
+    b: CatalogCourse
+    score: float
+    name_similarity: float
+    matched_tees: int  # Tees of the smaller side with a match of 0.9 or better
+    identical_tees: int
+    compared_tees: int
+
+
+def tee_layout(course_index: int, tee: CatalogTee) -> Optional[TeeLayout]:
+    holes = sorted(tee.holes, key=lambda hole: hole.hole_number)
+    if not holes:
+        return None
+    scale = YARD_M if tee.distance_measurement == "yards" else 1.0
+    layout = TeeLayout(
+        course=course_index,
+        name=tee.name,
+        par=np.array([hole.par for hole in holes], dtype=np.int64),
+        hcp=np.array([hole.hcp or 0 for hole in holes], dtype=np.int64),
+        meters=np.round(np.array([hole.distance or 0 for hole in holes], dtype=np.float64) * scale).astype(np.int64),
+    )
+    if not layout.hcp.any() and not layout.meters.any():
+        return None
+    return layout
+
+
+def feature_matrix(layouts: List[TeeLayout]) -> np.ndarray:
+    """One row of feature ids per tee; short tees repeat their first feature, which leaves minima unchanged."""
+    width = 4 * max(len(layout.par) for layout in layouts)
+    features = np.empty((len(layouts), width), dtype=np.uint64)
+    for row, layout in enumerate(layouts):
+        hole = np.arange(len(layout.par), dtype=np.int64)
+        values = [layout.par, layout.hcp, layout.meters // BAND_WIDTH_M,
+                  (layout.meters + BAND_WIDTH_M // 2) // BAND_WIDTH_M]
+        ids = np.concatenate([((kind << 6 | hole) << 16) | (value & 0xFFFF) for kind, value in enumerate(values)])
+        features[row, :len(ids)] = ids
+        features[row, len(ids):] = ids[0]
+    return features
+
+
+def minhash(features: np.ndarray, seed: int = 1, chunk: int = 2048) -> np.ndarray:
+    """(tees, HASHES) MinHash signatures with universal hashes (a * x + b) mod p."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 31, HASHES, dtype=np.uint64)
+    b = rng.integers(0, 2 ** 31, HASHES, dtype=np.uint64)
+    signatures = np.empty((len(features), HASHES), dtype=np.uint64)
+    for start in range(0, len(features), chunk):
+        block = features[start:start + chunk, :, None]
+        signatures[start:start + chunk] = ((block * a + b) % PRIME).min(axis=1)
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, layouts: List[TeeLayout]) -> np.ndarray:
+    """Distinct (course, course) pairs, lower index first, with a tee pair sharing a band bucket."""
+    courses = np.array([layout.course for layout in layouts], dtype=np.int64)
+    mix = np.random.default_rng(0).integers(1, 2 ** 63, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+    tee_pairs = []
+    for band in range(BANDS):
+        rows = signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        keys = np.bitwise_xor.reduce(rows * mix, axis=1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(keys)])
+        shared = (sizes > 1) & (sizes <= MAX_BUCKET_SIZE)
+        for start, size in zip(starts[shared], sizes[shared]):
+            i, j = np.triu_indices(size, k=1)
+            tee_pairs.append(np.stack([order[start + i], order[start + j]], axis=1))
+    if not tee_pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    tee_pairs = np.unique(np.sort(np.concatenate(tee_pairs), axis=1), axis=0)
+    tee_pairs = tee_pairs[courses[tee_pairs[:, 0]] != courses[tee_pairs[:, 1]]]
+    estimate = (signatures[tee_pairs[:, 0]] == signatures[tee_pairs[:, 1]]).mean(axis=1)
+    tee_pairs = tee_pairs[estimate >= MIN_ESTIMATE]
+    pairs = np.sort(courses[tee_pairs], axis=1)
+    return np.unique(pairs, axis=0) if len(pairs) else np.zeros((0, 2), dtype=np.int64)
+
+
+def _stack(tees: List[TeeLayout]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return (np.stack([tee.par for tee in tees]), np.stack([tee.hcp for tee in tees]),
+            np.stack([tee.meters for tee in tees]))
+
+
+def tee_similarities(a_tees: List[TeeLayout], b_tees: List[TeeLayout]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (len(a), len(b)) similarity of every tee pair, 0..1, and whether the pair
+    is identical (same pars and stroke indexes, distances within a meter).
+    """
+    similarity = np.zeros((len(a_tees), len(b_tees)))
+    same = np.zeros((len(a_tees), len(b_tees)), dtype=bool)
+    for holes in {len(tee.par) for tee in a_tees} & {len(tee.par) for tee in b_tees}:
+        rows = [i for i, tee in enumerate(a_tees) if len(tee.par) == holes]
+        columns = [j for j, tee in enumerate(b_tees) if len(tee.par) == holes]
+        a_par, a_hcp, a_meters = (values[:, None, :] for values in _stack([a_tees[i] for i in rows]))
+        b_par, b_hcp, b_meters = (values[None, :, :] for values in _stack([b_tees[j] for j in columns]))
+
+        par = (a_par == b_par).mean(axis=-1)
+        hcp = (a_hcp == b_hcp).mean(axis=-1)
+        distance = np.exp(-np.abs(a_meters - b_meters) / DISTANCE_SCALE_M).mean(axis=-1)
+        # Components a tee lacks (no stroke indexes, no distances) drop out of the weighting
+        has_hcp = a_hcp.any(axis=-1) & b_hcp.any(axis=-1)
+        has_meters = a_meters.any(axis=-1) & b_meters.any(axis=-1)
+        total = WEIGHTS[0] * par + WEIGHTS[1] * np.where(has_hcp, hcp, 0) + WEIGHTS[2] * np.where(has_meters, distance, 0)
+        weight = WEIGHTS[0] + WEIGHTS[1] * has_hcp + WEIGHTS[2] * has_meters
+        similarity[np.ix_(rows, columns)] = total / weight
+        same[np.ix_(rows, columns)] = ((par == 1) & (hcp == 1)
+                                       & (np.abs(a_meters - b_meters) <= 1).all(axis=-1))
+    return similarity, same
+
+
+def score_pair(a_tees: List[TeeLayout], b_tees: List[TeeLayout]) -> Tuple[float, int, int]:
+    """Mean best-match similarity of the side with fewer tees, matched and identical tee counts."""
+    few, many = (a_tees, b_tees) if len(a_tees) <= len(b_tees) else (b_tees, a_tees)
+    similarity, same = tee_similarities(few, many)
+    best = similarity.max(axis=1)
+    return float(best.mean()), int(np.count_nonzero(best >= 0.9)), int(np.count_nonzero(same.any(axis=1)))
+
+
+def find_duplicates(courses: List[CatalogCourse], min_score: float = MIN_SCORE) -> List[DuplicateCandidate]:
+    layouts = [layout for i, course in enumerate(courses) for tee in course.tees
+               if (layout := tee_layout(i, tee)) is not None]
+    if not layouts:
+        return []
+    by_course: Dict[int, List[TeeLayout]] = defaultdict(list)
+    for layout in layouts:
+        by_course[layout.course].append(layout)
+
+    pairs = candidate_pairs(minhash(feature_matrix(layouts)), layouts)
+    results = []
+    for i, j in pairs.tolist():
+        score, matched, same = score_pair(by_course[i], by_course[j])
+        if score < min_score:
+            continue
+        a, b = courses[i], courses[j]
+        results.append(DuplicateCandidate(
+            a=a, b=b, score=round(score, 3),
+            name_similarity=round(jaccard(name_tokens(f"{a.name} {a.city}"), name_tokens(f"{b.name} {b.city}")), 3),
+            matched_tees=matched, identical_tees=same,
+            compared_tees=min(len(by_course[i]), len(by_course[j])),
+        ))
+    results.sort(key=lambda candidate: (-candidate.score, -candidate.identical_tees, candidate.a.name))
+    return results
+
+
+def write_candidates(candidates: List[DuplicateCandidate], path: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Score", "Identical Tees", "Matched Tees", "Compared Tees", "Name Similarity",
+                         "Course A", "City A", "Source A", "Course B", "City B", "Source B"])
+        for c in candidates:
+            writer.writerow([c.score, c.identical_tees, c.matched_tees, c.compared_tees, c.name_similarity,
+                             c.a.name, c.a.city, os.path.basename(c.a.source or ""),
+                             c.b.name, c.b.city, os.path.basename(c.b.source or "")])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find duplicate courses by their hole layouts")
+    parser.add_argument("--sql-dir", default="scripts/sql")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.sql_dir):
+        print(f"Error: {args.sql_dir} is not a directory")
+        sys.exit(1)
+
+    from course_catalog import load_catalog
+
+    started = time.perf_counter()
+    courses = load_catalog(args.sql_dir)
+    loaded = time.perf_counter()
+    candidates = find_duplicates(courses, args.min_score)
+    write_candidates(candidates, args.out)
+
+    tees = sum(len(course.tees) for course in courses)
+    print(f"Fingerprinted {tees} tees of {len(courses)} courses in {time.perf_counter() - loaded:.2f}s "
+          f"(loaded in {loaded - started:.2f}s)")
+    identical_pairs = sum(1 for c in candidates if c.identical_tees)
+    print(f"{len(candidates)} merge candidates ({identical_pairs} with identical tees) -> {args.out}")
+    for c in candidates[:10]:
+        print(f"  {c.score:.3f}  {c.a.name} ({c.a.city})  ~  {c.b.name} ({c.b.city})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Grid index over OSM golf course positions for "near me" lookups.
+
+scotland.py asks Overpass for `out tags center`; build_located_rows() keeps
+the node position or way/relation center of every course. This packs those
+points into a uniform lat/lon grid and writes it as one compact binary file,
+so "courses within 10 km" and "nearest course to this GPS fix" only look at
+a handful of cells instead of scanning every course or querying Overpass.
+
+File layout (little-endian):
+
+    magic      4s      b"GEOI"
+    version    u32
+    cell_size  f64     grid cell edge in degrees
+    n_points   u32
+    n_cells    u32
+    cell_keys  i64[n_cells]        sorted; key = row << 32 | (col & 0xffffffff)
+    cell_start u32[n_cells + 1]    points of cell i are [start[i], start[i+1])
+    lat        f32[n_points]       points sorted by cell
+    lon        f32[n_points]
+    label_off  u32[n_points + 1]
+    labels     utf-8               "club\\x1fcourse\\x1fwebsite" per point
+
+Usage:
+    python scripts/course_geo_index.py build [--elements overpass.json] [--out golf_courses.geoidx]
+    python scripts/course_geo_index.py near LAT LON [--radius-km 10] [--index golf_courses.geoidx]
+    python scripts/course_geo_index.py nearest LAT LON [--index golf_courses.geoidx]
+
+Without --elements, build fetches from Overpass with scotland.fetch_osm_data().
+"""
+
+import argparse
+import bisect
+import json
+import math
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+
+MAGIC = b"GEOI"
+VERSION = 1
+HEADER = struct.Struct("<4sIdII")
+DEFAULT_INDEX_FILE = "golf_courses.geoidx"
+DEFAULT_CELL_SIZE = 0.25  # degrees; ~28 km north-south
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+LABEL_SEPARATOR = "\x1f"
+
+
+@dataclass
+class NearbyCourse:
+    club_name: str
+    course_name: str
+    website: str
+    lat: float
+    lon: float
+    distance_km: float
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _antimeridian_km(lat: float, lon: float) -> float:
+    """Distance from a point to the nearest point on the 180th meridian."""
+    gap = 180.0 - abs(lon)
+    if gap >= 90.0:
+        return math.radians(90.0 - abs(lat)) * EARTH_RADIUS_KM
+    return EARTH_RADIUS_KM * math.asin(min(1.0, math.sin(math.radians(gap)) * math.cos(math.radians(lat))))
+
+
+def _cell(lat: float, lon: float, cell_size: float) -> Tuple[int, int]:
+    return math.floor(lat / cell_size), math.floor(lon / cell_size)
+
+
+def _cell_key(row: int, col: int) -> int:
+    return (row << 32) | (col & 0xFFFFFFFF)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def build_index(rows: Iterable[Tuple[str, str, str, float, float]],
+                cell_size: float = DEFAULT_CELL_SIZE) -> bytes:
+    """Serialise located rows (club, course, website, lat, lon) into an index file."""
+    points = []
+    for club_name, course_name, website, lat, lon in rows:
+        row, col = _cell(lat, lon, cell_size)
+        points.append((_cell_key(row, col), lat, lon,
+                       LABEL_SEPARATOR.join((club_name, course_name, website))))
+    points.sort(key=lambda p: p[0])
+
+    cell_keys = array("q")
+    cell_start = array("I")
+    lats = array("f")
+    lons = array("f")
+    label_off = array("I", [0])
+    labels = bytearray()
+
+    for i, (key, lat, lon, label) in enumerate(points):
+        if not cell_keys or cell_keys[-1] != key:
+            cell_keys.append(key)
+            cell_start.append(i)
+        lats.append(lat)
+        lons.append(lon)
+        labels += label.encode("utf-8")
+        label_off.append(len(labels))
+    cell_start.append(len(points))
+
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, cell_size, len(points), len(cell_keys)),
+        _little_endian(cell_keys),
+        _little_endian(cell_start),
+        _little_endian(lats),
+        _little_endian(lons),
+        _little_endian(label_off),
+        bytes(labels),
+    ])
+
+
+class CourseGeoIndex:
+    def __init__(self, data: bytes):
+        magic, version, self.cell_size, n_points, n_cells = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} course geo index")
+
+        offset = HEADER.size
+        sections = []
+        for typecode, count in (("q", n_cells), ("I", n_cells + 1), ("f", n_points),
+                                ("f", n_points), ("I", n_points + 1)):
+            size = array(typecode).itemsize * count
+            sections.append(_from_little_endian(typecode, data[offset:offset + size]))
+            offset += size
+
+        self.cell_keys, self.cell_start, self.lats, self.lons, self.label_off = sections
+        self.labels = data[offset:]
+
+        rows = [key >> 32 for key in self.cell_keys]
+        cols = [(key & 0xFFFFFFFF) - ((key & 0x80000000) << 1) for key in self.cell_keys]
+        self._rows = (min(rows), max(rows)) if rows else (0, 0)
+        self._cols = (min(cols), max(cols)) if cols else (0, 0)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_FILE) -> "CourseGeoIndex":
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def _cell_points(self, row: int, col: int) -> range:
+        key = _cell_key(row, col)
+        i = bisect.bisect_left(self.cell_keys, key)
+        if i == len(self.cell_keys) or self.cell_keys[i] != key:
+            return range(0)
+        return range(self.cell_start[i], self.cell_start[i + 1])
+
+    def _course(self, i: int, distance_km: float) -> NearbyCourse:
+        label = self.labels[self.label_off[i]:self.label_off[i + 1]].decode("utf-8")
+        club_name, course_name, website = label.split(LABEL_SEPARATOR)
+        return NearbyCourse(club_name, course_name, website, self.lats[i], self.lons[i], distance_km)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[NearbyCourse]:
+        """Courses within radius_km of a point, nearest first."""
+        lat_span = radius_km / KM_PER_DEGREE
+        # Widest longitude span of the circle is at the latitude nearest a pole
+        max_lat = min(89.9, abs(lat) + lat_span)
+        lon_span = min(180.0, radius_km / (KM_PER_DEGREE * math.cos(math.radians(max_lat))))
+
+        min_row, min_col = _cell(lat - lat_span, lon - lon_span, self.cell_size)
+        max_row, max_col = _cell(lat + lat_span, lon + lon_span, self.cell_size)
+
+        found = []
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                for i in self._cell_points(row, col):
+                    distance = haversine_km(lat, lon, self.lats[i], self.lons[i])
+                    if distance <= radius_km:
+                        found.append((distance, i))
+
+        found.sort()
+        return [self._course(i, distance) for distance, i in found]
+
+    def _ring_km(self, lat: float, ring: int) -> float:
+        """
+        Lower bound on the distance to any point in ring `ring` or beyond:
+        such a point is at least ring - 1 cells away in latitude or in
+        longitude, and a longitude gap is shortest at the most poleward
+        latitude the ring reaches.
+        """
+        if ring <= 1:
+            return 0.0
+        gap = (ring - 1) * self.cell_size
+        lat_km = gap * KM_PER_DEGREE
+        edge_lat = min(90.0, abs(lat) + ring * self.cell_size)
+        half_lon = math.radians(min(180.0, gap)) / 2
+        lon_km = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.cos(math.radians(edge_lat)) * math.sin(half_lon)))
+        return min(lat_km, lon_km)
+
+    def nearest(self, lat: float, lon: float, max_rings: int = 64) -> Optional[NearbyCourse]:
+        """
+        Nearest course to a point, searching rings of cells outward.
+
+        Once a candidate is found, rings continue only while they could still
+        hold something closer (_ring_km). Every course is scanned instead when
+        the rings cannot settle it: max_rings is reached while cells beyond it
+        hold courses (a far-away or polar query), or the 180th meridian, which
+        rings do not wrap around, is nearer than the best candidate. None
+        only for an empty index.
+        """
+        if not len(self):
+            return None
+        center_row, center_col = _cell(lat, lon, self.cell_size)
+        # From this ring on, every indexed cell has been visited
+        last_ring = max(abs(center_row - self._rows[0]), abs(center_row - self._rows[1]),
+                        abs(center_col - self._cols[0]), abs(center_col - self._cols[1]))
+        best = None
+        settled = False
+
+        for ring in range(min(max_rings, last_ring) + 1):
+            if best is not None and self._ring_km(lat, ring) > best[0]:
+                settled = True
+                break
+
+            for row in range(center_row - ring, center_row + ring + 1):
+                cols = (range(center_col - ring, center_col + ring + 1)
+                        if abs(row - center_row) == ring else (center_col - ring, center_col + ring))
+                for col in cols:
+                    for i in self._cell_points(row, col):
+                        distance = haversine_km(lat, lon, self.lats[i], self.lons[i])
+                        if best is None or distance < best[0]:
+                            best = (distance, i)
+        else:
+            settled = last_ring <= max_rings
+
+        if not settled or _antimeridian_km(lat, lon) < best[0]:
+            for i in range(len(self)):
+                distance = haversine_km(lat, lon, self.lats[i], self.lons[i])
+                if best is None or distance < best[0]:
+                    best = (distance, i)
+
+        return self._course(best[1], best[0])
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid index of OSM golf course positions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("--elements", help="Saved Overpass JSON response (default: fetch)")
+    build_parser.add_argument("--out", default=DEFAULT_INDEX_FILE)
+    build_parser.add_argument("--cell-size", type=float, default=DEFAULT_CELL_SIZE)
+
+    for name in ("near", "nearest"):
+        query_parser = subparsers.add_parser(name)
+        query_parser.add_argument("lat", type=float)
+        query_parser.add_argument("lon", type=float)
+        query_parser.add_argument("--index", default=DEFAULT_INDEX_FILE)
+        if name == "near":
+            query_parser.add_argument("--radius-km", type=float, default=10.0)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from scotland import build_located_rows, fetch_osm_data
+
+        if args.elements:
+            with open(args.elements, encoding="utf-8") as f:
+                payload = json.load(f)
+            elements = payload.get("elements", []) if isinstance(payload, dict) else payload
+        else:
+            elements = fetch_osm_data()
+
+        rows = build_located_rows(elements)
+        data = build_index(rows, args.cell_size)
+        with open(args.out, "wb") as f:
+            f.write(data)
+        print(f"Indexed {len(rows)} courses into {args.out} ({len(data) / 1024:.0f} KiB)")
+        return
+
+    index = CourseGeoIndex.load(args.index)
+    started = time.perf_counter()
+    if args.command == "near":
+        results = index.within(args.lat, args.lon, args.radius_km)
+    else:
+        result = index.nearest(args.lat, args.lon)
+        results = [result] if result else []
+    elapsed = time.perf_counter() - started
+
+    for course in results:
+        print(f"{course.distance_km:7.2f} km  {course.course_name} ({course.club_name})  {course.website}")
+    print(f"{len(results)} result(s) in {elapsed * 1000:.3f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
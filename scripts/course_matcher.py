@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Match OSM golf course rows against the existing course catalog.
+
+Reconciles the CSV written by scotland.py with the courses already in
+scripts/sql/ (or a catalog export from the database) and splits the OSM
+rows into three files:
+
+    present.csv  confidently matched to a catalog course
+    review.csv   a probable match that needs a human decision
+    missing.csv  nothing similar in the catalog; still to be ingested
+
+The catalog is indexed once by distinctive name tokens (generic words such
+as "golf", "club" and "links" are ignored), city and website domain. Each
+OSM row is only scored against the catalog courses that share a token or a
+domain with it, so the pass stays near-linear for tens of thousands of rows
+on both sides. When both sides carry lat/lon columns, distance adjusts the
+score.
+
+Usage:
+    python scripts/course_matcher.py scotland_golf_courses.csv [--catalog-csv catalog.csv] [--out-dir match]
+
+--catalog-csv takes columns name, city, country, website and optionally
+lat, lon (e.g. `\\copy (select name, city, country, website from course) to ...`);
+without it the catalog is read from --sql-dir.
+"""
+
+import argparse
+import csv
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+
+PRESENT_THRESHOLD = 0.85
+REVIEW_THRESHOLD = 0.5
+
+# Words that say "this is a golf course" rather than which one
+GENERIC_TOKENS = {
+    "golf", "club", "clubs", "gc", "course", "courses", "links", "the", "and", "of",
+    "at", "ladies", "mens", "golfklubb", "golfklubben", "gk", "golfbane", "golfbanen",
+    "golfpark", "golfbana", "golfclub", "golfing", "country", "resort", "hotel",
+    "par", "3", "9", "18", "hole", "holes",
+}
+
+# Tokens in more blocks than this are too common to narrow anything down
+MAX_BLOCK_SIZE = 200
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class MatchCandidate:
+    name: str
+    city: str
+    country: str
+    website: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    source: str = ""
+    tokens: Set[str] = field(default_factory=set)
+    city_tokens: Set[str] = field(default_factory=set)
+    domain: str = ""
+
+
+@dataclass
+class MatchResult:
+    club_name: str
+    course_name: str
+    website: str
+    status: str  # "present", "review" or "missing"
+    score: float
+    match: Optional[MatchCandidate]
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents, so "Østmarka" and "ostmarka" compare equal."""
+    text = (text or "").casefold().replace("ø", "o").replace("æ", "ae").replace("ß", "ss")
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def name_tokens(name: str) -> Set[str]:
+    text = fold(name).replace("'", "").replace("\u2019", "")
+    return {t for t in TOKEN_PATTERN.findall(text) if t not in GENERIC_TOKENS}
+
+
+def website_domain(url: str) -> str:
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = f"https://{url}"
+    host = urlparse(url).netloc.casefold().split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _float_or_none(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Equirectangular is plenty for "same place or not"
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371.0 * math.hypot(x, y)
+
+
+class CatalogIndex:
+    def __init__(self, candidates: Iterable[MatchCandidate]):
+        self.candidates: List[MatchCandidate] = []
+        self.by_token: Dict[str, List[int]] = defaultdict(list)
+        self.by_domain: Dict[str, List[int]] = defaultdict(list)
+
+        for candidate in candidates:
+            candidate.tokens = name_tokens(candidate.name)
+            candidate.city_tokens = name_tokens(candidate.city)
+            candidate.domain = website_domain(candidate.website)
+            i = len(self.candidates)
+            self.candidates.append(candidate)
+            for token in candidate.tokens:
+                self.by_token[token].append(i)
+            if candidate.domain:
+                self.by_domain[candidate.domain].append(i)
+
+    def block(self, tokens: Set[str], domain: str) -> Set[int]:
+        ids = set()
+        for token in tokens:
+            block = self.by_token.get(token)
+            if block and len(block) <= MAX_BLOCK_SIZE:
+                ids.update(block)
+        if domain:
+            ids.update(self.by_domain.get(domain, ()))
+        return ids
+
+
+def name_score(club_tokens: Set[str], course_tokens: Set[str], candidate: MatchCandidate) -> float:
+    """
+    Token overlap between an OSM row and a catalog course name.
+
+    OSM names often carry the town ("Nethy Bridge Abernethy"), so the
+    catalog city counts only where the OSM name has it. When the OSM course
+    name differs from its club (St Andrews Links Trust / Eden Course), the
+    catalog entry has to name that course: sibling courses of one club
+    otherwise look alike.
+    """
+    specific = course_tokens - club_tokens
+    if not specific:
+        tokens = club_tokens | course_tokens
+        return jaccard(tokens, candidate.tokens | (candidate.city_tokens & tokens))
+
+    # Club names are often organisational ("... Links Trust"); keep only the
+    # parts the catalog also uses
+    tokens = specific | (club_tokens & candidate.tokens)
+    score = jaccard(tokens, candidate.tokens | (candidate.city_tokens & (club_tokens | course_tokens)))
+    if not specific & candidate.tokens:
+        score *= 0.5
+    if club_tokens and not club_tokens & candidate.tokens:
+        score *= 0.5
+    return score
+
+
+def score_pair(club_tokens: Set[str], course_tokens: Set[str], domain: str,
+               lat: Optional[float], lon: Optional[float], candidate: MatchCandidate) -> float:
+    name = name_score(club_tokens, course_tokens, candidate)
+    score = name
+
+    # Multi-course clubs share one website, so a domain alone only earns a review
+    if domain and domain == candidate.domain:
+        score = max(score, 0.7) + 0.3 * name
+
+    if lat is not None and lon is not None and candidate.lat is not None and candidate.lon is not None:
+        distance = _distance_km(lat, lon, candidate.lat, candidate.lon)
+        if distance > 25:
+            score *= 0.5
+        elif distance < 2:
+            score += 0.1
+
+    return min(score, 1.0)
+
+
+def match_rows(rows: Iterable[Dict[str, str]], index: CatalogIndex) -> List[MatchResult]:
+    results = []
+
+    for row in rows:
+        club_name = row.get("Club Name", "")
+        course_name = row.get("Course Name", "")
+        website = row.get("Website", "")
+        lat = _float_or_none(row.get("Lat") or row.get("lat"))
+        lon = _float_or_none(row.get("Lon") or row.get("lon"))
+
+        club_tokens = name_tokens(club_name)
+        course_tokens = name_tokens(course_name)
+        domain = website_domain(website)
+
+        best_score = 0.0
+        best = None
+        for i in index.block(club_tokens | course_tokens, domain):
+            candidate = index.candidates[i]
+            score = score_pair(club_tokens, course_tokens, domain, lat, lon, candidate)
+            if score > best_score:
+                best_score, best = score, candidate
+
+        if best_score >= PRESENT_THRESHOLD:
+            status = "present"
+        elif best_score >= REVIEW_THRESHOLD:
+            status = "review"
+        else:
+            status, best = "missing", None
+
+        results.append(MatchResult(club_name, course_name, website, status, round(best_score, 3), best))
+
+    return results
+
+
+def load_catalog_candidates(sql_dir: str) -> List[MatchCandidate]:
+    from course_catalog import load_catalog
+
+    return [MatchCandidate(c.name, c.city, c.country, c.website or "", source=os.path.basename(c.source))
+            for c in load_catalog(sql_dir)]
+
+
+def load_csv_candidates(path: str) -> List[MatchCandidate]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [MatchCandidate(
+            name=row["name"],
+            city=row.get("city", ""),
+            country=row.get("country", ""),
+            website=row.get("website") or "",
+            lat=_float_or_none(row.get("lat")),
+            lon=_float_or_none(row.get("lon")),
+            source=os.path.basename(path),
+        ) for row in csv.DictReader(f)]
+
+
+def write_results(results: List[MatchResult], out_dir: str) -> Dict[str, int]:
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+
+    for status in ("present", "review", "missing"):
+        selected = [r for r in results if r.status == status]
+        counts[status] = len(selected)
+        with open(os.path.join(out_dir, f"{status}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Club Name", "Course Name", "Website", "Score",
+                             "Catalog Name", "Catalog City", "Catalog Website", "Catalog Source"])
+            for r in sorted(selected, key=lambda r: -r.score):
+                match = r.match
+                writer.writerow([r.club_name, r.course_name, r.website, r.score,
+                                 match.name if match else "", match.city if match else "",
+                                 match.website if match else "", match.source if match else ""])
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match OSM course rows against the course catalog")
+    parser.add_argument("osm_csv", help="CSV written by scotland.py")
+    parser.add_argument("--sql-dir", default="scripts/sql")
+    parser.add_argument("--catalog-csv", help="Catalog export with name, city, country, website[, lat, lon]")
+    parser.add_argument("--out-dir", default="course_match")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    candidates = load_csv_candidates(args.catalog_csv) if args.catalog_csv else load_catalog_candidates(args.sql_dir)
+    index = CatalogIndex(candidates)
+
+    with open(args.osm_csv, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    results = match_rows(rows, index)
+    counts = write_results(results, args.out_dir)
+    elapsed = time.perf_counter() - started
+
+    print(f"Matched {len(rows)} OSM rows against {len(candidates)} catalog courses in {elapsed:.2f}s")
+    for status, count in counts.items():
+        print(f"  - {status}: {count} -> {os.path.join(args.out_dir, status + '.csv')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Compact storage for the scorecard parsers' course models.
+
+parse_scorecard.py (TeeData, CourseData) and parse_scorecard_transposed.py
+(HoleData, TeeMetadata, CourseData) describe a course with dataclasses. As
+plain dataclasses every instance carries a __dict__, every per-hole value is
+a boxed int in a list, each tee holds its own copy of "mens"/"ladies" and of
+its name, and each transposed hole keeps a dict of tee name -> distance.
+Batch jobs that hold the whole catalog pay for all of that per tee. The
+parsers' dataclasses are declared with slots=True and normalise their fields
+in __post_init__ through these helpers, so they are built and read exactly
+as before:
+
+    intern_name()          names, cities, countries: one string object per
+                           distinct value
+    intern_gender()        the canonical "mens"/"ladies" strings; any other
+                           value is kept (interned) as the parsers gave it
+    hole_vector()          per-hole values as a HoleVector, an int16 array
+                           of 2 bytes a hole (int64 if a value does not fit);
+                           a HoleVector passes through unchanged, so the
+                           men's and ladies' variants of a tee share one
+    shared_hole_vector()   like hole_vector(), but equal vectors return one
+                           pooled array (pars and stroke indexes repeat
+                           across tees and courses)
+    HoleDistances          read-only tee name -> distance mapping over a
+                           shared tuple of names and an int16 array, in
+                           place of a dict per hole
+    shared_names()         that tuple of names, built once per card
+
+The models stay usable as they were with lists and dicts: a HoleVector
+indexes, slices, iterates and sums like a list, compares equal to a list,
+tuple or array with the same values and prints like a list, and
+copy.deepcopy (so dataclasses.asdict) turns vectors and HoleDistances into
+plain lists and dicts, which json can write. Values that are not integers
+are kept in a list as given. Vectors may be shared between tees: build a
+new one rather than changing one in place.
+
+Run as a script, this is the memory benchmark: it builds the same synthetic
+catalog (--tees tees, both parser models) with the previous plain
+dataclasses and with the compact ones and reports what tracemalloc sees
+still allocated. The parsers import this module, so the benchmark's own
+modules are imported when it runs.
+
+Usage:
+    python scripts/course_model.py [--tees 100000] [--seed 7]
+"""
+
+import argparse
+import sys
+import weakref
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+
+VECTOR_TYPE = "h"  # int16: distances in yards or meters, pars and stroke indexes all fit
+WIDE_VECTOR_TYPE = "q"  # For the odd value that does not
+GENDERS = {"mens": sys.intern("mens"), "ladies": sys.intern("ladies")}
+
+_shared_vectors: "weakref.WeakValueDictionary[tuple, HoleVector]" = weakref.WeakValueDictionary()
+_name_tuples: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+
+def intern_name(value: Optional[str]) -> Optional[str]:
+    return None if value is None else sys.intern(value)
+
+
+def intern_gender(value: str) -> str:
+    if not isinstance(value, str):
+        return value
+    return GENDERS.get(value) or sys.intern(value)
+
+
+class HoleVector(array):
+    """An int array that compares, prints and deep-copies like the list it replaces."""
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        item = array.__getitem__(self, index)
+        return HoleVector(self.typecode, item) if isinstance(index, slice) else item
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, array)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+    def __deepcopy__(self, memo) -> list:
+        return self.tolist()
+
+
+def hole_vector(values: Iterable[int]):
+    """Per-hole values as a HoleVector; an existing one is returned as is, non-integers as a list."""
+    if isinstance(values, HoleVector):
+        return values
+    if not isinstance(values, (list, tuple, array)):
+        values = list(values)
+    try:
+        return HoleVector(VECTOR_TYPE, values)
+    except OverflowError:
+        return HoleVector(WIDE_VECTOR_TYPE, values)
+    except TypeError:
+        return list(values)
+
+
+def shared_hole_vector(values: Iterable[int]):
+    """Like hole_vector(), but equal vectors come back as one pooled array."""
+    vector = hole_vector(values)
+    if not isinstance(vector, HoleVector):
+        return vector
+    return _shared_vectors.setdefault((vector.typecode, vector.tobytes()), vector)
+
+
+def shared_names(names: Iterable[str]) -> tuple[str, ...]:
+    """Tee names as the one interned tuple shared by every hole with these tee columns."""
+    names = tuple(intern_name(name) for name in names)
+    return _name_tuples.setdefault(names, names)
+
+
+class HoleDistances(Mapping):
+    """
+    A hole's tee name -> distance mapping. The names tuple is shared by every
+    hole with the same tee columns; lookups scan it, which is cheap for the
+    handful of tees a card has. A parser that gets the tuple from
+    shared_names() once per card skips interning the names for every hole.
+    """
+    __slots__ = ("names", "values")
+
+    def __init__(self, names: Iterable[str], values: Iterable[int]):
+        if type(names) is not tuple or _name_tuples.get(names) is not names:
+            names = shared_names(names)
+        self.names = names
+        self.values = hole_vector(values)
+        if len(self.names) != len(self.values):
+            raise ValueError(f"{len(self.names)} tee names for {len(self.values)} distances")
+
+    @classmethod
+    def from_dict(cls, distances: Mapping) -> "HoleDistances":
+        if isinstance(distances, cls):
+            return distances
+        return cls(distances.keys(), distances.values())
+
+    def __getitem__(self, name: str) -> int:
+        try:
+            return self.values[self.names.index(name)]
+        except ValueError:
+            raise KeyError(name) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def __deepcopy__(self, memo) -> dict:
+        return dict(self)
+
+    def __getstate__(self):
+        return self.names, self.values
+
+    def __setstate__(self, state) -> None:
+        names, self.values = state
+        self.names = _name_tuples.setdefault(names, names)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+TEE_COLORS = ("White", "Yellow", "Blue", "Red", "Orange")
+PAR_LAYOUTS = ([4, 4, 3, 5, 4, 4, 3, 4, 5], [4, 3, 4, 5, 4, 3, 4, 4, 5], [5, 4, 4, 3, 4, 4, 5, 3, 4])
+CITIES = ("Oslo", "Bergen", "Aberdeen", "St Andrews", "Drammen", "Inverness", "Stavanger", "Perth")
+
+
+def _fresh(value: str) -> str:
+    """A new string object with the same text, as a parser's regex match returns."""
+    return (value + " ")[:-1]
+
+
+def _hole_layout(rng) -> tuple[list[int], list[int], list[int]]:
+    pars = rng.choice(PAR_LAYOUTS) + rng.choice(PAR_LAYOUTS)
+    hcp_m = rng.sample(range(1, 19), 18)
+    hcp_w = hcp_m if rng.random() < 0.7 else rng.sample(range(1, 19), 18)
+    return pars, hcp_m, hcp_w
+
+
+def _plain_models() -> tuple:
+    """
+    The parsers' models as they were before slots and interning, for
+    comparison. Declared when the benchmark runs rather than on import: every
+    ingest subcommand that parses a scorecard imports this module.
+    """
+    @dataclass
+    class _PlainTeeData:
+        name: str
+        gender: str
+        course_rating_18: float
+        slope_rating_18: int
+        distances: list[int]
+
+    @dataclass
+    class _PlainCourseData:
+        name: str
+        city: str
+        country: str
+        website: Optional[str]
+        tees: list
+        pars: list[int]
+        handicaps_m: list[int]
+        handicaps_w: list[int]
+        is_9_hole: bool
+        out_par: int
+        in_par: int
+        distance_measurement: str
+
+    @dataclass
+    class _PlainHoleData:
+        hole_number: int
+        distances: dict[str, int]
+        hcp: int
+        par: int
+
+    @dataclass
+    class _PlainTeeMetadata:
+        name: str
+        gender: str
+        course_rating_18: float
+        slope_rating_18: int
+
+    @dataclass
+    class _PlainTransposedCourseData:
+        name: str
+        city: str
+        country: str
+        website: Optional[str]
+        distance_measurement: str
+        holes: list
+        tee_names: list[str]
+
+    return _PlainTeeData, _PlainCourseData, _PlainHoleData, _PlainTeeMetadata, _PlainTransposedCourseData
+
+
+def build_golfpass_catalog(tees: int, tee_cls, course_cls, seed: int) -> list:
+    """parse_scorecard.py courses: five tee rows of 18 holes, each with a men's and a ladies' tee."""
+    import random
+
+    rng = random.Random(seed)
+    courses = []
+    made = 0
+    while made < tees:
+        pars, hcp_m, hcp_w = _hole_layout(rng)
+        base = [rng.randint(90, 520) for _ in range(18)]
+        course_tees = []
+        for i, color in enumerate(TEE_COLORS):
+            distances = [max(60, d - 25 * i + rng.randint(-5, 5)) for d in base]
+            if hasattr(tee_cls, "__slots__"):
+                distances = hole_vector(distances)  # Converted once per row, as parse_tee_row does
+            for gender in ("mens", "ladies"):
+                course_tees.append(tee_cls(name=_fresh(color), gender=_fresh(gender),
+                                           course_rating_18=round(rng.uniform(62, 75), 1),
+                                           slope_rating_18=rng.randint(110, 145), distances=distances))
+        made += len(course_tees)
+        courses.append(course_cls(
+            name=f"Synthetic Golf Club {len(courses)}", city=_fresh(rng.choice(CITIES)), country=_fresh("Norway"),
+            website=None, tees=course_tees, pars=list(pars), handicaps_m=list(hcp_m), handicaps_w=list(hcp_w),
+            is_9_hole=False, out_par=sum(pars[:9]), in_par=sum(pars[9:]), distance_measurement=_fresh("meters")))
+    return courses
+
+
+def build_transposed_catalog(tees: int, hole_cls, tee_cls, course_cls, seed: int) -> list:
+    """parse_scorecard_transposed.py courses: five tee columns of 18 holes, with their tee metadata."""
+    import random
+
+    rng = random.Random(seed)
+    courses = []
+    made = 0
+    while made < tees:
+        pars, hcps, _ = _hole_layout(rng)
+        names = [_fresh(f"{55 - 4 * i}") for i in range(len(TEE_COLORS))]
+        base = [rng.randint(90, 520) for _ in range(18)]
+        compact_names = shared_names(names) if hasattr(hole_cls, "__slots__") else None
+        holes = []
+        for h in range(18):
+            values = [max(60, base[h] - 25 * i + rng.randint(-5, 5)) for i in range(len(names))]
+            if compact_names:
+                distances = HoleDistances(compact_names, values)  # Over names built once per card, as parse_holes does
+            else:
+                distances = {_fresh(name): value for name, value in zip(names, values)}
+            holes.append(hole_cls(hole_number=h + 1, distances=distances, hcp=hcps[h], par=pars[h]))
+        metadata = [tee_cls(name=_fresh(name), gender=_fresh("mens" if i < 3 else "ladies"),
+                            course_rating_18=round(rng.uniform(62, 75), 1), slope_rating_18=rng.randint(110, 145))
+                    for i, name in enumerate(names)]
+        made += len(metadata)
+        courses.append((course_cls(name=f"Synthetic Golfklubb {len(courses)}", city=_fresh(rng.choice(CITIES)),
+                                   country=_fresh("Norway"), website=None, distance_measurement=_fresh("meters"),
+                                   holes=holes, tee_names=names), metadata))
+    return courses
+
+
+def measure(build) -> tuple[int, float, object]:
+    """Bytes still allocated after build() and the seconds it took; returns the result to keep it alive."""
+    import gc
+    import time
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, elapsed, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory benchmark of the compact course models")
+    parser.add_argument("--tees", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    import parse_scorecard
+    import parse_scorecard_transposed
+
+    _PlainTeeData, _PlainCourseData, _PlainHoleData, _PlainTeeMetadata, _PlainTransposedCourseData = _plain_models()
+    cases = [
+        ("parse_scorecard", lambda: build_golfpass_catalog(args.tees, _PlainTeeData, _PlainCourseData, args.seed),
+         lambda: build_golfpass_catalog(args.tees, parse_scorecard.TeeData, parse_scorecard.CourseData, args.seed)),
+        ("parse_scorecard_transposed",
+         lambda: build_transposed_catalog(args.tees, _PlainHoleData, _PlainTeeMetadata, _PlainTransposedCourseData,
+                                          args.seed),
+         lambda: build_transposed_catalog(args.tees, parse_scorecard_transposed.HoleData,
+                                          parse_scorecard_transposed.TeeMetadata,
+                                          parse_scorecard_transposed.CourseData, args.seed)),
+    ]
+    print(f"{args.tees} tees per model, memory still allocated after building (tracemalloc)")
+    for name, plain_build, compact_build in cases:
+        plain_bytes, plain_seconds, plain = measure(plain_build)
+        del plain
+        compact_bytes, compact_seconds, compact = measure(compact_build)
+        del compact
+        print(f"  {name}:")
+        print(f"    - plain dataclasses: {plain_bytes / 2 ** 20:7.1f} MiB ({plain_bytes / args.tees:.0f} B/tee) "
+              f"built in {plain_seconds:.2f}s")
+        print(f"    - compact model:     {compact_bytes / 2 ** 20:7.1f} MiB ({compact_bytes / args.tees:.0f} B/tee) "
+              f"built in {compact_seconds:.2f}s")
+        print(f"    - saving:            {(1 - compact_bytes / plain_bytes) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    # From the imported module, which the parsers use too: as __main__ this
+    # file's HoleVector would be a different class from theirs
+    import course_model
+
+    course_model.main()
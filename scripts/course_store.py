@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Build and read a columnar binary store of the whole course corpus.
+
+Courses, tees and holes are stored as parallel fixed-width NumPy arrays, one
+uncompressed .npy file per column, so a reader can memory-map every column
+and slice it without copying. Strings (names, cities, countries, websites)
+are interned into a single UTF-8 blob addressed by integer ids. Two offset
+arrays link the tables:
+
+    course_tee_offsets[c] : course_tee_offsets[c + 1]  -> tee rows of course c
+    tee_hole_offsets[t]   : tee_hole_offsets[t + 1]    -> hole rows of tee t
+
+Each build writes its columns into a new generation directory
+(columns-000001/, columns-000002/, ...) and only then replaces manifest.json,
+which names the generation to read. A reader therefore sees either the
+previous store or the new one, never a mix, even if a build dies halfway.
+The previous generation is kept for readers that read the old manifest just
+before the switch; older ones are removed.
+
+Usage:
+    python scripts/course_store.py build [--sql-dir scripts/sql] [--out .course-store]
+    python scripts/course_store.py info [--out .course-store]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from course_catalog import DEFAULT_SQL_DIR, CatalogCourse, load_catalog
+
+
+DEFAULT_STORE_DIR = ".course-store"
+STORE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+GENERATION_PREFIX = "columns-"
+
+NO_STRING = -1
+
+GENDERS = ("mens", "ladies")
+DISTANCE_MEASUREMENTS = ("meters", "yards")
+APPROVAL_STATUSES = ("approved", "pending", "rejected")
+
+# column name -> dtype. Widths are chosen from the schema: holes fit in int8,
+# distances in int16 per hole and int32 per tee.
+COLUMNS = {
+    "strings_blob": np.uint8,
+    "strings_offsets": np.int64,
+
+    "course_name": np.int32,
+    "course_city": np.int32,
+    "course_country": np.int32,
+    "course_website": np.int32,
+    "course_approval_status": np.int8,
+    "course_tee_offsets": np.int64,
+
+    "tee_course": np.int32,
+    "tee_name": np.int32,
+    "tee_gender": np.int8,
+    "tee_course_rating_18": np.float32,
+    "tee_slope_rating_18": np.int16,
+    "tee_course_rating_front_9": np.float32,
+    "tee_slope_rating_front_9": np.int16,
+    "tee_course_rating_back_9": np.float32,
+    "tee_slope_rating_back_9": np.int16,
+    "tee_out_par": np.int16,
+    "tee_in_par": np.int16,
+    "tee_total_par": np.int16,
+    "tee_out_distance": np.int32,
+    "tee_in_distance": np.int32,
+    "tee_total_distance": np.int32,
+    "tee_distance_measurement": np.int8,
+    "tee_approval_status": np.int8,
+    "tee_hole_offsets": np.int64,
+
+    "hole_tee": np.int32,
+    "hole_number": np.int8,
+    "hole_par": np.int8,
+    "hole_distance": np.int16,
+    "hole_hcp": np.int8,
+}
+
+
+class StringInterner:
+    """Assigns one id per distinct string, in first-seen order."""
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._strings: list[str] = []
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._ids[value] = string_id
+            self._strings.append(value)
+        return string_id
+
+    def to_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        encoded = [s.encode("utf-8") for s in self._strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return blob, offsets
+
+
+def _enum_code(values: tuple[str, ...], value: str) -> int:
+    try:
+        return values.index(value)
+    except ValueError:
+        raise ValueError(f"Unknown value {value!r}, expected one of {values}")
+
+
+def build_columns(courses: Iterable[CatalogCourse]) -> dict[str, np.ndarray]:
+    """Flatten courses into the store's column arrays."""
+    strings = StringInterner()
+    cols: dict[str, list] = {name: [] for name in COLUMNS if not name.startswith("strings_")}
+    cols["course_tee_offsets"].append(0)
+    cols["tee_hole_offsets"].append(0)
+
+    for course in courses:
+        course_index = len(cols["course_name"])
+        cols["course_name"].append(strings.intern(course.name))
+        cols["course_city"].append(strings.intern(course.city))
+        cols["course_country"].append(strings.intern(course.country))
+        cols["course_website"].append(strings.intern(course.website))
+        cols["course_approval_status"].append(_enum_code(APPROVAL_STATUSES, course.approval_status))
+
+        for tee in course.tees:
+            tee_index = len(cols["tee_name"])
+            cols["tee_course"].append(course_index)
+            cols["tee_name"].append(strings.intern(tee.name))
+            cols["tee_gender"].append(_enum_code(GENDERS, tee.gender))
+            cols["tee_course_rating_18"].append(tee.course_rating_18)
+            cols["tee_slope_rating_18"].append(tee.slope_rating_18)
+            cols["tee_course_rating_front_9"].append(tee.course_rating_front_9)
+            cols["tee_slope_rating_front_9"].append(tee.slope_rating_front_9)
+            cols["tee_course_rating_back_9"].append(tee.course_rating_back_9)
+            cols["tee_slope_rating_back_9"].append(tee.slope_rating_back_9)
+            cols["tee_out_par"].append(tee.out_par)
+            cols["tee_in_par"].append(tee.in_par)
+            cols["tee_total_par"].append(tee.total_par)
+            cols["tee_out_distance"].append(tee.out_distance)
+            cols["tee_in_distance"].append(tee.in_distance)
+            cols["tee_total_distance"].append(tee.total_distance)
+            cols["tee_distance_measurement"].append(
+                _enum_code(DISTANCE_MEASUREMENTS, tee.distance_measurement))
+            cols["tee_approval_status"].append(_enum_code(APPROVAL_STATUSES, tee.approval_status))
+
+            for hole in tee.holes:
+                cols["hole_tee"].append(tee_index)
+                cols["hole_number"].append(hole.hole_number)
+                cols["hole_par"].append(hole.par)
+                cols["hole_distance"].append(hole.distance)
+                cols["hole_hcp"].append(hole.hcp)
+
+            cols["tee_hole_offsets"].append(len(cols["hole_number"]))
+
+        cols["course_tee_offsets"].append(len(cols["tee_name"]))
+
+    arrays = {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in cols.items()}
+    arrays["strings_blob"], arrays["strings_offsets"] = strings.to_arrays()
+    return arrays
+
+
+def _generations(out_dir: str) -> list[str]:
+    return sorted(name for name in os.listdir(out_dir)
+                  if name.startswith(GENERATION_PREFIX) and os.path.isdir(os.path.join(out_dir, name)))
+
+
+def _read_manifest(store_dir: str) -> dict:
+    with open(os.path.join(store_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_store(courses: Iterable[CatalogCourse], out_dir: str = DEFAULT_STORE_DIR,
+                source: Optional[str] = None) -> dict:
+    """
+    Write the store to out_dir and return its manifest.
+
+    The columns go into a new generation directory and the manifest is
+    replaced last, so a reader never sees columns of two builds together.
+    """
+    arrays = build_columns(courses)
+    os.makedirs(out_dir, exist_ok=True)
+
+    try:
+        previous = _read_manifest(out_dir).get("columns")
+    except (OSError, ValueError):
+        previous = None
+    existing = _generations(out_dir)
+    number = int(existing[-1][len(GENERATION_PREFIX):]) + 1 if existing else 1
+    generation = f"{GENERATION_PREFIX}{number:06d}"
+    os.makedirs(os.path.join(out_dir, generation))
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, generation, f"{name}.npy"), array, allow_pickle=False)
+
+    manifest = {
+        "version": STORE_FORMAT_VERSION,
+        "columns": generation,
+        "source": source,
+        "built_at": int(time.time()),
+        "courses": int(len(arrays["course_name"])),
+        "tees": int(len(arrays["tee_name"])),
+        "holes": int(len(arrays["hole_number"])),
+        "strings": int(len(arrays["strings_offsets"]) - 1),
+        "genders": list(GENDERS),
+        "distance_measurements": list(DISTANCE_MEASUREMENTS),
+        "approval_statuses": list(APPROVAL_STATUSES),
+    }
+    _write_atomic(os.path.join(out_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    # Older generations (and unfinished ones from failed builds) are no longer reachable
+    for name in existing:
+        if name != previous:
+            shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+
+    return manifest
+
+
+class CourseStore:
+    """
+    Read-only view over a store directory.
+
+    Every column is a memory-mapped array available as an attribute
+    (store.hole_par, store.tee_slope_rating_18, ...). Slices returned by
+    tee_range()/hole_range() are views into the mapping, not copies.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR, mmap: bool = True):
+        self.manifest = _read_manifest(store_dir)
+
+        if self.manifest.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported store version {self.manifest.get('version')} in {store_dir}, "
+                f"expected {STORE_FORMAT_VERSION}; rebuild it")
+
+        self.columns_dir = os.path.join(store_dir, self.manifest["columns"])
+        mmap_mode = "r" if mmap else None
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(self.columns_dir, f"{name}.npy"), mmap_mode=mmap_mode))
+
+    @property
+    def course_count(self) -> int:
+        return len(self.course_name)
+
+    @property
+    def tee_count(self) -> int:
+        return len(self.tee_name)
+
+    @property
+    def hole_count(self) -> int:
+        return len(self.hole_number)
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id == NO_STRING:
+            return None
+        start = self.strings_offsets[string_id]
+        end = self.strings_offsets[string_id + 1]
+        return bytes(self.strings_blob[start:end]).decode("utf-8")
+
+    def tee_range(self, course_index: int) -> slice:
+        return slice(int(self.course_tee_offsets[course_index]),
+                     int(self.course_tee_offsets[course_index + 1]))
+
+    def hole_range(self, tee_index: int) -> slice:
+        return slice(int(self.tee_hole_offsets[tee_index]),
+                     int(self.tee_hole_offsets[tee_index + 1]))
+
+    def course_label(self, course_index: int) -> str:
+        return (f"{self.string(self.course_name[course_index])} "
+                f"({self.string(self.course_city[course_index])}, "
+                f"{self.string(self.course_country[course_index])})")
+
+    def tee_gender_name(self, tee_index: int) -> str:
+        return GENDERS[self.tee_gender[tee_index]]
+
+    def find_courses(self, name: str) -> list[int]:
+        """Return course indexes whose name matches exactly."""
+        encoded = name.encode("utf-8")
+        matches = []
+        for course_index, string_id in enumerate(self.course_name):
+            start = self.strings_offsets[string_id]
+            end = self.strings_offsets[string_id + 1]
+            if end - start == len(encoded) and bytes(self.strings_blob[start:end]) == encoded:
+                matches.append(course_index)
+        return matches
+
+
+def open_store(store_dir: str = DEFAULT_STORE_DIR) -> CourseStore:
+    return CourseStore(store_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar course corpus store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Rebuild the store from the SQL files")
+    build_parser.add_argument("--sql-dir", default=DEFAULT_SQL_DIR)
+    build_parser.add_argument("--out", default=DEFAULT_STORE_DIR)
+
+    info_parser = subparsers.add_parser("info", help="Summarise an existing store")
+    info_parser.add_argument("--out", default=DEFAULT_STORE_DIR)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        courses = load_catalog(args.sql_dir)
+        manifest = write_store(courses, args.out, source=args.sql_dir)
+        elapsed = time.perf_counter() - started
+        print(f"Wrote {manifest['courses']} courses, {manifest['tees']} tees, "
+              f"{manifest['holes']} holes to {args.out} in {elapsed:.2f}s")
+        return
+
+    try:
+        started = time.perf_counter()
+        store = open_store(args.out)
+        elapsed = time.perf_counter() - started
+    except FileNotFoundError:
+        print(f"Error: no store at {args.out}; run `build` first")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    size = sum(os.path.getsize(os.path.join(store.columns_dir, f)) for f in os.listdir(store.columns_dir))
+    print(f"Store: {args.out} (format v{store.manifest['version']}, {size / 1024:.0f} KiB)")
+    print(f"  - Courses: {store.course_count}")
+    print(f"  - Tees: {store.tee_count}")
+    print(f"  - Holes: {store.hole_count}")
+    print(f"  - Interned strings: {store.manifest['strings']}")
+    print(f"  - Opened in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
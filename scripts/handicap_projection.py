@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo projection of when players reach a handicap goal.
+
+The handicap goal card (apps/native/components/homepage/handicap-goal.tsx)
+shows how far a player has come towards scratch, not how likely the goal is
+or how long it should take. This simulates each player's next --rounds
+rounds --sims times and replays handicap-core's index rules after each one:
+
+  - differentials drawn from the player's own recent raw differentials (the
+    last POOL_SIZE, resampled with replacement)
+  - the 20-round window with the best-of table and the -2/-1 adjustments of
+    calculateHandicapIndex (54 below three differentials)
+  - soft and hard caps against the Low Handicap Index: the lowest index of
+    the player's rounds, past or projected, in the 365 days before each
+    projected round (projected rounds are dated at the player's recent pace)
+
+Per player it reports the probability of reaching --target within the
+horizon, the expected number of rounds (and days at the player's pace) when
+it is reached, and percentiles of the index after the last projected round.
+
+All players of a chunk advance together: the simulations are arrays of shape
+(players, sims, 20), and each projected round writes one ring slot and
+partitions out the best differentials of every window at once, so a nightly
+run over every player stays in minutes. Results are cached per player with a
+fingerprint of their rounds and the run's parameters; a later run only
+simulates players who have posted, edited or lost a round since.
+
+Not replayed: ESR (a projected round 7+ strokes below the index would lower
+its neighbours too) and PCC. Recent form is taken as it is, with no trend.
+
+Usage:
+    python scripts/handicap_projection.py run SOURCE.sqlite [--target 0.0] [--rounds 40] [--sims 1000]
+    python scripts/handicap_projection.py show PLAYER_ID [--store handicap_projection.sqlite]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from stats_store import table_columns
+
+
+DEFAULT_STORE = "handicap_projection.sqlite"
+WINDOW = 20
+POOL_SIZE = 40
+NO_INDEX = 54.0
+SOFT_CAP_THRESHOLD = 3.0
+HARD_CAP_THRESHOLD = 5.0
+LOW_HANDICAP_WINDOW_DAYS = 365
+DEFAULT_INTERVAL_DAYS = 7.0
+CHUNK_CELLS = 4_000_000  # players x sims x (20 + projected rounds kept) per chunk
+DAY = 86400
+
+# getRelevantDifferentials and the adjustments of calculateHandicapIndex, by
+# number of differentials
+RELEVANT = np.array([1, 1, 1, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 4, 5, 5, 6, 6, 7, 8])
+ADJUSTMENT = np.zeros(WINDOW + 1)
+ADJUSTMENT[3], ADJUSTMENT[4], ADJUSTMENT[6] = 2, 1, 1
+
+STORE_SCHEMA = """
+create table if not exists projection (player_id text primary key, fingerprint integer not null,
+    params text not null, computed_at text not null, result text not null);
+"""
+
+
+@dataclass
+class Histories:
+    """What the simulation needs of each player, as arrays in player order."""
+    player_ids: List[str]
+    current_index: np.ndarray
+    window: np.ndarray  # (players, 20) final differentials, oldest first, NaN-padded in front
+    counts: np.ndarray  # Differentials in the window
+    pool: np.ndarray  # Flat raw differentials to draw from
+    pool_start: np.ndarray
+    pool_size: np.ndarray
+    interval_days: np.ndarray  # Recent days between rounds
+    history_low: np.ndarray  # (players, horizon) Low HI from past rounds at each projected round; inf if none
+
+
+def round_half_up(values: np.ndarray) -> np.ndarray:
+    """roundToHandicapPrecision: Math.round(value * 10) / 10."""
+    return np.floor(values * 10 + 0.5) / 10
+
+
+def apply_caps(index: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """applyHandicapCaps, elementwise; an infinite low index means no caps."""
+    difference = index - low
+    soft = np.where(difference > SOFT_CAP_THRESHOLD,
+                    low + SOFT_CAP_THRESHOLD + (difference - SOFT_CAP_THRESHOLD) * 0.5, index)
+    capped = round_half_up(np.minimum(soft, low + HARD_CAP_THRESHOLD))
+    return np.where(np.isfinite(low) & (difference > 0), capped, index)
+
+
+def handicap_index(window: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    calculateHandicapIndex over the last axis; NaN marks an empty slot.
+
+    Rows must be ordered by count, descending: full windows form a prefix
+    that only needs its best eight partitioned out, not a sort.
+    """
+    index = np.empty(window.shape[:-1])
+    full = int(np.count_nonzero(counts == WINDOW))
+    if full:
+        used = RELEVANT[WINDOW]
+        # Summed in ascending order like calculateHandicapIndex's reduce, so a
+        # mean on a .x5 boundary rounds the same way
+        best = np.cumsum(np.sort(np.partition(window[:full], used - 1, axis=-1)[..., :used], axis=-1), axis=-1)[..., -1]
+        index[:full] = round_half_up(best / used)
+    if full < len(counts):
+        rest, rest_counts = window[full:], counts[full:]
+        ordered = np.nan_to_num(np.sort(rest, axis=-1), nan=0.0)  # NaN sorts last
+        used = RELEVANT[rest_counts]
+        totals = np.cumsum(ordered, axis=-1)
+        best = np.take_along_axis(totals, np.broadcast_to((used - 1)[:, None, None], rest.shape[:-1] + (1,)),
+                                  axis=-1)[..., 0]
+        partial = round_half_up(best / used[:, None]) - ADJUSTMENT[rest_counts][:, None]
+        index[full:] = np.where((rest_counts < 3)[:, None], NO_INDEX, partial)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Source data
+# ---------------------------------------------------------------------------
+
+def _approved_filter(source: sqlite3.Connection, alias: str = "") -> str:
+    columns = table_columns(source, "round")
+    return f"where {alias}\"approvalStatus\" = 'approved'" if "approvalStatus" in columns else ""
+
+
+def player_fingerprints(source: sqlite3.Connection) -> Dict[str, int]:
+    """player id -> fingerprint of their rounds and current index."""
+    rows = source.execute(
+        f'select p.id, p."handicapIndex", r.n, r.last_id, r.total, r.last_time from profile p join '
+        f'(select "userId", count(*) n, max(id) last_id, sum("scoreDifferential") total, max("teeTime") last_time, '
+        f'sum("updatedHandicapIndex") '
+        f'from round {_approved_filter(source)} group by "userId") r on r."userId" = p.id')
+    return {row[0]: zlib.crc32(repr(row[1:]).encode()) for row in rows}
+
+
+def load_histories(source: sqlite3.Connection, player_ids: List[str], horizon: int) -> Histories:
+    source.execute("create temp table if not exists wanted_players (id text primary key)")
+    source.execute("delete from temp.wanted_players")
+    source.executemany("insert into temp.wanted_players values (?)", ((pid,) for pid in player_ids))
+    rows = source.execute(
+        f'select r."userId", r."teeTime", r."scoreDifferential", r."exceptionalScoreAdjustment", '
+        f'r."updatedHandicapIndex", p."handicapIndex" from round r join temp.wanted_players w on w.id = r."userId" '
+        f'join profile p on p.id = r."userId" {_approved_filter(source, "r.")} '
+        f'order by r."userId", r."teeTime", r.id').fetchall()
+
+    user, tee_time, final, esr, updated, index = (list(column) for column in zip(*rows)) if rows else ([],) * 6
+    ids, first, player = np.unique(np.array(user, dtype=object), return_index=True, return_inverse=True)
+    players = len(ids)
+    player = player.reshape(-1)
+    seconds = np.array([t.replace(" ", "T")[:19] for t in tee_time], dtype="datetime64[s]").astype(np.int64)
+    final = np.array(final, dtype=np.float64)
+    raw = final + np.array(esr, dtype=np.float64)
+    updated = np.array(updated, dtype=np.float64)
+    counts_all = np.bincount(player, minlength=players)
+    ends = first + counts_all
+    from_end = ends[player] - 1 - np.arange(len(player))
+
+    window = np.full((players, WINDOW), np.nan)
+    recent = from_end < WINDOW
+    window[player[recent], WINDOW - 1 - from_end[recent]] = final[recent]
+
+    in_pool = from_end < POOL_SIZE
+    pool = raw[in_pool]
+    pool_size = np.bincount(player[in_pool], minlength=players)
+    pool_start = np.r_[0, np.cumsum(pool_size)[:-1]]
+
+    # Pace over the window's rounds
+    last_time = seconds[ends - 1] if players else np.zeros(0, np.int64)
+    oldest = seconds[np.maximum(ends - np.minimum(counts_all, WINDOW), first)] if players else last_time
+    gaps = np.minimum(counts_all, WINDOW) - 1
+    interval = np.where(gaps > 0, (last_time - oldest) / DAY / np.maximum(gaps, 1), DEFAULT_INTERVAL_DAYS)
+    interval = np.maximum(interval, 1.0)
+
+    # Low HI from past rounds: minimum updated index of the rounds on or after
+    # each projected round's window start, found by searching a (player, time)
+    # key and reading a per-player suffix minimum
+    earliest = int(seconds.min()) if len(seconds) else 0
+    span = int(seconds.max()) - earliest + 1 if len(seconds) else 1
+    key = player * span + (seconds - earliest)
+    # Reversed running minimum restarts at each player: later players carry a
+    # larger offset. Indexes have one decimal, so this runs exactly in tenths
+    tenths = np.round(updated * 10).astype(np.int64)
+    spread = (int(np.abs(tenths).max()) + 1) * 4 if len(tenths) else 1
+    suffix_min = (np.minimum.accumulate((tenths + player * spread)[::-1])[::-1] - player * spread) / 10
+    steps = np.arange(1, horizon + 1)
+    projected = last_time[:, None] + (steps[None, :] * interval[:, None] * DAY).astype(np.int64)
+    window_start = np.maximum(projected - LOW_HANDICAP_WINDOW_DAYS * DAY - earliest, 0)  # Stay in the player's keys
+    position = np.searchsorted(key, np.arange(players)[:, None] * span + window_start)
+    inside = position < ends[:, None]
+    history_low = np.full((players, horizon), np.inf)
+    history_low[inside] = suffix_min[position[inside]]
+
+    return Histories(
+        player_ids=[str(pid) for pid in ids],
+        current_index=np.array(index, dtype=np.float64)[first] if players else np.zeros(0),
+        window=window,
+        counts=np.minimum(counts_all, WINDOW),
+        pool=pool,
+        pool_start=pool_start,
+        pool_size=pool_size,
+        interval_days=interval,
+        history_low=history_low,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+
+def _expire_low(running_low: np.ndarray, projected: np.ndarray, previous: np.ndarray, start: np.ndarray,
+                done: int) -> None:
+    """
+    Drop projected rounds [previous, start) of each player from running_low
+    (players, sims), given the first `done` projected indexes. Only the
+    cells whose minimum was one of those rounds are recomputed.
+    """
+    expired = np.full(running_low.shape, np.inf)
+    for k in range(int((start - previous).max(initial=0))):
+        column = np.minimum(previous + k, done - 1)
+        value = np.take_along_axis(projected, column[:, None, None], axis=2)[..., 0]
+        expired = np.where((previous + k < start)[:, None], np.minimum(expired, value), expired)
+    player, sim = np.nonzero(expired <= running_low)
+    if len(player):
+        live = np.arange(done)[None, :] >= start[player][:, None]
+        running_low[player, sim] = np.where(live, projected[player, sim, :done], np.inf).min(axis=1)
+
+
+def simulate(h: Histories, rows: np.ndarray, target: float, horizon: int, sims: int,
+             rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Project the players at `rows` of the histories; one array per output, in `rows` order."""
+    chunk = len(rows)
+    window = np.repeat(h.window[rows][:, None, :], sims, axis=1)
+    counts = h.counts[rows]
+    pool_start = h.pool_start[rows][:, None]
+    pool_size = h.pool_size[rows][:, None]
+    running_low = np.full((chunk, sims), np.inf)  # Low HI of the projected rounds in the window
+    # Projected rounds leave the Low HI 365 days after their projected date,
+    # as past rounds do in history_low: first_live[r, t] is the first
+    # projected round (0-based) still inside the window of round t
+    offsets = (np.arange(1, horizon + 1)[None, :] * h.interval_days[rows][:, None] * DAY).astype(np.int64)
+    first_live = (offsets[:, None, :] < (offsets - LOW_HANDICAP_WINDOW_DAYS * DAY)[:, :, None]).sum(axis=2)
+    expiring = bool(first_live.any())
+    projected = np.full((chunk, sims, horizon), np.inf) if expiring else None
+    reached_at = np.zeros((chunk, sims), dtype=np.int64)
+    index = np.repeat(h.current_index[rows][:, None], sims, axis=1)
+
+    for step in range(1, horizon + 1):
+        draws = h.pool[pool_start + (rng.random((chunk, sims)) * pool_size).astype(np.int64)]
+        # The window is a ring: slot (step - 1) % 20 holds the oldest
+        # differential (or padding), and order within it does not matter
+        window[..., (step - 1) % WINDOW] = draws
+        counts = np.minimum(counts + 1, WINDOW)
+        if expiring and step > 1:
+            _expire_low(running_low, projected, first_live[:, step - 2], first_live[:, step - 1], step - 1)
+        low = np.minimum(h.history_low[rows, step - 1][:, None], running_low)
+        index = apply_caps(handicap_index(window, counts), low)
+        running_low = np.minimum(running_low, index)
+        if expiring:
+            projected[..., step - 1] = index
+        reached_at[(reached_at == 0) & (index <= target)] = step
+
+    reached = reached_at > 0
+    hits = reached.sum(axis=1)
+    return {
+        "probability": hits / sims,
+        "expected_rounds": np.where(hits > 0, np.where(reached, reached_at, 0).sum(axis=1) / np.maximum(hits, 1),
+                                    np.nan),
+        "final": np.percentile(index, [10, 50, 90], axis=1).T,
+    }
+
+
+def project(h: Histories, target: float, horizon: int, sims: int, seed: int) -> List[dict]:
+    """Results for every player of the histories."""
+    rng = np.random.default_rng(seed)
+    results: List[Optional[dict]] = [None] * len(h.player_ids)
+    active = np.flatnonzero((h.current_index > target) & (h.pool_size > 0))
+    active = active[np.argsort(-h.counts[active], kind="stable")]  # Full windows first, see handicap_index
+    for row in np.flatnonzero(~np.isin(np.arange(len(h.player_ids)), active)):
+        done = bool(h.current_index[row] <= target)
+        results[row] = {"probability": 1.0 if done else 0.0, "expectedRounds": 0 if done else None,
+                        "expectedDays": 0 if done else None, "indexAfter": None}
+
+    # Players whose projection outlasts the Low HI window also keep every projected index (simulate)
+    width = WINDOW + (horizon if (h.interval_days[active] * horizon > LOW_HANDICAP_WINDOW_DAYS).any() else 0)
+    per_chunk = max(1, CHUNK_CELLS // (sims * width))
+    for start in range(0, len(active), per_chunk):
+        rows = active[start:start + per_chunk]
+        out = simulate(h, rows, target, horizon, sims, rng)
+        for i, row in enumerate(rows):
+            expected = out["expected_rounds"][i]
+            results[row] = {
+                "probability": round(float(out["probability"][i]), 4),
+                "expectedRounds": None if np.isnan(expected) else round(float(expected), 1),
+                "expectedDays": None if np.isnan(expected) else round(float(expected * h.interval_days[row])),
+                "indexAfter": {name: round(float(value), 1)
+                               for name, value in zip(("p10", "p50", "p90"), out["final"][i])},
+            }
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def open_store(path: str) -> sqlite3.Connection:
+    store = sqlite3.connect(path, isolation_level=None)
+    store.execute("pragma journal_mode = wal")
+    store.executescript(STORE_SCHEMA)
+    return store
+
+
+def run(store: sqlite3.Connection, source: sqlite3.Connection, target: float, horizon: int, sims: int,
+        seed: int, force: bool = False) -> int:
+    """Project every player whose rounds or the parameters changed; returns how many were simulated."""
+    params = json.dumps({"target": target, "rounds": horizon, "sims": sims, "seed": seed}, sort_keys=True)
+    fingerprints = player_fingerprints(source)
+    cached = {player_id: (fingerprint, cached_params)
+              for player_id, fingerprint, cached_params in store.execute(
+                  "select player_id, fingerprint, params from projection")}
+    stale = sorted(player_id for player_id, fingerprint in fingerprints.items()
+                   if force or cached.get(player_id) != (fingerprint, params))
+    gone = [player_id for player_id in cached if player_id not in fingerprints]
+
+    started = time.perf_counter()
+    histories = load_histories(source, stale, horizon)
+    loaded = time.perf_counter()
+    results = project(histories, target, horizon, sims, seed)
+    simulated = time.perf_counter()
+
+    computed_at = datetime.now().isoformat(timespec="seconds")
+    store.execute("begin")
+    store.executemany("delete from projection where player_id = ?", ((player_id,) for player_id in gone))
+    store.executemany(
+        "insert or replace into projection values (?, ?, ?, ?, ?)",
+        ((player_id, fingerprints[player_id], params, computed_at,
+          json.dumps({"target": target, "currentIndex": float(index), "roundsPerProjection": horizon, **result}))
+         for player_id, index, result in zip(histories.player_ids, histories.current_index, results)))
+    store.execute("commit")
+
+    print(f"{len(fingerprints)} players: {len(stale)} projected, {len(fingerprints) - len(stale)} cached, "
+          f"{len(gone)} removed")
+    print(f"Loaded in {loaded - started:.2f}s, simulated {len(stale)} x {sims} x {horizon} rounds "
+          f"in {simulated - loaded:.2f}s")
+    return len(stale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo projection of handicap goals")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Project every player with new rounds")
+    run_parser.add_argument("source", help="sqlite database with the app's round and profile tables")
+    run_parser.add_argument("--target", type=float, default=0.0, help="Goal index (default: scratch)")
+    run_parser.add_argument("--rounds", type=int, default=40, help="Rounds projected ahead")
+    run_parser.add_argument("--sims", type=int, default=1000, help="Simulated futures per player")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--force", action="store_true", help="Ignore the cache")
+    run_parser.add_argument("--store", default=DEFAULT_STORE)
+    show_parser = subparsers.add_parser("show", help="Print one player's cached projection")
+    show_parser.add_argument("player_id")
+    show_parser.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        if not os.path.isfile(args.store):
+            print(f"Error: {args.store} not found")
+            sys.exit(1)
+        row = open_store(args.store).execute(
+            "select computed_at, result from projection where player_id = ?", (args.player_id,)).fetchone()
+        if row is None:
+            print(f"Error: no projection for {args.player_id}")
+            sys.exit(1)
+        print(json.dumps({"computedAt": row[0], **json.loads(row[1])}, indent=2))
+        return
+
+    if not os.path.isfile(args.source):
+        print(f"Error: {args.source} not found")
+        sys.exit(1)
+    if args.rounds < 1 or args.sims < 1:
+        print("Error: --rounds and --sims must be positive")
+        sys.exit(1)
+    run(open_store(args.store), sqlite3.connect(args.source), args.target, args.rounds, args.sims, args.seed,
+        args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the course-ingest tools.
+
+Usage:
+    python scripts/ingest.py parse [--transposed]
+    python scripts/ingest.py batch [--transposed] [--out-dir scripts/sql] [--cache-dir .parse-cache] < records.txt
+    python scripts/ingest.py import-csv courses.csv [--out-dir scripts/sql] [--cache-dir .parse-cache]
+    python scripts/ingest.py extract PAGES... [--out-dir extracted] [--kind golfpass|transposed] [--jobs N]
+    python scripts/ingest.py fetch-osm [--out scotland_golf_courses.csv]
+    python scripts/ingest.py fetch-osm GB-ENG GB-WLS NO SE [--out-dir osm_harvest] [--concurrency 4] [--tile-deg 2] [--fresh]
+    python scripts/ingest.py fetch-osm GB-SCT NO --incremental [--fresh]
+    python scripts/ingest.py crawl scotland_golf_courses.csv [--stage-dir scorecard_staging] [--concurrency 100] [--per-host 2]
+    python scripts/ingest.py validate [--sql-dir scripts/sql] [--no-warnings]
+    python scripts/ingest.py catalog [--sql-dir scripts/sql] [--store .course-store]
+    python scripts/ingest.py diff NEW.sql [--against OLD.sql | --snapshot course.json]
+    python scripts/ingest.py match scotland_golf_courses.csv [--catalog-csv catalog.csv] [--out-dir course_match]
+    python scripts/ingest.py seed
+    python scripts/ingest.py queue-load [--target standin|supabase] [--players 500] [--rate 0] [--compare baseline.json]
+    python scripts/ingest.py player-stats build|refresh SOURCE.sqlite [--store player_stats.sqlite]
+    python scripts/ingest.py course-difficulty build|refresh SOURCE.sqlite [--store course_difficulty.sqlite]
+    python scripts/ingest.py pcc DATABASE.sqlite [--date 2026-05-02] [--days 1] [--all]
+    python scripts/ingest.py project-goals SOURCE.sqlite [--target 0.0] [--rounds 40] [--sims 1000]
+    python scripts/ingest.py find-duplicates [--sql-dir scripts/sql] [--out course_duplicates.csv] [--min-score 0.8]
+    python scripts/ingest.py bundle publish|info|verify [--sql-dir scripts/sql] [--out .course-bundles]
+    python scripts/ingest.py nine-hole DATABASE.sqlite [--tee ID ...] [--out changes.csv] [--enqueue] [--sql enqueue.sql]
+    python scripts/ingest.py startup [--runs 20] [--budget-ms 50]
+
+The tools are invoked thousands of times from batch scripts, so this module
+imports nothing beyond the standard library's argument parsing. Each
+subcommand imports the modules it needs when it runs; `requests` (fetch-osm),
+aiohttp (crawl) and NumPy (catalog --store) are never loaded by the light subcommands.
+`startup` times the light subcommands doing a small real job (one course
+through batch, import-csv, extract, validate, catalog, diff and match), so
+their lazy imports are paid as they are in use, and checks each one's time
+over the bare interpreter against the budget. `parse` is interactive and
+loads the same parser as batch; `seed` only starts build-seed.sh, which
+rewrites supabase/seed.sql; neither is run.
+"""
+
+import argparse
+import os
+import sys
+from typing import Optional
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Inputs for `startup`'s runs of the light subcommands: one small course in each format
+STARTUP_GOLFPASS = """name: Startup Golf Club
+city: Aberdour
+country: Scotland
+unit: y
+Hole    1    2    3    4    5    6    7    8    9    10    11    12    13    14    15    16    17    18
+White M: 66.6/120    160    159    300    310    320    330    340    350    360    160    159    300    310    320    330    340    350    360
+Par    3    3    4    4    4    4    4    4    4    3    3    4    4    4    4    4    4    4
+Handicap    1    2    3    4    5    6    7    8    9    10    11    12    13    14    15    16    17    18
+"""
+STARTUP_CSV = """name,Startup Golfklubb
+city,Asker
+country,Norway
+unit,m
+tee,48 (Gul),m,"69,1",130
+Hull,48 (Gul),Hcp,Par
+1,276,9,4
+2,300,1,4
+3,150,5,3
+4,400,3,5
+5,276,7,4
+6,300,2,4
+7,150,6,3
+8,400,4,5
+9,276,8,4
+"""
+STARTUP_HTML = """<html><head><title>Startup Golfklubb</title></head><body><h1>Startup Golfklubb</h1>
+<table><tr><th>Hull</th><th>48</th><th>Hcp</th><th>Par</th></tr>
+<tr><td>1</td><td>276</td><td>9</td><td>4</td></tr><tr><td>2</td><td>300</td><td>1</td><td>4</td></tr></table>
+</body></html>
+"""
+STARTUP_OSM_CSV = "Club Name,Course Name,Website,Lat,Lon\nStartup Golf Club,Startup,,56.05,-3.29\n"
+
+
+def cmd_parse(args: argparse.Namespace) -> int:
+    if args.transposed:
+        import parse_scorecard_transposed as parser_module
+    else:
+        import parse_scorecard as parser_module
+    parser_module.main([])
+    return 0
+
+
+def cmd_batch(args: argparse.Namespace) -> int:
+    if args.transposed:
+        import parse_scorecard_transposed as parser_module
+    else:
+        import parse_scorecard as parser_module
+
+    argv = ["--stream"]
+    if args.out_dir:
+        argv += ["--out-dir", args.out_dir]
+    if args.cache_dir:
+        argv += ["--cache-dir", args.cache_dir, "--cache-max-mb", str(args.cache_max_mb)]
+    parser_module.main(argv)
+    return 0
+
+
+def cmd_import_csv(args: argparse.Namespace) -> int:
+    import scorecard_csv
+
+    argv = list(args.files)
+    if args.out_dir:
+        argv += ["--out-dir", args.out_dir]
+    if args.cache_dir:
+        argv += ["--cache-dir", args.cache_dir, "--cache-max-mb", str(args.cache_max_mb)]
+    scorecard_csv.main(argv)
+    return 0
+
+
+def cmd_extract(args: argparse.Namespace) -> int:
+    import scorecard_html
+
+    argv = args.paths + ["--kind", args.kind]
+    if args.out_dir:
+        argv += ["--out-dir", args.out_dir]
+    if args.jobs:
+        argv += ["--jobs", str(args.jobs)]
+    scorecard_html.main(argv)
+    return 0
+
+
+def cmd_fetch_osm(args: argparse.Namespace) -> int:
+    if args.incremental:
+        import osm_sync
+
+        argv = (args.regions or ["GB-SCT"]) + ["--out-dir", args.out_dir, "--concurrency", str(args.concurrency)]
+        if args.tile_deg:
+            argv += ["--tile-deg", str(args.tile_deg)]
+        if args.fresh:
+            argv.append("--full")
+        osm_sync.main(argv)
+        return 0
+
+    if args.regions:
+        import osm_harvest
+
+        argv = args.regions + ["--out-dir", args.out_dir, "--concurrency", str(args.concurrency)]
+        if args.tile_deg:
+            argv += ["--tile-deg", str(args.tile_deg)]
+        if args.fresh:
+            argv.append("--fresh")
+        osm_harvest.main(argv)
+        return 0
+
+    import scotland
+
+    scotland.main(args.out)
+    return 0
+
+
+def cmd_crawl(args: argparse.Namespace) -> int:
+    import scorecard_crawl
+
+    argv = ["crawl", args.sites, "--stage-dir", args.stage_dir, "--concurrency", str(args.concurrency),
+            "--per-host", str(args.per_host), "--max-pages", str(args.max_pages), "--timeout", str(args.timeout)]
+    if args.connect_to:
+        argv += ["--connect-to", args.connect_to]
+    scorecard_crawl.main(argv)
+    return 0
+
+
+def cmd_validate(args: argparse.Namespace) -> int:
+    import sql_validator
+
+    argv = [args.sql_dir]
+    if args.jobs:
+        argv += ["--jobs", str(args.jobs)]
+    if args.no_warnings:
+        argv.append("--no-warnings")
+    sql_validator.main(argv)
+    return 0
+
+
+def cmd_catalog(args: argparse.Namespace) -> int:
+    from course_catalog import load_catalog
+
+    courses = load_catalog(args.sql_dir)
+
+    if args.store:
+        from course_store import write_store
+
+        manifest = write_store(courses, args.store, source=args.sql_dir)
+        print(f"Wrote {manifest['courses']} courses, {manifest['tees']} tees, "
+              f"{manifest['holes']} holes to {args.store}")
+        return 0
+
+    for course in courses:
+        print(f"{course.name}\t{course.city}\t{course.country}\t{len(course.tees)} tees")
+    print(f"{len(courses)} courses", file=sys.stderr)
+    return 0
+
+
+def cmd_diff(args: argparse.Namespace) -> int:
+    import course_diff
+
+    argv = [args.new, "--sql-dir", args.sql_dir]
+    for option in ("against", "snapshot", "out"):
+        if getattr(args, option):
+            argv += [f"--{option}", getattr(args, option)]
+    course_diff.main(argv)
+    return 0
+
+
+def cmd_match(args: argparse.Namespace) -> int:
+    import course_matcher
+
+    argv = [args.osm_csv, "--sql-dir", args.sql_dir, "--out-dir", args.out_dir]
+    if args.catalog_csv:
+        argv += ["--catalog-csv", args.catalog_csv]
+    course_matcher.main(argv)
+    return 0
+
+
+def cmd_seed(args: argparse.Namespace) -> int:
+    import subprocess
+
+    return subprocess.call(["bash", os.path.join(SCRIPT_DIR, "build-seed.sh")])
+
+
+def cmd_queue_load(args: argparse.Namespace) -> int:
+    import queue_load
+
+    argv = ["--target", args.target, "--players", str(args.players),
+            "--rounds-per-player", str(args.rounds_per_player), "--rate", str(args.rate),
+            "--interval", str(args.interval), "--batch-size", str(args.batch_size)]
+    if args.save:
+        argv += ["--save", args.save]
+    if args.compare:
+        argv += ["--compare", args.compare, "--tolerance", str(args.tolerance)]
+        if args.time_tolerance is not None:
+            argv += ["--time-tolerance", str(args.time_tolerance)]
+    queue_load.main(argv)
+    return 0
+
+
+def cmd_player_stats(args: argparse.Namespace) -> int:
+    import player_stats
+
+    player_stats.main([args.action, args.source, "--store", args.store])
+    return 0
+
+
+def cmd_course_difficulty(args: argparse.Namespace) -> int:
+    import course_difficulty
+
+    course_difficulty.main([args.action, args.source, "--store", args.store])
+    return 0
+
+
+def cmd_pcc(args: argparse.Namespace) -> int:
+    import playing_conditions
+
+    argv = [args.database, "--days", str(args.days), "--min-scores", str(args.min_scores)]
+    if args.date:
+        argv += ["--date", args.date]
+    if args.all:
+        argv.append("--all")
+    playing_conditions.main(argv)
+    return 0
+
+
+def cmd_project_goals(args: argparse.Namespace) -> int:
+    import handicap_projection
+
+    argv = ["run", args.source, "--target", str(args.target), "--rounds", str(args.rounds), "--sims", str(args.sims),
+            "--store", args.store]
+    if args.force:
+        argv.append("--force")
+    handicap_projection.main(argv)
+    return 0
+
+
+def cmd_find_duplicates(args: argparse.Namespace) -> int:
+    import course_fingerprint
+
+    course_fingerprint.main(["--sql-dir", args.sql_dir, "--out", args.out, "--min-score", str(args.min_score)])
+    return 0
+
+
+def cmd_bundle(args: argparse.Namespace) -> int:
+    import course_bundle
+
+    argv = [args.action, "--out", args.out]
+    if args.action == "publish":
+        argv += ["--sql-dir", args.sql_dir]
+    course_bundle.main(argv)
+    return 0
+
+
+def cmd_nine_hole(args: argparse.Namespace) -> int:
+    import nine_hole_differentials
+
+    argv = [args.database]
+    for tee in args.tee or ():
+        argv += ["--tee", str(tee)]
+    if args.out:
+        argv += ["--out", args.out]
+    if args.enqueue:
+        argv.append("--enqueue")
+    if args.sql:
+        argv += ["--sql", args.sql]
+    nine_hole_differentials.main(argv)
+    return 0
+
+
+def startup_runs(work_dir: str) -> list[tuple[str, list[str], Optional[str]]]:
+    """(label, ingest arguments, stdin file) of each light subcommand's timed run, with its inputs in work_dir."""
+    files = {"golfpass.txt": STARTUP_GOLFPASS, "courses.csv": STARTUP_CSV, "page.html": STARTUP_HTML,
+             "osm.csv": STARTUP_OSM_CSV}
+    for name, text in files.items():
+        with open(os.path.join(work_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+    path = lambda name: os.path.join(work_dir, name)  # noqa: E731
+    sql_dir = path("sql")
+    course_sql = os.path.join(sql_dir, "startup_golf_club.sql")
+    return [
+        ("batch", ["batch", "--out-dir", sql_dir], path("golfpass.txt")),
+        ("import-csv", ["import-csv", path("courses.csv")], None),
+        ("extract", ["extract", path("page.html"), "--kind", "transposed", "--jobs", "1"], None),
+        ("validate", ["validate", "--sql-dir", sql_dir, "--jobs", "1"], None),
+        ("catalog", ["catalog", "--sql-dir", sql_dir], None),
+        ("diff", ["diff", course_sql, "--against", course_sql, "--sql-dir", sql_dir], None),
+        ("match", ["match", path("osm.csv"), "--sql-dir", sql_dir, "--out-dir", path("match")], None),
+    ]
+
+
+def cmd_startup(args: argparse.Namespace) -> int:
+    import statistics
+    import subprocess
+    import tempfile
+    import time
+
+    def run_ms(command: list[str], stdin_path: Optional[str] = None) -> float:
+        stdin = open(stdin_path, "rb") if stdin_path else subprocess.DEVNULL
+        started = time.perf_counter()
+        try:
+            subprocess.run(command, stdin=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+                           env=env)
+        finally:
+            if stdin_path:
+                stdin.close()
+        return (time.perf_counter() - started) * 1000
+
+    with tempfile.TemporaryDirectory(prefix="ingest-startup-") as work_dir:
+        # Batch scripts run the tools with their modules' bytecode cached, as
+        # Python keeps it by default; compiling them again on every run (with
+        # PYTHONDONTWRITEBYTECODE set) would be billed to each subcommand. The
+        # cache goes to the work dir, and an untimed first run fills it.
+        env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+        env["PYTHONPYCACHEPREFIX"] = os.path.join(work_dir, "pycache")
+
+        # The bare interpreter sets the floor; site-packages .pth hooks alone
+        # can eat most of the budget on some machines, so the budget is on top
+        # of it. It is timed in turn with each subcommand's runs, so load that
+        # comes and goes meanwhile shifts both sides of the difference alike.
+        bare = [sys.executable, "-c", "pass"]
+        baseline = statistics.median(run_ms(bare) for _ in range(args.runs))
+        print(f"Startup time over {args.runs} runs (budget {args.budget_ms:.0f} ms over the interpreter):")
+        print(f"  - {'python':<10} median {baseline:6.1f} ms  (interpreter alone)")
+
+        over_budget = False
+        for name, argv, stdin_path in startup_runs(work_dir):
+            command = [sys.executable, os.path.abspath(__file__)] + argv
+            timings, bare_timings = [], []
+            try:
+                run_ms(command, stdin_path)
+                for _ in range(args.runs):
+                    bare_timings.append(run_ms(bare))
+                    timings.append(run_ms(command, stdin_path))
+            except subprocess.CalledProcessError as e:
+                print(f"Error: `ingest {' '.join(argv)}` failed with exit status {e.returncode}")
+                return 1
+            median = statistics.median(timings)
+            overhead = median - statistics.median(bare_timings)
+            status = "ok" if overhead <= args.budget_ms else "OVER BUDGET"
+            over_budget = over_budget or overhead > args.budget_ms
+            print(f"  - {name:<10} median {median:6.1f} ms  min {min(timings):6.1f} ms  "
+                  f"(+{overhead:.1f} ms over python)  {status}")
+
+    return 1 if over_budget else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ingest", description="Course-ingest tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_parser = subparsers.add_parser("parse", help="Interactively convert one scorecard to SQL")
+    parse_parser.add_argument("--transposed", action="store_true",
+                              help="Holes-as-rows (Norwegian-style) table instead of GolfPass")
+    parse_parser.set_defaults(handler=cmd_parse)
+
+    batch_parser = subparsers.add_parser("batch", help="Convert a stream of scorecard records from stdin")
+    batch_parser.add_argument("--transposed", action="store_true")
+    batch_parser.add_argument("--out-dir", help="Write one SQL file per course here instead of stdout")
+    batch_parser.add_argument("--cache-dir", help="Reuse cached results for unchanged scorecards")
+    batch_parser.add_argument("--cache-max-mb", type=float, default=256)
+    batch_parser.set_defaults(handler=cmd_batch)
+
+    import_parser = subparsers.add_parser("import-csv", help="Convert a multi-course transposed CSV/TSV file")
+    import_parser.add_argument("files", nargs="+")
+    import_parser.add_argument("--out-dir", help="Write one SQL file per course here instead of stdout")
+    import_parser.add_argument("--cache-dir", help="Reuse cached results for unchanged courses")
+    import_parser.add_argument("--cache-max-mb", type=float, default=256)
+    import_parser.set_defaults(handler=cmd_import_csv)
+
+    extract_parser = subparsers.add_parser("extract", help="Turn saved scorecard HTML pages into batch records")
+    extract_parser.add_argument("paths", nargs="+", help="HTML files or directories of them")
+    extract_parser.add_argument("--kind", choices=("golfpass", "transposed"), default="golfpass",
+                                help="Records written to stdout (without --out-dir)")
+    extract_parser.add_argument("--out-dir", help="Write golfpass.txt and transposed.txt here")
+    extract_parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    extract_parser.set_defaults(handler=cmd_extract)
+
+    fetch_parser = subparsers.add_parser("fetch-osm", help="Harvest golf courses from OpenStreetMap")
+    fetch_parser.add_argument("regions", nargs="*",
+                              help="ISO 3166 codes or bboxes to harvest concurrently (default: Scotland)")
+    fetch_parser.add_argument("--out", default="scotland_golf_courses.csv")
+    fetch_parser.add_argument("--out-dir", default="osm_harvest", help="Per-region and merged CSVs")
+    fetch_parser.add_argument("--concurrency", type=int, default=4)
+    fetch_parser.add_argument("--tile-deg", type=float, help="Split bbox regions into tiles of this size")
+    fetch_parser.add_argument("--fresh", action="store_true", help="Ignore harvest checkpoints and refetch")
+    fetch_parser.add_argument("--incremental", action="store_true",
+                              help="Only fetch elements changed since the last --incremental run")
+    fetch_parser.set_defaults(handler=cmd_fetch_osm)
+
+    crawl_parser = subparsers.add_parser("crawl", help="Crawl club websites from an OSM CSV for scorecards")
+    crawl_parser.add_argument("sites", help="CSV with a Website column")
+    crawl_parser.add_argument("--stage-dir", default="scorecard_staging")
+    crawl_parser.add_argument("--concurrency", type=int, default=100, help="Clubs crawled at once")
+    crawl_parser.add_argument("--per-host", type=int, default=2, help="Requests in flight per host")
+    crawl_parser.add_argument("--max-pages", type=int, default=5, help="Candidate pages tried per club")
+    crawl_parser.add_argument("--timeout", type=float, default=20.0, help="Seconds per request")
+    crawl_parser.add_argument("--connect-to", help="Send every request to this HOST:PORT (a stand-in server)")
+    crawl_parser.set_defaults(handler=cmd_crawl)
+
+    validate_parser = subparsers.add_parser("validate", help="Check the course SQL files against the schema")
+    validate_parser.add_argument("--sql-dir", default="scripts/sql")
+    validate_parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    validate_parser.add_argument("--no-warnings", action="store_true", help="Only report errors")
+    validate_parser.set_defaults(handler=cmd_validate)
+
+    catalog_parser = subparsers.add_parser("catalog", help="List the course catalog or build its store")
+    catalog_parser.add_argument("--sql-dir", default="scripts/sql")
+    catalog_parser.add_argument("--store", help="Build the columnar store in this directory")
+    catalog_parser.set_defaults(handler=cmd_catalog)
+
+    diff_parser = subparsers.add_parser("diff", help="Minimal UPDATE SQL for a re-parsed course")
+    diff_parser.add_argument("new", help="Freshly generated course SQL file")
+    diff_parser.add_argument("--against", help="Existing course SQL file")
+    diff_parser.add_argument("--snapshot", help="Existing course as a JSON database snapshot")
+    diff_parser.add_argument("--sql-dir", default="scripts/sql")
+    diff_parser.add_argument("--out")
+    diff_parser.set_defaults(handler=cmd_diff)
+
+    match_parser = subparsers.add_parser("match", help="Split OSM rows into present / review / missing")
+    match_parser.add_argument("osm_csv", help="CSV written by fetch-osm")
+    match_parser.add_argument("--sql-dir", default="scripts/sql")
+    match_parser.add_argument("--catalog-csv", help="Catalog export instead of --sql-dir")
+    match_parser.add_argument("--out-dir", default="course_match")
+    match_parser.set_defaults(handler=cmd_match)
+
+    seed_parser = subparsers.add_parser("seed", help="Rebuild supabase/seed.sql")
+    seed_parser.set_defaults(handler=cmd_seed)
+
+    load_parser = subparsers.add_parser("queue-load", help="Load-test the handicap queue processor")
+    load_parser.add_argument("--target", choices=("standin", "supabase"), default="standin")
+    load_parser.add_argument("--players", type=int, default=500)
+    load_parser.add_argument("--rounds-per-player", type=int, default=20)
+    load_parser.add_argument("--rate", type=float, default=0, help="Rounds submitted per second (0 = burst)")
+    load_parser.add_argument("--interval", type=float, default=0, help="Seconds between processor invocations")
+    load_parser.add_argument("--batch-size", type=int, default=25)
+    load_parser.add_argument("--save", help="Write the report as JSON")
+    load_parser.add_argument("--compare", help="Fail on a regression against this saved report")
+    load_parser.add_argument("--tolerance", type=float, default=0.2)
+    load_parser.add_argument("--time-tolerance", type=float)
+    load_parser.set_defaults(handler=cmd_queue_load)
+
+    stats_parser = subparsers.add_parser("player-stats", help="Materialize player statistics")
+    stats_parser.add_argument("action", choices=("build", "refresh"))
+    stats_parser.add_argument("source", help="sqlite database with the app's round/score/hole/course/profile tables")
+    stats_parser.add_argument("--store", default="player_stats.sqlite")
+    stats_parser.set_defaults(handler=cmd_player_stats)
+
+    difficulty_parser = subparsers.add_parser("course-difficulty", help="Aggregate course and tee difficulty")
+    difficulty_parser.add_argument("action", choices=("build", "refresh"))
+    difficulty_parser.add_argument("source", help="sqlite database with the app's round/score/hole/teeInfo tables")
+    difficulty_parser.add_argument("--store", default="course_difficulty.sqlite")
+    difficulty_parser.set_defaults(handler=cmd_course_difficulty)
+
+    pcc_parser = subparsers.add_parser("pcc", help="Daily playing conditions calculation per course and tee")
+    pcc_parser.add_argument("database", help="sqlite database with the app's round table")
+    pcc_parser.add_argument("--date", help="Last day of the window (default: yesterday)")
+    pcc_parser.add_argument("--days", type=int, default=1)
+    pcc_parser.add_argument("--all", action="store_true", help="Every day in the database")
+    pcc_parser.add_argument("--min-scores", type=int, default=8)
+    pcc_parser.set_defaults(handler=cmd_pcc)
+
+    goals_parser = subparsers.add_parser("project-goals", help="Monte Carlo projection of handicap goals")
+    goals_parser.add_argument("source", help="sqlite database with the app's round and profile tables")
+    goals_parser.add_argument("--target", type=float, default=0.0)
+    goals_parser.add_argument("--rounds", type=int, default=40)
+    goals_parser.add_argument("--sims", type=int, default=1000)
+    goals_parser.add_argument("--force", action="store_true", help="Ignore the cache")
+    goals_parser.add_argument("--store", default="handicap_projection.sqlite")
+    goals_parser.set_defaults(handler=cmd_project_goals)
+
+    duplicates_parser = subparsers.add_parser("find-duplicates", help="Find duplicate courses by their hole layouts")
+    duplicates_parser.add_argument("--sql-dir", default="scripts/sql")
+    duplicates_parser.add_argument("--out", default="course_duplicates.csv")
+    duplicates_parser.add_argument("--min-score", type=float, default=0.8)
+    duplicates_parser.set_defaults(handler=cmd_find_duplicates)
+
+    bundle_parser = subparsers.add_parser("bundle", help="Versioned binary course bundles for offline clients")
+    bundle_parser.add_argument("action", choices=["publish", "info", "verify"])
+    bundle_parser.add_argument("--sql-dir", default="scripts/sql")
+    bundle_parser.add_argument("--out", default=".course-bundles")
+    bundle_parser.set_defaults(handler=cmd_bundle)
+
+    nine_hole_parser = subparsers.add_parser("nine-hole", help="Bulk 18-hole equivalent differentials of 9-hole rounds")
+    nine_hole_parser.add_argument("database", help="sqlite database with the app's round and teeInfo tables")
+    nine_hole_parser.add_argument("--tee", type=int, action="append")
+    nine_hole_parser.add_argument("--out")
+    nine_hole_parser.add_argument("--enqueue", action="store_true")
+    nine_hole_parser.add_argument("--sql")
+    nine_hole_parser.set_defaults(handler=cmd_nine_hole)
+
+    startup_parser = subparsers.add_parser("startup", help="Measure startup time of the light subcommands")
+    startup_parser.add_argument("--runs", type=int, default=20)
+    startup_parser.add_argument("--budget-ms", type=float, default=50.0,
+                                help="Allowed time per run over the bare interpreter")
+    startup_parser.set_defaults(handler=cmd_startup)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
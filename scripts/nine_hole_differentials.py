@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Bulk 18-hole equivalent differentials of every 9-hole round.
+
+handicap-core scores a 9-hole round (USGA Rule 5.1b) one round at a time in
+computeHandicapTimeline: the played nine's differential from the tee's
+per-nine rating, slope and par (courseRatingFront9/slopeRatingFront9/outPar,
+or the Back9 columns and inPar for nine_hole_section = 'back'), plus
+calculateExpected9HoleDifferential for the unplayed nine at the player's
+index going into the round, rounded as calculate9HoleScoreDifferential
+does. Only the queue processor does that, one player at a time, so finding
+out which rounds a backfill or a rating correction on 9-hole courses
+actually moves means replaying every affected player. The generators also
+still write a 9-hole course as a duplicated 18-hole layout whose front and
+back ratings are estimated as course_rating_18 / 2 with the 18-hole slope,
+so corrections to those tees are routine.
+
+This pairs every eligible 9-hole round (approved, not quarantined) with its
+expected nine and recomputes all of them together:
+
+  1. one query loads the rounds with the played nine's rating, slope and par
+  2. each distinct nine (rating, slope, par) gets a table of expected
+     differentials over every index from -10.0 to 54.0 in tenths, computed
+     with the operations and JS rounding of the TypeScript, and each round
+     looks its expected differential up by nine and index
+  3. played and expected differentials are combined and rounded as arrays
+
+A round changed when its differential differs from the stored one before
+ESR (scoreDifferential + exceptionalScoreAdjustment). The index is the
+stored existingHandicapIndex; the processor uses its uncapped rolling index,
+so after a cap the two can differ and a round reads as changed when it is
+not. Only the processor writes differentials, because each one feeds the
+indexes after it: --enqueue puts the players with a changed round on
+handicap_calculation_queue in one transaction (the 'nine_hole_rating_fix'
+upsert of the migration that introduced the per-nine ratings), and --sql
+writes the same upsert for the production database.
+
+--synthetic builds a stand-in database (the queue_load.py schema plus the
+per-nine teeInfo columns) of 9-hole rounds scored on estimated ratings,
+corrects the ratings of some tees and checks the bulk result against a
+round-at-a-time port of the two handicap-core functions.
+
+Usage:
+    python scripts/nine_hole_differentials.py DATABASE.sqlite [--tee ID ...] [--out changes.csv]
+    python scripts/nine_hole_differentials.py DATABASE.sqlite --enqueue [--sql enqueue.sql]
+    python scripts/nine_hole_differentials.py --synthetic 100000 [--db nine-hole-standin.sqlite]
+"""
+
+import argparse
+import csv
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from course_diff import sql_literal
+from stats_store import standin_path, table_columns
+
+
+INDEX_MIN_TENTHS, INDEX_MAX_TENTHS = -100, 540  # Expected-differential tables cover -10.0 to 54.0
+CHANGE_TOLERANCE = 0.05  # Differentials are in tenths; anything closer is float noise
+ESTIMATE_TOLERANCE = 0.05  # Nine ratings within this of course_rating_18 / 2 count as the estimate
+EVENT_TYPE = "nine_hole_rating_fix"
+NINE_COLUMNS = ("courseRatingFront9", "slopeRatingFront9", "courseRatingBack9", "slopeRatingBack9", "outPar",
+                "inPar")
+
+CSV_COLUMNS = ["round_id", "user_id", "tee_id", "section", "existing_index", "adjusted_played_score",
+               "nine_rating", "nine_slope", "nine_par", "expected_differential", "stored_differential",
+               "differential", "final_differential"]
+
+
+@dataclass
+class NineHoleRounds:
+    round_id: np.ndarray
+    user_id: np.ndarray  # object array of profile ids
+    tee_id: np.ndarray
+    back: np.ndarray  # nine_hole_section = 'back'; null and 'front' are the front nine
+    index: np.ndarray  # existingHandicapIndex
+    adjusted_played: np.ndarray
+    stored: np.ndarray  # scoreDifferential + exceptionalScoreAdjustment, the differential before ESR
+    esr_offset: np.ndarray
+    rating: np.ndarray  # Of the nine played
+    slope: np.ndarray
+    par: np.ndarray
+    estimated: np.ndarray  # The tee's nine ratings are the course_rating_18 / 2 estimate
+
+
+@dataclass
+class ExpectedTables:
+    nines: np.ndarray  # (nines, 3): rating, slope, par
+    table: np.ndarray  # (nines, index steps): expected differential per index tenth
+
+
+@dataclass
+class NineHoleResult:
+    expected: np.ndarray
+    differential: np.ndarray  # 18-hole equivalent before ESR, as rawDifferential
+    final: np.ndarray  # After the stored ESR offset, as finalDifferential
+    changed: np.ndarray
+    nines: int
+
+
+# ---------------------------------------------------------------------------
+# Differentials
+# ---------------------------------------------------------------------------
+
+def js_round(values: np.ndarray) -> np.ndarray:
+    """Math.round: halves go up, including negative ones."""
+    return np.floor(values + 0.5)
+
+
+def round_differential(values: np.ndarray) -> np.ndarray:
+    """To tenths as calculate9HoleScoreDifferential does: negatives round towards zero."""
+    return np.where(values < 0, np.ceil(values * 10) / 10, js_round(values * 10) / 10)
+
+
+def expected_differential(index, rating, slope, par) -> np.ndarray:
+    """calculateExpected9HoleDifferential over arrays, in the TypeScript's order of operations."""
+    course_handicap = js_round((index / 2) * (slope / 113) + (rating - par))
+    return ((par + course_handicap) - rating) * (113 / slope)
+
+
+def nine_hole_differential(adjusted_played, rating, slope, expected) -> np.ndarray:
+    """calculate9HoleScoreDifferential over arrays."""
+    return round_differential((adjusted_played - rating) * (113 / slope) + expected)
+
+
+def index_grid() -> np.ndarray:
+    # Tenths divided by ten give the same doubles as the decimal indexes the processor reads
+    return np.arange(INDEX_MIN_TENTHS, INDEX_MAX_TENTHS + 1) / 10
+
+
+def build_tables(rating: np.ndarray, slope: np.ndarray, par: np.ndarray) -> tuple:
+    """Expected-differential tables of the distinct nines; returns them and each row's nine."""
+    nines, inverse = np.unique(np.column_stack([rating, slope, par]), axis=0, return_inverse=True)
+    table = expected_differential(index_grid()[None, :], nines[:, 0:1], nines[:, 1:2], nines[:, 2:3])
+    return ExpectedTables(nines=nines, table=table), inverse.reshape(-1)
+
+
+def lookup_expected(tables: ExpectedTables, nine: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Each round's expected differential; indexes off the table's grid are computed directly."""
+    tenths = np.rint(index * 10)
+    on_grid = (tenths / 10 == index) & (tenths >= INDEX_MIN_TENTHS) & (tenths <= INDEX_MAX_TENTHS)
+    expected = np.empty(len(index))
+    expected[on_grid] = tables.table[nine[on_grid], tenths[on_grid].astype(np.int64) - INDEX_MIN_TENTHS]
+    off = ~on_grid
+    if off.any():
+        rows = tables.nines[nine[off]]
+        expected[off] = expected_differential(index[off], rows[:, 0], rows[:, 1], rows[:, 2])
+    return expected
+
+
+def compute(rounds: NineHoleRounds) -> NineHoleResult:
+    tables, nine = build_tables(rounds.rating, rounds.slope, rounds.par)
+    expected = lookup_expected(tables, nine, rounds.index)
+    differential = nine_hole_differential(rounds.adjusted_played, rounds.rating, rounds.slope, expected)
+    return NineHoleResult(
+        expected=expected,
+        differential=differential,
+        final=differential - rounds.esr_offset,
+        changed=np.abs(differential - rounds.stored) > CHANGE_TOLERANCE,
+        nines=len(tables.nines),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+
+def load_rounds(db: sqlite3.Connection, tee_ids: Optional[Sequence[int]] = None) -> NineHoleRounds:
+    round_columns = table_columns(db, "round")
+    if "holes_played" not in round_columns:
+        raise ValueError("round has no holes_played column, so 9-hole rounds cannot be told apart")
+    missing = [c for c in NINE_COLUMNS if c not in table_columns(db, "teeInfo")]
+    if missing:
+        raise ValueError(f"teeInfo has no per-nine columns ({', '.join(missing)})")
+
+    filters = ["r.holes_played = 9"]
+    params: list = []
+    if "approvalStatus" in round_columns:
+        filters.append("r.\"approvalStatus\" = 'approved'")
+    if "quarantined" in round_columns:
+        filters.append("not r.quarantined")
+    if tee_ids:
+        filters.append(f'r."teeId" in ({",".join("?" * len(tee_ids))})')
+        params += list(tee_ids)
+    section = "r.nine_hole_section = 'back'" if "nine_hole_section" in round_columns else "0"
+
+    rows = db.execute(
+        f'select r.id, r."userId", r."teeId", {section}, r."existingHandicapIndex", r."adjustedPlayedScore", '
+        f'r."scoreDifferential" + r."exceptionalScoreAdjustment", r."exceptionalScoreAdjustment", '
+        f't."courseRatingFront9", t."slopeRatingFront9", t."courseRatingBack9", t."slopeRatingBack9", '
+        f't."outPar", t."inPar", t."courseRating18", t."slopeRating18" '
+        f'from round r join "teeInfo" t on t.id = r."teeId" where {" and ".join(filters)} order by r.id',
+        params).fetchall()
+    columns = list(zip(*rows)) if rows else [()] * 16
+    numeric = np.array(columns[3:], dtype=np.float64).reshape(13, -1)
+    back = numeric[0] == 1
+    front_rating, front_slope, back_rating, back_slope, out_par, in_par, rating_18, slope_18 = numeric[5:]
+    half_rating = rating_18 / 2
+    estimated = ((np.abs(front_rating - half_rating) <= ESTIMATE_TOLERANCE)
+                 & (np.abs(back_rating - half_rating) <= ESTIMATE_TOLERANCE)
+                 & (front_slope == slope_18) & (back_slope == slope_18))
+    return NineHoleRounds(
+        round_id=np.array(columns[0], dtype=np.int64),
+        user_id=np.array(columns[1], dtype=object),
+        tee_id=np.array(columns[2], dtype=np.int64),
+        back=back,
+        index=numeric[1],
+        adjusted_played=numeric[2],
+        stored=numeric[3],
+        esr_offset=numeric[4],
+        rating=np.where(back, back_rating, front_rating),
+        slope=np.where(back, back_slope, front_slope),
+        par=np.where(back, in_par, out_par),
+        estimated=estimated,
+    )
+
+
+def changed_players(rounds: NineHoleRounds, result: NineHoleResult) -> List[str]:
+    return sorted(set(rounds.user_id[result.changed].tolist()))
+
+
+def enqueue(db: sqlite3.Connection, players: List[str]) -> None:
+    """Queue the players for recalculation, as the nine_hole_rating_fix migration does, in one transaction."""
+    if "user_id" not in table_columns(db, "handicap_calculation_queue"):
+        raise ValueError("the database has no handicap_calculation_queue table")
+    with db:
+        db.executemany(
+            "insert into handicap_calculation_queue (user_id, event_type, status) values (?, ?, 'pending') "
+            "on conflict (user_id) do update set event_type = excluded.event_type, "
+            "last_updated = strftime('%Y-%m-%d %H:%M:%f', 'now'), status = 'pending', attempts = 0, "
+            "error_message = null",
+            ((player, EVENT_TYPE) for player in players))
+
+
+def enqueue_sql(players: List[str], rounds: int) -> str:
+    if not players:
+        return "-- No 9-hole round's differential changed; nothing to queue.\n"
+    values = ",\n    ".join(f"({sql_literal(player)})" for player in players)
+    return f"""-- {len(players)} player(s) with {rounds} 9-hole round(s) whose differential changed
+-- (scripts/nine_hole_differentials.py). Mirrors the nine_hole_rating_fix upsert.
+insert into public.handicap_calculation_queue (user_id, event_type, status)
+select v.user_id::uuid, '{EVENT_TYPE}', 'pending'
+from (values
+    {values}
+) as v(user_id)
+on conflict (user_id) do update set
+    event_type = excluded.event_type,
+    last_updated = now(),
+    status = 'pending',
+    attempts = 0,
+    error_message = null;
+"""
+
+
+def write_changes(path: str, rounds: NineHoleRounds, result: NineHoleResult) -> None:
+    rows = np.flatnonzero(result.changed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for i in rows.tolist():
+            writer.writerow([
+                int(rounds.round_id[i]), rounds.user_id[i], int(rounds.tee_id[i]),
+                "back" if rounds.back[i] else "front", float(rounds.index[i]), int(rounds.adjusted_played[i]),
+                float(rounds.rating[i]), int(rounds.slope[i]), int(rounds.par[i]),
+                round(float(result.expected[i]), 4), round(float(rounds.stored[i]), 1),
+                float(result.differential[i]), round(float(result.final[i]), 1),
+            ])
+
+
+def run(db: sqlite3.Connection, tee_ids: Optional[Sequence[int]] = None) -> tuple:
+    started = time.perf_counter()
+    rounds = load_rounds(db, tee_ids)
+    loaded = time.perf_counter()
+    result = compute(rounds)
+    computed = time.perf_counter()
+
+    total = len(rounds.round_id)
+    changed = int(result.changed.sum())
+    players = len(set(rounds.user_id.tolist()))
+    print(f"{total} 9-hole rounds of {players} players: {int(rounds.back.sum())} on a back nine, "
+          f"{result.nines} distinct nines")
+    print(f"  on tees with nine ratings estimated as course_rating_18 / 2: {int(rounds.estimated.sum())}")
+    print(f"  differential changed: {changed} rounds of {len(changed_players(rounds, result))} players")
+    if changed:
+        moved = result.differential[result.changed] - rounds.stored[result.changed]
+        print(f"  change: mean {moved.mean():+.2f}, largest {moved[np.argmax(np.abs(moved))]:+.1f}")
+        by_tee = Counter(rounds.tee_id[result.changed].tolist())
+        print("  most changed tees: " + ", ".join(f"{tee} ({n})" for tee, n in by_tee.most_common(5)))
+    print(f"Loaded in {loaded - started:.2f}s, computed in {computed - loaded:.3f}s")
+    return rounds, result
+
+
+# ---------------------------------------------------------------------------
+# Synthetic stand-in
+# ---------------------------------------------------------------------------
+
+def _js_round(value: float) -> float:
+    return math.floor(value + 0.5)
+
+
+def _expected_differential(index: float, rating: float, slope: int, par: int) -> float:
+    """calculateExpected9HoleDifferential, one round at a time."""
+    course_handicap = _js_round((index / 2) * (slope / 113) + (rating - par))
+    return (par + course_handicap - rating) * (113 / slope)
+
+
+def _nine_hole_differential(adjusted_played: int, rating: float, slope: int, expected: float) -> float:
+    """calculate9HoleScoreDifferential, one round at a time."""
+    combined = (adjusted_played - rating) * (113 / slope) + expected
+    if combined < 0:
+        return math.ceil(combined * 10) / 10
+    return _js_round(combined * 10) / 10
+
+
+def build_synthetic(path: str, rounds: int, seed: int = 7) -> dict:
+    """
+    A stand-in database with `rounds` 9-hole rounds scored on the nine
+    ratings their tees had, after which a third of the 9-hole courses' tees
+    get corrected ratings.
+
+    Returns each round's differential on the corrected ratings, computed one
+    round at a time.
+    """
+    from queue_load import STANDIN_SCHEMA
+
+    rng = random.Random(seed)
+    db = sqlite3.connect(path, isolation_level=None)
+    db.executescript(STANDIN_SCHEMA)
+    for column, kind in zip(NINE_COLUMNS, ("real", "integer", "real", "integer", "integer", "integer")):
+        db.execute(f'alter table "teeInfo" add column "{column}" {kind} not null default 0')
+    db.execute("drop trigger if exists enqueue_handicap_calculation")  # Enqueueing is part of the run
+    db.execute("begin")
+
+    tees = {}
+    for course in range(max(2, rounds // 250)):
+        nine_hole = course % 2 == 0
+        course_id = db.execute(
+            "insert into course (name, city, country, \"approvalStatus\") values (?, 'Town', 'Norway', 'approved')",
+            (f"Synthetic {'Nine' if nine_hole else 'Links'} {course + 1}",)).lastrowid
+        for name in ("White", "Yellow"):
+            rating_18 = round(rng.uniform(58.0, 74.5), 1)
+            slope_18 = rng.randint(95, 140)
+            out_par = rng.choice((34, 35, 36, 37))
+            if nine_hole:
+                # As the generators write it: duplicated layout, half the 18-hole rating, the 18-hole slope
+                in_par = out_par
+                front = back = (round(rating_18 / 2, 1), slope_18)
+            else:
+                in_par = rng.choice((35, 36, 37))
+                front_rating = round(rating_18 / 2 + rng.uniform(-0.6, 0.6), 1)
+                front = (front_rating, slope_18 + rng.randint(-6, 6))
+                back = (round(rating_18 - front_rating, 1), slope_18 + rng.randint(-6, 6))
+            tee_id = db.execute(
+                'insert into "teeInfo" ("courseId", name, gender, "courseRating18", "slopeRating18", "totalPar", '
+                '"approvalStatus", "courseRatingFront9", "slopeRatingFront9", "courseRatingBack9", '
+                '"slopeRatingBack9", "outPar", "inPar") values (?, ?, \'mens\', ?, ?, ?, \'approved\', '
+                '?, ?, ?, ?, ?, ?)',
+                (course_id, name, rating_18, slope_18, out_par + in_par, *front, *back, out_par, in_par)).lastrowid
+            tees[tee_id] = {"course": course_id, "nine_hole": nine_hole, "front": front, "back": back,
+                            "out": out_par, "in": in_par}
+
+    players = [f"synthetic-{i:06d}" for i in range(max(1, rounds // 12))]
+    db.executemany('insert into profile (id, email) values (?, ?)',
+                   ((player, f"{player}@example.invalid") for player in players))
+
+    first_day = date(2026, 4, 1)
+    tee_ids = list(tees)
+    round_rows = []
+    for i in range(rounds):
+        tee_id = rng.choice(tee_ids)
+        tee = tees[tee_id]
+        section = rng.choice(("front", "back")) if not tee["nine_hole"] else rng.choice((None, "front"))
+        rating, slope = tee["back"] if section == "back" else tee["front"]
+        par = tee["in"] if section == "back" else tee["out"]
+        index = round(rng.uniform(-4.0, 54.0), 1) if rng.random() > 0.01 else 54.0
+        adjusted_played = max(par - 4, round(rating + (index / 2 + rng.gauss(1.5, 2.5)) * slope / 113))
+        raw = _nine_hole_differential(adjusted_played, rating, slope,
+                                      _expected_differential(index, rating, slope, par))
+        esr = rng.choice((0,) * 18 + (1, 2))
+        tee_time = f"{(first_day + timedelta(days=rng.randrange(180))).isoformat()}T10:00:00"
+        round_rows.append((rng.choice(players), tee["course"], tee_id, tee_time, adjusted_played,
+                           adjusted_played, raw - esr, esr, index, section))
+    db.executemany(
+        'insert into round ("userId", "courseId", "teeId", "teeTime", "totalStrokes", "adjustedPlayedScore", '
+        '"scoreDifferential", "exceptionalScoreAdjustment", "existingHandicapIndex", nine_hole_section, '
+        '"parPlayed", "approvalStatus", holes_played) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 36, \'approved\', 9)',
+        round_rows)
+
+    corrected = [tee_id for tee_id, tee in tees.items() if tee["nine_hole"] and rng.random() < 1 / 3]
+    for tee_id in corrected:
+        tee = tees[tee_id]
+        rating = round(tee["front"][0] + rng.uniform(-0.8, 0.8), 1)
+        tee["front"] = tee["back"] = (rating, tee["front"][1] + rng.randint(-5, 5))
+        db.execute('update "teeInfo" set "courseRatingFront9" = ?, "slopeRatingFront9" = ?, '
+                   '"courseRatingBack9" = ?, "slopeRatingBack9" = ? where id = ?',
+                   (*tee["front"], *tee["back"], tee_id))
+    db.execute("commit")
+
+    expected = {}
+    for round_id, (_, _, tee_id, _, adjusted_played, _, _, _, index, section) in enumerate(round_rows, start=1):
+        tee = tees[tee_id]
+        rating, slope = tee["back"] if section == "back" else tee["front"]
+        par = tee["in"] if section == "back" else tee["out"]
+        expected[round_id] = _nine_hole_differential(adjusted_played, rating, slope,
+                                                     _expected_differential(index, rating, slope, par))
+    db.close()
+    print(f"Synthetic stand-in: {rounds} 9-hole rounds on {len(tees)} tees, ratings of {len(corrected)} "
+          f"tees corrected -> {path}")
+    return expected
+
+
+def report_agreement(rounds: NineHoleRounds, result: NineHoleResult, expected: dict) -> None:
+    """How the bulk differentials compare with the round-at-a-time ones."""
+    reference = np.array([expected[i] for i in rounds.round_id.tolist()])
+    mismatched = int(np.count_nonzero(reference != result.differential))
+    print(f"Against handicap-core one round at a time: {mismatched} of {len(reference)} differentials differ")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk 18-hole equivalent differentials of 9-hole rounds")
+    parser.add_argument("database", nargs="?", help="sqlite database with the app's round and teeInfo tables")
+    parser.add_argument("--tee", type=int, action="append", help="Only rounds on this tee (repeatable)")
+    parser.add_argument("--out", help="Write the rounds whose differential changed to this CSV")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="Queue the players with a changed round for recalculation")
+    parser.add_argument("--sql", help="Write the enqueue upsert for the production database to this file")
+    parser.add_argument("--synthetic", type=int, metavar="ROUNDS",
+                        help="Build a synthetic stand-in with this many 9-hole rounds and run on it")
+    parser.add_argument("--db", help="Keep the synthetic stand-in at this path")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        path, temporary = standin_path(args.db, "nine-hole-standin-")
+        expected = build_synthetic(path, args.synthetic)
+        with sqlite3.connect(path) as db:
+            rounds, result = run(db)
+        report_agreement(rounds, result, expected)
+        if temporary:
+            os.remove(path)
+        return
+
+    if not args.database:
+        parser.error("a database is required unless --synthetic is given")
+    if not os.path.isfile(args.database):
+        print(f"Error: {args.database} not found")
+        sys.exit(1)
+
+    with sqlite3.connect(args.database) as db:
+        try:
+            rounds, result = run(db, args.tee)
+            players = changed_players(rounds, result)
+            if args.enqueue:
+                enqueue(db, players)
+                print(f"Queued {len(players)} players for recalculation ({EVENT_TYPE})")
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    if args.out:
+        write_changes(args.out, rounds, result)
+        print(f"Changed rounds -> {args.out}")
+    if args.sql:
+        with open(args.sql, "w") as f:
+            f.write(enqueue_sql(players, int(result.changed.sum())))
+        print(f"Enqueue upsert for {len(players)} players -> {args.sql}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Harvest OSM golf courses for several regions at once.
+
+scotland.py fetches one region. This runs the same fetch for a list of
+regions concurrently, writes one CSV per region and a merged, deduplicated
+CSV, so a multi-country harvest takes about as long as its slowest region.
+
+A region is either an ISO 3166 code (GB-ENG, GB-WLS, NO, SE; GB-SCT reuses
+scotland.py's queries with their fallbacks) or a bbox "south,west,north,east",
+optionally labelled: "lofoten=67.8,12.8,68.5,15.0".
+
+Overpass mirrors throttle per client, so requests go through a shared
+EndpointRateLimiter: at most --per-endpoint requests in flight per mirror,
+spaced at least --min-interval seconds apart. Each region starts at a
+different mirror so concurrent regions spread over all of them.
+
+Large bbox regions can be split into --tile-deg tiles. Every region or tile
+is a unit of work whose elements are saved to the checkpoint directory as
+soon as it completes. A harvest that is interrupted or partly fails resumes
+from there on the next run: completed units are loaded, not fetched again.
+A unit's checkpoint is keyed by its queries, so changing a region's
+definition or tiling fetches it afresh. merged.csv is rebuilt from every
+region CSV in --out-dir, so a region that is incomplete this run, or not
+part of it, keeps its last rows there. --fresh ignores the checkpoints.
+For routine refreshes, osm_sync.py fetches only what changed since its last
+run; it writes the elements of the units it syncs back to their checkpoints,
+so a harvest after a sync starts from the synced state.
+
+Usage:
+    python scripts/osm_harvest.py GB-SCT GB-ENG GB-WLS NO SE [--out-dir osm_harvest] [--concurrency 4]
+    python scripts/osm_harvest.py nordics=54.5,4.5,71.2,31.6 --tile-deg 2
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from scotland import (
+    ENDPOINTS, QUERIES, bbox_query, build_rows, fetch_osm_data, iso_area_query, read_csv, row_key, write_csv,
+)
+
+
+DEFAULT_OUT_DIR = "osm_harvest"
+DEFAULT_CHECKPOINT_DIR = ".osm-checkpoint"
+MERGED_FILE = "merged.csv"
+
+ISO_CODE_PATTERN = re.compile(r"^[A-Z]{2}(-[A-Z0-9]{1,3})?$")
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.casefold()).strip("_")
+
+
+@dataclass
+class Region:
+    name: str
+    queries: List[str]
+    bbox: Optional[Tuple[float, float, float, float]] = None
+
+    @property
+    def slug(self) -> str:
+        return slugify(self.name)
+
+
+@dataclass
+class HarvestUnit:
+    """A region, or one tile of it, fetched and checkpointed as a whole."""
+    region: Region
+    label: str
+    queries: List[str]
+
+    @property
+    def key(self) -> str:
+        digest = hashlib.sha256("\0".join(self.queries).encode("utf-8")).hexdigest()
+        return f"{slugify(self.label)}-{digest[:16]}"
+
+
+def parse_region(spec: str) -> Region:
+    """Region from an ISO 3166 code or an optionally labelled bbox."""
+    spec = spec.strip()
+    label, _, bbox = spec.rpartition("=")
+
+    if "," in bbox:
+        try:
+            south, west, north, east = (float(v) for v in bbox.split(","))
+        except ValueError:
+            raise ValueError(f"Invalid bbox '{bbox}', expected south,west,north,east")
+        if south >= north or west >= east:
+            raise ValueError(f"Invalid bbox '{bbox}', expected south,west,north,east")
+        return Region(label or bbox, [bbox_query(south, west, north, east)], (south, west, north, east))
+
+    code = spec.upper()
+    if not ISO_CODE_PATTERN.match(code):
+        raise ValueError(f"Unknown region '{spec}', expected an ISO 3166 code or a bbox")
+    if code == "GB-SCT":
+        return Region(code, QUERIES)
+    return Region(code, [iso_area_query(code)])
+
+
+class EndpointRateLimiter:
+    """Caps in-flight requests per endpoint and spaces out their starts."""
+
+    def __init__(self, min_interval: float = 1.0, max_concurrent: int = 1):
+        self.min_interval = min_interval
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, endpoint: str):
+        with self._lock:
+            semaphore = self._slots.setdefault(endpoint, threading.BoundedSemaphore(self.max_concurrent))
+
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(endpoint, now))
+                self._next_start[endpoint] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+def region_units(region: Region, tile_deg: Optional[float] = None) -> List[HarvestUnit]:
+    """Split a bbox region into tiles of at most tile_deg degrees; others stay whole."""
+    if not region.bbox or not tile_deg:
+        return [HarvestUnit(region, region.name, region.queries)]
+
+    south, west, north, east = region.bbox
+    rows = math.ceil((north - south) / tile_deg)
+    cols = math.ceil((east - west) / tile_deg)
+    units = []
+    for row in range(rows):
+        for col in range(cols):
+            tile = (
+                round(south + row * tile_deg, 6),
+                round(west + col * tile_deg, 6),
+                round(min(north, south + (row + 1) * tile_deg), 6),
+                round(min(east, west + (col + 1) * tile_deg), 6),
+            )
+            units.append(HarvestUnit(region, f"{region.name}[{row},{col}]", [bbox_query(*tile)]))
+    return units
+
+
+def write_json_atomic(path: str, data) -> None:
+    # Write then rename so an interrupted run never leaves a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class CheckpointStore:
+    """One JSON file of elements per completed unit."""
+
+    def __init__(self, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR):
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _path(self, unit: HarvestUnit) -> str:
+        return os.path.join(self.checkpoint_dir, f"{unit.key}.json")
+
+    def load(self, unit: HarvestUnit) -> Optional[List[Dict]]:
+        try:
+            with open(self._path(unit), encoding="utf-8") as f:
+                return json.load(f)["elements"]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError):
+            # Truncated by a crash mid-write on a filesystem without atomic rename
+            return None
+
+    def save(self, unit: HarvestUnit, elements: List[Dict]) -> None:
+        write_json_atomic(self._path(unit), {"unit": unit.label, "saved_at": time.time(), "elements": elements})
+
+
+def rotated(endpoints: List[str], offset: int) -> List[str]:
+    offset %= len(endpoints)
+    return endpoints[offset:] + endpoints[:offset]
+
+
+def harvest_unit(unit: HarvestUnit, index: int, limiter: EndpointRateLimiter) -> List[Dict]:
+    # A tile can legitimately be empty; a whole region cannot
+    tiled = unit.label != unit.region.name
+    return fetch_osm_data(unit.queries, rotated(ENDPOINTS, index), limiter,
+                          label=unit.label, allow_empty=tiled)
+
+
+def unique_elements(elements: List[Dict]) -> List[Dict]:
+    """Drop elements returned by more than one unit (tiles overlap at their edges)."""
+    seen = {}
+    for element in elements:
+        seen[(element.get("type"), element.get("id"))] = element
+    return list(seen.values())
+
+
+def write_merged(out_dir: str) -> Tuple[int, int]:
+    """
+    Rewrite merged.csv from every region CSV in out_dir; returns (rows, region CSVs).
+
+    Regions a run left incomplete keep their last CSV and regions from runs
+    with other region lists stay in, so a partial run never shrinks the
+    merge. Neighbouring regions and overlapping bboxes share rows; they are
+    collapsed by (club, course, website) as build_rows does, keeping the
+    Lat/Lon of the last region's row.
+    """
+    merged: Dict[Tuple[str, str, str], Tuple[str, ...]] = {}
+    names = sorted(name for name in os.listdir(out_dir) if name.endswith(".csv") and name != MERGED_FILE)
+    for name in names:
+        for row in read_csv(os.path.join(out_dir, name)):
+            merged[row_key(row)] = row
+    rows = sorted(merged.values(), key=lambda row: (row[0].casefold(), row[1].casefold()))
+    write_csv(rows, os.path.join(out_dir, MERGED_FILE))
+    return len(rows), len(names)
+
+
+def harvest(regions: List[Region], out_dir: str, concurrency: int, limiter: EndpointRateLimiter,
+            checkpoints: CheckpointStore, tile_deg: Optional[float] = None, fresh: bool = False) -> int:
+    """Harvest all regions, resuming from checkpoints; returns the number of failed units."""
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    units = [unit for region in regions for unit in region_units(region, tile_deg)]
+    done: Dict[str, List[Dict]] = {}
+    pending = []
+    for unit in units:
+        elements = None if fresh else checkpoints.load(unit)
+        if elements is None:
+            pending.append(unit)
+        else:
+            done[unit.key] = elements
+
+    print(f"{len(units)} unit(s): {len(done)} from checkpoint, {len(pending)} to fetch")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(harvest_unit, unit, i, limiter): unit
+            for i, unit in enumerate(pending)
+        }
+        for future in as_completed(futures):
+            unit = futures[future]
+            try:
+                elements = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"[{unit.label}] Failed: {exc}", file=sys.stderr)
+                continue
+
+            checkpoints.save(unit, elements)
+            done[unit.key] = elements
+            print(f"[{unit.label}] {len(elements)} elements checkpointed "
+                  f"({len(done)}/{len(units)}, {time.perf_counter() - started:.1f}s)")
+
+    complete_regions = 0
+    for region in regions:
+        region_keys = [unit.key for unit in units if unit.region is region]
+        missing = sum(1 for key in region_keys if key not in done)
+        if missing:
+            print(f"[{region.name}] Incomplete: {missing} of {len(region_keys)} unit(s) still to fetch; "
+                  f"re-run to resume", file=sys.stderr)
+            continue
+
+        elements = unique_elements([e for key in region_keys for e in done[key]])
+        rows = build_rows(elements)
+        path = os.path.join(out_dir, f"{region.slug}.csv")
+        write_csv(rows, path)
+        complete_regions += 1
+        print(f"[{region.name}] Wrote {len(rows)} rows to {path}")
+
+    merged, region_files = write_merged(out_dir)
+    print(f"Wrote {merged} merged rows from {region_files} region CSV(s) ({complete_regions} harvested now) "
+          f"to {os.path.join(out_dir, MERGED_FILE)} in {time.perf_counter() - started:.1f}s")
+
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harvest OSM golf courses for several regions concurrently")
+    parser.add_argument("regions", nargs="+", help="ISO 3166 codes or [label=]south,west,north,east")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR)
+    parser.add_argument("--concurrency", type=int, default=4, help="Regions harvested at once")
+    parser.add_argument("--per-endpoint", type=int, default=1, help="Requests in flight per Overpass mirror")
+    parser.add_argument("--min-interval", type=float, default=1.0,
+                        help="Seconds between request starts on one mirror")
+    parser.add_argument("--tile-deg", type=float, help="Split bbox regions into tiles of this many degrees")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR)
+    parser.add_argument("--fresh", action="store_true", help="Ignore existing checkpoints")
+    args = parser.parse_args(argv)
+
+    try:
+        regions = [parse_region(spec) for spec in args.regions]
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    limiter = EndpointRateLimiter(args.min_interval, args.per_endpoint)
+    failed = harvest(regions, args.out_dir, max(1, args.concurrency), limiter,
+                     CheckpointStore(args.checkpoint_dir), args.tile_deg, args.fresh)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
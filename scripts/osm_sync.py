@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Keep OSM harvests up to date with changed-since queries.
+
+osm_harvest.py pulls every golf course of a region on each run, although
+only a handful change between runs. This keeps, per region or tile, the
+elements with their versions and the Overpass timestamp of the last sync,
+and from then on only asks for what changed:
+
+    first run    full pull with versions (`out meta`), saved as sync state
+    later runs   ids of all matching elements, plus full elements edited
+                 since the last sync (`newer:`)
+
+Edited elements replace older stored versions. Stored elements missing from
+the id list were deleted or lost their golf tags, and are dropped. Only the
+rows of those elements are recomputed, and a region's CSV (and merged.csv)
+is rewritten only when a row (or its Lat/Lon) actually changed, or the file
+predates the Lat/Lon columns; merged.csv is rebuilt from every region CSV
+in --out-dir, as osm_harvest.py does. Output goes to the same files as
+osm_harvest.py; sync state sits next to its checkpoints. Each synced unit's
+harvest checkpoint is overwritten with the synced elements, so a later
+osm_harvest.py run without --fresh rebuilds the same rows instead of
+reverting the CSVs to its last pull.
+
+The id list costs a few bytes per course, so refreshing a large region is a
+small fraction of a full pull.
+
+`newer` only sees an element's own edits: moving the nodes of a course's
+outline shifts its center without a new version of the way. Run with
+--full now and then to rebaseline.
+
+Usage:
+    python scripts/osm_sync.py GB-SCT GB-ENG GB-WLS NO SE [--out-dir osm_harvest] [--full]
+    python scripts/osm_sync.py nordics=54.5,4.5,71.2,31.6 --tile-deg 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from osm_harvest import (
+    DEFAULT_CHECKPOINT_DIR,
+    DEFAULT_OUT_DIR,
+    MERGED_FILE,
+    CheckpointStore,
+    EndpointRateLimiter,
+    HarvestUnit,
+    Region,
+    parse_region,
+    region_units,
+    rotated,
+    write_json_atomic,
+    write_merged,
+)
+from scotland import (
+    ENDPOINTS, Row, changed_since_query, element_row, fetch_osm_payload, has_current_header, row_key,
+    with_versions, write_csv,
+)
+
+
+def element_key(element: Dict) -> str:
+    return f"{element.get('type')}/{element.get('id')}"
+
+
+@dataclass
+class SyncState:
+    query: str  # The unit query (without versions) that produced the baseline
+    osm_base: str  # Overpass data timestamp of the last sync
+    elements: Dict[str, Dict] = field(default_factory=dict)
+    rows: Dict[str, Row] = field(default_factory=dict)  # Element key -> its CSV row, if it has one
+
+
+@dataclass
+class UnitChanges:
+    added: int = 0
+    modified: int = 0
+    deleted: int = 0
+    removed_rows: List[Row] = field(default_factory=list)
+    added_rows: List[Row] = field(default_factory=list)
+
+
+class SyncStore:
+    """One JSON file of sync state per unit, beside osm_harvest's checkpoints."""
+
+    def __init__(self, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR):
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _path(self, unit: HarvestUnit) -> str:
+        return os.path.join(self.checkpoint_dir, f"{unit.key}.sync.json")
+
+    def load(self, unit: HarvestUnit) -> Optional[SyncState]:
+        try:
+            with open(self._path(unit), encoding="utf-8") as f:
+                data = json.load(f)
+            rows = {key: tuple(row) for key, row in data["rows"].items()}
+            if any(len(row) < 5 for row in rows.values()):
+                # Saved before rows carried Lat/Lon: derive them again from the elements
+                rows = {}
+                for key, element in data["elements"].items():
+                    row = element_row(element)
+                    if row:
+                        rows[key] = row
+            return SyncState(data["query"], data["osm_base"], data["elements"], rows)
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError):
+            return None
+
+    def save(self, unit: HarvestUnit, state: SyncState) -> None:
+        write_json_atomic(self._path(unit), {
+            "unit": unit.label,
+            "query": state.query,
+            "osm_base": state.osm_base,
+            "elements": state.elements,
+            "rows": state.rows,
+        })
+
+
+class RowIndex:
+    """
+    A region's CSV rows, with the rows of every element behind each.
+
+    Several elements can make the same (club, course, website) row (a course
+    mapped as a way and a node, or one sitting on a tile edge), so a row
+    goes only with its last element; the CSV shows the latest of their
+    rows, and with it that element's Lat/Lon.
+    """
+
+    def __init__(self):
+        self._rows: Dict[Tuple[str, str, str], List[Row]] = {}
+        self.changed = False
+
+    def add(self, row: Row) -> None:
+        rows = self._rows.setdefault(row_key(row), [])
+        if not rows or rows[-1] != row:
+            self.changed = True
+        rows.append(row)
+
+    def remove(self, row: Row) -> None:
+        key = row_key(row)
+        rows = self._rows.get(key)
+        if not rows or row not in rows:
+            return
+        shown = rows[-1]
+        rows.remove(row)
+        if not rows:
+            del self._rows[key]
+            self.changed = True
+        elif rows[-1] != shown:
+            self.changed = True
+
+    def rows(self) -> List[Row]:
+        return sorted((rows[-1] for rows in self._rows.values()),
+                      key=lambda row: (row[0].casefold(), row[1].casefold()))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def osm_base(payload: Dict) -> str:
+    timestamp = payload.get("osm3s", {}).get("timestamp_osm_base")
+    if not timestamp:
+        raise RuntimeError("Overpass response has no osm3s.timestamp_osm_base")
+    return timestamp
+
+
+def baseline(unit: HarvestUnit, index: int, limiter: EndpointRateLimiter) -> Tuple[SyncState, UnitChanges]:
+    versioned = [with_versions(query) for query in unit.queries]
+    tiled = unit.label != unit.region.name
+    payload, query = fetch_osm_payload(versioned, rotated(ENDPOINTS, index), limiter,
+                                       label=unit.label, allow_empty=tiled)
+
+    # Later refreshes must ask the same question: a fallback query (e.g. the
+    # Scotland bbox) matches a different set of elements than the first one
+    state = SyncState(unit.queries[versioned.index(query)], osm_base(payload))
+    changes = UnitChanges()
+    for element in payload.get("elements", []):
+        key = element_key(element)
+        state.elements[key] = element
+        row = element_row(element)
+        if row:
+            state.rows[key] = row
+            changes.added_rows.append(row)
+    changes.added = len(state.elements)
+    return state, changes
+
+
+def refresh(unit: HarvestUnit, state: SyncState, index: int,
+            limiter: EndpointRateLimiter) -> Tuple[SyncState, UnitChanges]:
+    # A failing area lookup returns nothing; never read that as "all deleted"
+    payload, _ = fetch_osm_payload([changed_since_query(state.query, state.osm_base)], rotated(ENDPOINTS, index),
+                                   limiter, label=unit.label, allow_empty=not state.elements)
+    if "runtime error" in payload.get("remark", ""):
+        raise RuntimeError(f"Overpass: {payload['remark']}")
+
+    # The caller still needs the previous rows to patch the region's CSV
+    state = SyncState(state.query, state.osm_base, dict(state.elements), dict(state.rows))
+    present = set()
+    edited = {}
+    for element in payload.get("elements", []):
+        key = element_key(element)
+        present.add(key)
+        if "tags" in element:  # `out ids` entries carry nothing but type and id
+            edited[key] = element
+
+    changes = UnitChanges()
+
+    def replace_row(key: str, row: Optional[Row]) -> None:
+        old_row = state.rows.pop(key, None)
+        if old_row:
+            changes.removed_rows.append(old_row)
+        if row:
+            state.rows[key] = row
+            changes.added_rows.append(row)
+
+    for key, element in edited.items():
+        stored = state.elements.get(key)
+        if stored and stored.get("version", 0) >= element.get("version", 0):
+            continue  # Already applied; `newer` is inclusive and mirrors lag
+        if stored:
+            changes.modified += 1
+        else:
+            changes.added += 1
+        state.elements[key] = element
+        replace_row(key, element_row(element))
+
+    for key in [key for key in state.elements if key not in present]:
+        del state.elements[key]
+        replace_row(key, None)
+        changes.deleted += 1
+
+    state.osm_base = osm_base(payload)
+    return state, changes
+
+
+def sync_unit(unit: HarvestUnit, state: Optional[SyncState], index: int,
+              limiter: EndpointRateLimiter) -> Tuple[SyncState, UnitChanges]:
+    if state is None:
+        return baseline(unit, index, limiter)
+    return refresh(unit, state, index, limiter)
+
+
+def sync(regions: List[Region], out_dir: str, concurrency: int, limiter: EndpointRateLimiter,
+         store: SyncStore, tile_deg: Optional[float] = None, full: bool = False) -> int:
+    """Bring every region up to date; returns the number of failed units."""
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    units = [unit for region in regions for unit in region_units(region, tile_deg)]
+    previous = {unit.key: None if full else store.load(unit) for unit in units}
+    checkpoints = CheckpointStore(store.checkpoint_dir)
+    baselines = sum(1 for state in previous.values() if state is None)
+    print(f"{len(units)} unit(s): {len(units) - baselines} incremental, {baselines} full")
+
+    results: Dict[str, Tuple[SyncState, UnitChanges]] = {}
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(sync_unit, unit, previous[unit.key], i, limiter): unit
+            for i, unit in enumerate(units)
+        }
+        for future in as_completed(futures):
+            unit = futures[future]
+            try:
+                results[unit.key] = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"[{unit.label}] Failed: {exc}", file=sys.stderr)
+                continue
+            changes = results[unit.key][1]
+            print(f"[{unit.label}] {changes.added} added, {changes.modified} modified, {changes.deleted} deleted")
+
+    any_changed = False
+    for region in regions:
+        region_unit_list = [unit for unit in units if unit.region is region]
+        missing = [unit for unit in region_unit_list if unit.key not in results]
+        if missing:
+            # Its other units are not saved either, so the next run re-applies
+            # their changes to the unchanged CSV
+            print(f"[{region.name}] Incomplete: {len(missing)} of {len(region_unit_list)} unit(s) failed; "
+                  f"re-run to retry", file=sys.stderr)
+            continue
+
+        index = RowIndex()
+        for unit in region_unit_list:
+            old_state = previous[unit.key]
+            for row in (old_state.rows.values() if old_state else ()):
+                index.add(row)
+        index.changed = False
+        for unit in region_unit_list:
+            changes = results[unit.key][1]
+            for row in changes.added_rows:
+                index.add(row)
+            for row in changes.removed_rows:
+                index.remove(row)
+
+        rows = index.rows()
+        path = os.path.join(out_dir, f"{region.slug}.csv")
+        if index.changed or not has_current_header(path):
+            write_csv(rows, path)
+            any_changed = True
+            print(f"[{region.name}] Wrote {len(rows)} rows to {path}")
+        else:
+            print(f"[{region.name}] No row changes ({len(rows)} rows)")
+
+        for unit in region_unit_list:
+            state = results[unit.key][0]
+            store.save(unit, state)
+            checkpoints.save(unit, list(state.elements.values()))
+
+    # From every region CSV in out_dir, so incomplete regions and those not
+    # in this run keep their rows in the merge
+    merged_path = os.path.join(out_dir, MERGED_FILE)
+    if any_changed or not has_current_header(merged_path):
+        merged, region_files = write_merged(out_dir)
+        print(f"Wrote {merged} merged rows from {region_files} region CSV(s) to {merged_path}")
+    print(f"Synced in {time.perf_counter() - started:.1f}s")
+
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update OSM golf course harvests with changed-since queries")
+    parser.add_argument("regions", nargs="+", help="ISO 3166 codes or [label=]south,west,north,east")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR)
+    parser.add_argument("--concurrency", type=int, default=4, help="Units synced at once")
+    parser.add_argument("--per-endpoint", type=int, default=1, help="Requests in flight per Overpass mirror")
+    parser.add_argument("--min-interval", type=float, default=1.0,
+                        help="Seconds between request starts on one mirror")
+    parser.add_argument("--tile-deg", type=float, help="Split bbox regions into tiles of this many degrees")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR)
+    parser.add_argument("--full", action="store_true", help="Ignore sync state and pull everything again")
+    args = parser.parse_args(argv)
+
+    try:
+        regions = [parse_region(spec) for spec in args.regions]
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    limiter = EndpointRateLimiter(args.min_interval, args.per_endpoint)
+    failed = sync(regions, args.out_dir, max(1, args.concurrency), limiter,
+                  SyncStore(args.checkpoint_dir), args.tile_deg, args.full)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
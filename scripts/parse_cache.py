@@ -0,0 +1,174 @@
+"""
+Content-addressed cache for the scorecard parsers' batch mode.
+
+An entry is keyed by a SHA-256 over the parser's identity and version, the
+record's metadata and its scorecard text, and holds the parsed course model
+plus the generated SQL. Unchanged scorecards in a re-run are served from the
+cache without parsing or generating anything.
+
+The parser version is a hash of the parser module's source file and of the
+modules every parser builds on (course_model.py for the model, scorecard_stream.py
+for the record and SQL plumbing, and this file for the entry layout), so
+editing any of them invalidates the entries without anyone having to bump a
+constant.
+
+Entries are pickled one per file under <cache_dir>/<key[:2]>/<key>.pkl. A
+hit refreshes the file's mtime, and when the cache grows past max_bytes the
+least recently used entries are deleted first.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from scorecard_stream import ScorecardRecord
+
+
+DEFAULT_CACHE_DIR = ".parse-cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Shared by every parser; their sources are part of each parser's version
+SHARED_MODULES = ("course_model.py", "scorecard_stream.py", "parse_cache.py")
+
+_version_cache: dict[str, str] = {}
+
+
+@dataclass
+class CacheEntry:
+    course_name: str
+    model: object  # The parser's own course object(s)
+    sql: str
+
+
+def parser_version(module_name: str) -> str:
+    """Hash of a parser module's source and the shared modules', used as its cache version."""
+    if module_name not in _version_cache:
+        here = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for path in [sys.modules[module_name].__file__] + [os.path.join(here, name) for name in SHARED_MODULES]:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+            digest.update(b"\0")
+        _version_cache[module_name] = digest.hexdigest()
+    return _version_cache[module_name]
+
+
+def record_key(module_name: str, record: ScorecardRecord) -> str:
+    """
+    Cache key for a record parsed by the given module.
+
+    The parser is identified by its file name rather than its module name, so
+    running it as a script (__main__) and through ingest.py share entries.
+    """
+    parser_file = os.path.basename(sys.modules[module_name].__file__)
+    digest = hashlib.sha256()
+    digest.update(parser_file.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(parser_version(module_name).encode("utf-8"))
+    for key in sorted(record.metadata):
+        for value in record.metadata[key]:
+            digest.update(b"\0")
+            digest.update(f"{key}={value}".encode("utf-8"))
+    digest.update(b"\0\0")
+    digest.update(record.scorecard_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # key -> (size, last_used); loaded once so eviction never rescans the disk
+        self._index: dict[str, tuple[int, float]] = {}
+        self._total_bytes = 0
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+    def _load_index(self) -> None:
+        if not os.path.isdir(self.cache_dir):
+            return
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for filename in os.listdir(shard_dir):
+                if not filename.endswith(".pkl"):
+                    continue
+                stat = os.stat(os.path.join(shard_dir, filename))
+                self._index[filename[:-4]] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+
+    def key(self, module_name: str, record: ScorecardRecord) -> str:
+        return record_key(module_name, record)
+
+    def entry(self, course_name: str, model: object, sql: str) -> CacheEntry:
+        return CacheEntry(course_name=course_name, model=model, sql=sql)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        if key not in self._index:
+            self.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            # Missing or unreadable (e.g. written by an older model): treat as a miss
+            self._forget(key)
+            self.misses += 1
+            return None
+
+        size, _ = self._index[key]
+        self._index[key] = (size, os.path.getmtime(path))
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so a concurrent run never reads a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        if key in self._index:
+            self._total_bytes -= self._index[key][0]
+        size = os.path.getsize(path)
+        self._index[key] = (size, os.path.getmtime(path))
+        self._total_bytes += size
+        self._evict()
+
+    def _forget(self, key: str) -> None:
+        size, _ = self._index.pop(key)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            self._forget(key)
+            if self._total_bytes <= self.max_bytes:
+                break
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._index)
@@ -4,42 +4,65 @@ Parse golf scorecard data from GolfPass format and generate SQL insert statement
 
 Usage:
     python scripts/parse_scorecard.py
+    extract-tool | python scripts/parse_scorecard.py --stream [--out-dir scripts/sql] [--cache-dir .parse-cache]
 
 You'll be prompted to enter:
 1. Course information (name, city, country, website)
 2. The scorecard data (paste from GolfPass)
+
+With --stream, records are read from stdin instead (see scorecard_stream.py
+for the record format) and the SQL is written to stdout, or to one file per
+course with --out-dir. --cache-dir skips records already converted by an
+earlier run (see parse_cache.py).
 """
 
+import argparse
 import re
 import sys
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterator, Optional, Sequence
+
+from course_model import hole_vector, intern_gender, intern_name, shared_hole_vector
+from scorecard_stream import add_stream_arguments, stream_main, ParsedRecord, ScorecardRecord
 
 
-@dataclass
+@dataclass(slots=True)
 class TeeData:
     name: str
     gender: str
     course_rating_18: float
     slope_rating_18: int
-    distances: list[int]  # Per-hole distances
+    distances: Sequence[int]  # Per-hole distances, stored as a shared HoleVector (see course_model.py)
+
+    def __post_init__(self):
+        self.name = intern_name(self.name)
+        self.gender = intern_gender(self.gender)
+        self.distances = hole_vector(self.distances)
 
 
-@dataclass
+@dataclass(slots=True)
 class CourseData:
     name: str
     city: str
     country: str
     website: Optional[str]
     tees: list[TeeData]
-    pars: list[int]  # Per-hole pars
-    handicaps_m: list[int]  # Men's handicap strokes per hole
-    handicaps_w: list[int]  # Women's handicap strokes per hole
+    pars: Sequence[int]  # Per-hole pars
+    handicaps_m: Sequence[int]  # Men's handicap strokes per hole
+    handicaps_w: Sequence[int]  # Women's handicap strokes per hole
     is_9_hole: bool
     out_par: int  # Front 9 par total
     in_par: int  # Back 9 par total
     distance_measurement: str  # "meters" or "yards"
 
+    def __post_init__(self):
+        self.city = intern_name(self.city)
+        self.country = intern_name(self.country)
+        self.pars = shared_hole_vector(self.pars)
+        self.handicaps_m = shared_hole_vector(self.handicaps_m)
+        self.handicaps_w = shared_hole_vector(self.handicaps_w)
+        self.distance_measurement = intern_name(self.distance_measurement)
+
 
 def extract_hole_distances(all_numbers: list[int]) -> tuple[list[int], list[int], bool]:
     """
@@ -117,7 +140,8 @@ def parse_tee_row(row: str) -> tuple[list[TeeData], bool]:
     # Parse all numbers from the distance string
     all_numbers = [int(d) for d in distances_str.split() if d.isdigit()]
     front_9, back_9, is_18_hole = extract_hole_distances(all_numbers)
-    distances = front_9 + back_9 if is_18_hole else front_9
+    # One array for both genders
+    distances = hole_vector(front_9 + back_9 if is_18_hole else front_9)
 
     # Create tee data for both genders
     tees.append(TeeData(
@@ -348,8 +372,11 @@ def escape_sql_string(value: str) -> str:
 
 def generate_sql_with_variables(course: CourseData) -> str:
     """Generate SQL with DO block for automatic ID handling."""
-    sql_parts = []
+    return '\n'.join(iter_sql_with_variables(course))
 
+
+def iter_sql_with_variables(course: CourseData) -> Iterator[str]:
+    """Yield the parts of generate_sql_with_variables() one at a time."""
     # Escape all string values for SQL
     name_escaped = escape_sql_string(course.name)
     city_escaped = escape_sql_string(course.city)
@@ -357,11 +384,11 @@ def generate_sql_with_variables(course: CourseData) -> str:
     website_escaped = escape_sql_string(course.website) if course.website else None
 
     # Header
-    sql_parts.append(f"-- Course: {course.name}")
-    sql_parts.append(f"-- Location: {course.city}, {course.country}")
-    sql_parts.append(f"-- Type: {'9-hole' if course.is_9_hole else '18-hole'} course")
-    sql_parts.append("-- Generated by parse_scorecard.py")
-    sql_parts.append("")
+    yield f"-- Course: {course.name}"
+    yield f"-- Location: {course.city}, {course.country}"
+    yield f"-- Type: {'9-hole' if course.is_9_hole else '18-hole'} course"
+    yield "-- Generated by parse_scorecard.py"
+    yield ""
 
     website_value = f"'{website_escaped}'" if website_escaped else "null"
 
@@ -370,23 +397,23 @@ def generate_sql_with_variables(course: CourseData) -> str:
     in_par = course.in_par
     total_par = out_par + in_par
 
-    sql_parts.append("do $$")
-    sql_parts.append("declare")
-    sql_parts.append("    v_course_id integer;")
+    yield "do $$"
+    yield "declare"
+    yield "    v_course_id integer;"
 
     # Declare tee ID variables
     for i, tee in enumerate(course.tees, 1):
-        sql_parts.append(f"    v_tee_id_{i} integer;")
+        yield f"    v_tee_id_{i} integer;"
 
-    sql_parts.append("begin")
-    sql_parts.append("")
+    yield "begin"
+    yield ""
 
     # Insert course
-    sql_parts.append("    -- Insert course")
-    sql_parts.append(f"""    insert into public.course (name, city, country, website, "approvalStatus", "submittedBy")
+    yield "    -- Insert course"
+    yield f"""    insert into public.course (name, city, country, website, "approvalStatus", "submittedBy")
     values ('{name_escaped}', '{city_escaped}', '{country_escaped}', {website_value}, 'approved', null)
-    returning id into v_course_id;""")
-    sql_parts.append("")
+    returning id into v_course_id;"""
+    yield ""
 
     # Insert tees
     for i, tee in enumerate(course.tees, 1):
@@ -409,8 +436,8 @@ def generate_sql_with_variables(course: CourseData) -> str:
             slope_rating_9 = tee.slope_rating_18
 
         tee_name_escaped = escape_sql_string(tee.name)
-        sql_parts.append(f"    -- Insert {tee.name} tee ({tee.gender})")
-        sql_parts.append(f"""    insert into public."teeInfo" (
+        yield f"    -- Insert {tee.name} tee ({tee.gender})"
+        yield f"""    insert into public."teeInfo" (
         "courseId", name, gender,
         "courseRating18", "slopeRating18",
         "courseRatingFront9", "slopeRatingFront9",
@@ -428,15 +455,15 @@ def generate_sql_with_variables(course: CourseData) -> str:
         {out_distance}, {in_distance}, {total_distance},
         '{course.distance_measurement}', 'approved', null
     )
-    returning id into v_tee_id_{i};""")
-        sql_parts.append("")
+    returning id into v_tee_id_{i};"""
+        yield ""
 
     # Insert holes
     tee_counter = 1
     for tee in course.tees:
         handicaps = course.handicaps_m if tee.gender == 'mens' else course.handicaps_w
 
-        sql_parts.append(f"    -- Holes for {tee.name} ({tee.gender})")
+        yield f"    -- Holes for {tee.name} ({tee.gender})"
 
         if course.is_9_hole:
             # For 9-hole courses, create 18 holes by duplicating front 9 to back 9
@@ -444,26 +471,68 @@ def generate_sql_with_variables(course: CourseData) -> str:
             for hole_num in range(1, 19):
                 idx = (hole_num - 1) % 9  # 0-8 for both front and back 9
                 hcp = handicaps[hole_num - 1] if hole_num - 1 < len(handicaps) else 1
-                sql_parts.append(f"""    insert into public.hole ("teeId", "holeNumber", par, distance, hcp)
-    values (v_tee_id_{tee_counter}, {hole_num}, {course.pars[idx]}, {tee.distances[idx]}, {hcp});""")
+                yield f"""    insert into public.hole ("teeId", "holeNumber", par, distance, hcp)
+    values (v_tee_id_{tee_counter}, {hole_num}, {course.pars[idx]}, {tee.distances[idx]}, {hcp});"""
         else:
             # For 18-hole courses, use the data as-is
             for hole_num in range(1, 19):
                 idx = hole_num - 1
                 hcp = handicaps[idx] if idx < len(handicaps) else 1
-                sql_parts.append(f"""    insert into public.hole ("teeId", "holeNumber", par, distance, hcp)
-    values (v_tee_id_{tee_counter}, {hole_num}, {course.pars[idx]}, {tee.distances[idx]}, {hcp});""")
+                yield f"""    insert into public.hole ("teeId", "holeNumber", par, distance, hcp)
+    values (v_tee_id_{tee_counter}, {hole_num}, {course.pars[idx]}, {tee.distances[idx]}, {hcp});"""
 
-        sql_parts.append("")
+        yield ""
         tee_counter += 1
 
-    sql_parts.append("    raise notice 'Successfully inserted course: %', v_course_id;")
-    sql_parts.append("end $$;")
+    yield "    raise notice 'Successfully inserted course: %', v_course_id;"
+    yield "end $$;"
 
-    return '\n'.join(sql_parts)
 
+def course_from_record(record: ScorecardRecord) -> CourseData:
+    """Build a CourseData from a streamed record, raising ValueError on bad input."""
+    course_name = record.get('name')
+    if not course_name:
+        raise ValueError("Record has no 'name:' line")
+
+    distance_input = (record.get('unit') or 'm').lower()
+
+    tees, pars, handicaps_m, handicaps_w, is_9_hole, out_par, in_par = parse_scorecard(record.scorecard_text)
+
+    if not tees:
+        raise ValueError("Could not parse any tee information")
+
+    if not pars:
+        raise ValueError("Could not parse par information")
+
+    return CourseData(
+        name=course_name,
+        city=record.get('city', ''),
+        country=record.get('country', 'USA'),
+        website=record.get('website'),
+        tees=tees,
+        pars=pars,
+        handicaps_m=handicaps_m,
+        handicaps_w=handicaps_w,
+        is_9_hole=is_9_hole,
+        out_par=out_par,
+        in_par=in_par,
+        distance_measurement="meters" if distance_input == "m" else "yards"
+    )
+
+
+def parse_record(record: ScorecardRecord) -> ParsedRecord:
+    course = course_from_record(record)
+    return ParsedRecord(course.name, course, iter_sql_with_variables(course))
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="GolfPass scorecard to SQL converter")
+    add_stream_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.stream:
+        stream_main(args, parse_record, __name__)
 
-def main():
     print("=" * 60)
     print("Golf Scorecard to SQL Converter")
     print("=" * 60)
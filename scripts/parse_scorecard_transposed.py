@@ -20,32 +20,49 @@ Then for each tee, provide:
     48 (Gul), m
     CR/Slope:
     69,1/130
+
+Pipe mode:
+    extract-tool | python scripts/parse_scorecard_transposed.py --stream [--out-dir scripts/sql] [--cache-dir .parse-cache]
+
+reads delimited records from stdin, with each tee given as a
+`tee: 48 (Gul), m | 69,1/130` line (see scorecard_stream.py).
 """
 
+import argparse
 import re
 import sys
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterator, Mapping, Optional
+
+from course_model import HoleDistances, intern_gender, intern_name, shared_names
+from scorecard_stream import add_stream_arguments, stream_main, ParsedRecord, ScorecardRecord
 
 
-@dataclass
+@dataclass(slots=True)
 class HoleData:
     hole_number: int
-    distances: dict[str, int]  # tee_name -> distance
+    distances: Mapping[str, int]  # tee_name -> distance, stored as a read-only HoleDistances (see course_model.py)
     hcp: int
     par: int
 
+    def __post_init__(self):
+        self.distances = HoleDistances.from_dict(self.distances)
 
-@dataclass
+
+@dataclass(slots=True)
 class TeeMetadata:
     name: str
     gender: str  # "mens" or "ladies"
     course_rating_18: float
     slope_rating_18: int
 
+    def __post_init__(self):
+        self.name = intern_name(self.name)
+        self.gender = intern_gender(self.gender)
+
 
-@dataclass
+@dataclass(slots=True)
 class CourseData:
     name: str
     city: str
@@ -55,6 +72,12 @@ class CourseData:
     holes: list[HoleData]
     tee_names: list[str]  # Column names from header
 
+    def __post_init__(self):
+        self.city = intern_name(self.city)
+        self.country = intern_name(self.country)
+        self.distance_measurement = intern_name(self.distance_measurement)
+        self.tee_names = [intern_name(name) for name in self.tee_names]
+
 
 def escape_sql_string(value: str) -> str:
     """Escape single quotes for SQL by doubling them."""
@@ -110,6 +133,10 @@ def parse_transposed_scorecard(scorecard_text: str) -> tuple[list[HoleData], lis
             break
         tee_names.append(part)
 
+    # The card's tee names, interned once; holes with a distance for each of
+    # them build their HoleDistances over this tuple directly
+    names = shared_names(tee_names)
+    distinct_names = len(set(names)) == len(names)
     holes = []
     is_9_hole = True
 
@@ -136,14 +163,18 @@ def parse_transposed_scorecard(scorecard_text: str) -> tuple[list[HoleData], lis
         if hole_number > 9:
             is_9_hole = False
 
-        # Extract distances for each tee
-        distances = {}
-        for i, tee_name in enumerate(tee_names):
+        # Extract distances for each tee, in column order
+        values = []
+        for i in range(len(tee_names)):
             if i + 1 < len(parts):
                 try:
-                    distances[tee_name] = int(parts[i + 1])
+                    values.append(int(parts[i + 1]))
                 except ValueError:
-                    distances[tee_name] = 0
+                    values.append(0)
+        if distinct_names and len(values) == len(names):
+            distances = HoleDistances(names, values)
+        else:
+            distances = dict(zip(tee_names, values))  # HoleData converts it
 
         # Hcp is after all tee distances
         hcp_idx = len(tee_names) + 1
@@ -316,8 +347,16 @@ def generate_full_sql(
     is_9_hole: bool
 ) -> str:
     """Generate complete SQL with all tees."""
-    sql_parts = []
+    return '\n'.join(iter_full_sql(course, tees, holes, is_9_hole))
+
 
+def iter_full_sql(
+    course: CourseData,
+    tees: list[TeeMetadata],
+    holes: list[HoleData],
+    is_9_hole: bool
+) -> Iterator[str]:
+    """Yield the parts of generate_full_sql() one at a time, one chunk per tee."""
     # Escape strings
     name_escaped = escape_sql_string(course.name)
     city_escaped = escape_sql_string(course.city)
@@ -326,39 +365,80 @@ def generate_full_sql(
     website_value = f"'{website_escaped}'" if website_escaped else "null"
 
     # Header
-    sql_parts.append(f"-- Course: {course.name}")
-    sql_parts.append(f"-- Location: {course.city}, {course.country}")
-    sql_parts.append(f"-- Type: {'9-hole' if is_9_hole else '18-hole'} course")
-    sql_parts.append(f"-- Tees: {', '.join(t.name + ' (' + t.gender + ')' for t in tees)}")
-    sql_parts.append("-- Generated by parse_scorecard_transposed.py")
-    sql_parts.append("")
-
-    sql_parts.append("do $$")
-    sql_parts.append("declare")
-    sql_parts.append("    v_course_id integer;")
-    sql_parts.append("    v_tee_id integer;")
-    sql_parts.append("begin")
-    sql_parts.append("")
+    yield f"-- Course: {course.name}"
+    yield f"-- Location: {course.city}, {course.country}"
+    yield f"-- Type: {'9-hole' if is_9_hole else '18-hole'} course"
+    yield f"-- Tees: {', '.join(t.name + ' (' + t.gender + ')' for t in tees)}"
+    yield "-- Generated by parse_scorecard_transposed.py"
+    yield ""
+
+    yield "do $$"
+    yield "declare"
+    yield "    v_course_id integer;"
+    yield "    v_tee_id integer;"
+    yield "begin"
+    yield ""
 
     # Insert course
-    sql_parts.append("    -- Insert course")
-    sql_parts.append(f"""    insert into public.course (name, city, country, website, "approvalStatus", "submittedBy")
+    yield "    -- Insert course"
+    yield f"""    insert into public.course (name, city, country, website, "approvalStatus", "submittedBy")
     values ('{name_escaped}', '{city_escaped}', '{country_escaped}', {website_value}, 'approved', null)
-    returning id into v_course_id;""")
-    sql_parts.append("")
+    returning id into v_course_id;"""
+    yield ""
 
     # Insert each tee
     for tee in tees:
         tee_sql = generate_sql_for_tee(course, tee, holes, is_9_hole)
-        sql_parts.append(tee_sql)
+        yield tee_sql
 
-    sql_parts.append("    raise notice 'Successfully inserted course: %', v_course_id;")
-    sql_parts.append("end $$;")
+    yield "    raise notice 'Successfully inserted course: %', v_course_id;"
+    yield "end $$;"
 
-    return '\n'.join(sql_parts)
 
+def parse_record(record: ScorecardRecord) -> ParsedRecord:
+    """Parse a streamed record into its course model and SQL parts."""
+    course_name = record.get('name')
+    if not course_name:
+        raise ValueError("Record has no 'name:' line")
+
+    holes, tee_names, is_9_hole = parse_transposed_scorecard(record.scorecard_text)
+    if not holes:
+        raise ValueError("Could not parse any hole information")
+
+    tees = []
+    for tee_line in record.get_all('tee'):
+        tee_input, _, cr_slope_input = tee_line.partition('|')
+        tee = parse_tee_metadata(tee_input, cr_slope_input)
+        # No one to confirm with in a pipe, so unknown columns are an error
+        if tee.name not in tee_names:
+            raise ValueError(f"Tee '{tee.name}' not found in scorecard columns: {tee_names}")
+        tees.append(tee)
+
+    if not tees:
+        raise ValueError("No 'tee:' lines in record")
+
+    distance_input = (record.get('unit') or 'm').lower()
+    course = CourseData(
+        name=course_name,
+        city=record.get('city', ''),
+        country=record.get('country', 'Norway'),
+        website=record.get('website'),
+        distance_measurement="meters" if distance_input == "m" else "yards",
+        holes=holes,
+        tee_names=tee_names
+    )
+    return ParsedRecord(course.name, (course, tees, holes, is_9_hole),
+                        iter_full_sql(course, tees, holes, is_9_hole))
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Transposed scorecard to SQL converter")
+    add_stream_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.stream:
+        stream_main(args, parse_record, __name__)
 
-def main():
     print("=" * 60)
     print("Golf Scorecard to SQL Converter (Transposed Format)")
     print("=" * 60)
@@ -0,0 +1,932 @@
+#!/usr/bin/env python3
+"""
+Materialized player statistics, computed for every player in one pass.
+
+The statistics screens (apps/native/lib/statistics/calculations.ts, mirrored
+in apps/web) walk a player's scorecards once per statistic on every load.
+This computes the same statistics for all players at once from columnar
+round and score data joined to the tees' holes (par, stroke index, distance),
+and stores them as one JSON row per player that a screen can read as is.
+
+Every statistic is reduced to per-player sufficient statistics that merge
+without the underlying rounds:
+
+  partial vector   sums, minima/maxima and earliest/latest values (by tee
+                   time): counts and totals per day of week, time of day,
+                   season, lunar phase, par type, hole number, distance band,
+                   score-to-par bin, differential sums and squares, streaks...
+  bucket tables    per course, per month, stroke/score histograms (with the
+                   first time each value was seen, for the screens' ties),
+                   distinct course holes and exceptional rounds
+
+The kernel computes these with NumPy group-bys (bincount and ufunc.at over
+player/bucket keys) for any set of rounds. `build` runs it over everything.
+`refresh` fingerprints the source rounds and compares them with the store
+(stats_store.py, shared with course_difficulty.py). Players that only gained
+rounds have just the new rounds merged into their partial vector and bucket
+rows. Players with an edited or deleted round (the queue processor rewrites
+differentials and indexes) are recomputed from their own rounds. Either way
+only those players' rows are re-rendered. Longest gap and the current weekly
+streak depend on round order, so they are recomputed from the stored tee times
+of the affected players.
+
+The source is a database with the app's round, score, hole, teeInfo, course
+and profile tables (a sqlite export, or the stand-in from queue_load.py
+--db). Statistics cover all rounds ("all time"); the 6-month and 1-year
+filters of the screens still need the scorecards. Naive tee times are taken
+as the player's local time, as the app displays them. Player type
+(player-type.ts) is not included.
+
+Usage:
+    python scripts/player_stats.py build SOURCE.sqlite [--store player_stats.sqlite]
+    python scripts/player_stats.py refresh SOURCE.sqlite [--store player_stats.sqlite]
+    python scripts/player_stats.py show PLAYER_ID [--store player_stats.sqlite]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from stats_store import (
+    as_columns,
+    delete_affected,
+    fill_wanted,
+    open_store as _open_store,
+    partial_states,
+    plan_refresh,
+    refresh_batches,
+    set_affected,
+    show_row,
+    stored_fingerprints,
+    table_columns,
+)
+
+
+DEFAULT_STORE = "player_stats.sqlite"
+DAY = 86400
+
+DAYS_OF_WEEK = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+          "October", "November", "December"]
+SEASONS = ["Spring", "Summer", "Fall", "Winter"]
+SEASON_OF_MONTH = np.array([3, 3, 0, 0, 0, 1, 1, 1, 2, 2, 2, 3])
+PERIODS = ["morning", "afternoon", "evening"]
+SCORE_BINS = ["eagle", "birdie", "par", "bogey", "doubleBogey", "triplePlus"]
+DISTANCE_BANDS = [("short", "< 350 yds"), ("medium", "350-450 yds"), ("long", "> 450 yds")]
+LUNAR_PHASES = [
+    ("new_moon", "New Moon", "🌑"), ("waxing_crescent", "Waxing Crescent", "🌒"),
+    ("first_quarter", "First Quarter", "🌓"), ("waxing_gibbous", "Waxing Gibbous", "🌔"),
+    ("full_moon", "Full Moon", "🌕"), ("waning_gibbous", "Waning Gibbous", "🌖"),
+    ("last_quarter", "Last Quarter", "🌗"), ("waning_crescent", "Waning Crescent", "🌘"),
+]
+KNOWN_NEW_MOON = 947182440  # 2000-01-06T18:14:00Z, as in getLunarPhase
+SYNODIC_MONTH = 29.530588853
+LUNAR_EDGES = np.array([0.0625, 0.1875, 0.3125, 0.4375, 0.5625, 0.6875, 0.8125, 0.9375])
+
+
+# ---------------------------------------------------------------------------
+# Partial vector layout
+# ---------------------------------------------------------------------------
+
+SUM, MIN, MAX, EARLIEST, LATEST = range(5)
+
+
+class Layout:
+    """Named column ranges of the per-player partial vector and how each merges."""
+
+    def __init__(self):
+        self.fields: Dict[str, slice] = {}
+        self.ops: List[int] = []
+        self._timed: List[Tuple[int, int, int]] = []  # (value column, time column, op)
+
+    def add(self, name: str, size: int = 1, op: int = SUM, time_field: Optional[str] = None) -> None:
+        start = len(self.ops)
+        self.fields[name] = slice(start, start + size)
+        self.ops += [op] * size
+        if op in (EARLIEST, LATEST):
+            time_column = self.fields[time_field].start
+            self._timed += [(column, time_column, op) for column in range(start, start + size)]
+
+    @property
+    def width(self) -> int:
+        return len(self.ops)
+
+    def empty(self, rows: int) -> np.ndarray:
+        matrix = np.zeros((rows, self.width))
+        matrix[:, np.array(self.ops) != SUM] = np.nan
+        return matrix
+
+    def merge(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        ops = np.array(self.ops)
+        merged = a + b
+        merged[:, ops == MIN] = np.fmin(a[:, ops == MIN], b[:, ops == MIN])
+        merged[:, ops == MAX] = np.fmax(a[:, ops == MAX], b[:, ops == MAX])
+        for column, time_column, op in self._timed:
+            a_time, b_time = a[:, time_column], b[:, time_column]
+            if op == LATEST:
+                take_b = ~np.isnan(b_time) & (np.isnan(a_time) | (b_time >= a_time))
+            else:
+                take_b = ~np.isnan(b_time) & (np.isnan(a_time) | (b_time < a_time))
+            merged[:, column] = np.where(take_b, b[:, column], a[:, column])
+        return merged
+
+
+LAYOUT = Layout()
+for _name in ("rounds", "sum_ags", "par_rounds", "sum_par", "diff_n", "sum_diff", "sum_diff_sq",
+              "total_strokes", "score_rows", "bogey_free", "putts_rounds", "putts_total", "penalty_rounds",
+              "penalty_total", "gir_holes", "gir_hits", "gir_rounds", "fir_holes", "fir_hits", "fir_rounds",
+              "par_streaks", "par_streak_total", "total_distance"):
+    LAYOUT.add(_name)
+LAYOUT.add("min_diff", op=MIN)
+LAYOUT.add("max_diff", op=MAX)
+LAYOUT.add("first_time", op=MIN)
+LAYOUT.add("last_time", op=MAX)
+LAYOUT.add("longest_par_streak", op=MAX)
+LAYOUT.add("longest_bogey_streak", op=MAX)
+LAYOUT.add("first_existing_index", op=EARLIEST, time_field="first_time")
+LAYOUT.add("last_updated_index", op=LATEST, time_field="last_time")
+LAYOUT.add("last_round_par_streak", op=LATEST, time_field="last_time")
+for _name, _size in (("dow_n", 7), ("dow_ags", 7), ("dow_diff", 7), ("dow_strokes", 7),
+                     ("period_n", 3), ("period_ags", 3), ("holes_n", 2), ("holes_diff", 2),
+                     ("season_n", 4), ("season_diff", 4), ("lunar_n", 8), ("lunar_diff", 8),
+                     ("par_type_strokes", 3), ("par_type_n", 3), ("score_bins", 6),
+                     ("hole_n", 18), ("hole_strokes", 18), ("hole_par", 18), ("hole_pars", 18),
+                     ("hole_birdies", 18), ("hole_bogeys", 18),
+                     ("band_strokes", 3), ("band_par", 3), ("band_n", 3)):
+    LAYOUT.add(_name, _size)
+LAYOUT.add("band_min_distance", 3, MIN)
+LAYOUT.add("band_max_distance", 3, MAX)
+
+
+# ---------------------------------------------------------------------------
+# Source data
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Batch:
+    """Columnar rounds and scores of some players; scores point at their round's position."""
+    player_ids: np.ndarray  # Distinct user ids; `player` columns index into this
+    round_id: np.ndarray
+    player: np.ndarray
+    tee_time: np.ndarray  # Seconds since 1970 of the naive (local) tee time
+    course_id: np.ndarray
+    course_name: List[str]
+    course_city: List[str]
+    course_country: List[str]
+    ags: np.ndarray
+    total_strokes: np.ndarray
+    par_played: np.ndarray
+    differential: np.ndarray
+    existing_index: np.ndarray
+    updated_index: np.ndarray
+    esr: np.ndarray
+    score_round: np.ndarray
+    strokes: np.ndarray
+    found: np.ndarray  # Score's hole belongs to the tee played
+    hole_number: np.ndarray
+    par: np.ndarray
+    distance: np.ndarray
+    putts: np.ndarray  # NaN where not tracked
+    fairway_hit: np.ndarray
+    penalties: np.ndarray
+
+
+def _seconds(values: Sequence[str]) -> np.ndarray:
+    return np.array([value.replace(" ", "T")[:19] for value in values], dtype="datetime64[s]").astype(np.int64)
+
+
+def round_fingerprints(source: sqlite3.Connection) -> Dict[int, Tuple[str, int]]:
+    """round id -> (user id, fingerprint of everything the statistics read from it)."""
+    rows = source.execute(
+        'select r.id, r."userId", r."teeTime", r."courseId", r."teeId", r."adjustedGrossScore", r."totalStrokes", '
+        'r."parPlayed", r."scoreDifferential", r."existingHandicapIndex", r."updatedHandicapIndex", '
+        'r."exceptionalScoreAdjustment", s.n, s.total '
+        'from round r left join (select "roundId", count(*) n, sum(strokes) total from score group by "roundId") s '
+        'on s."roundId" = r.id')
+    return {row[0]: (row[1], zlib.crc32(repr(row[2:]).encode())) for row in rows}
+
+
+def load_batch(source: sqlite3.Connection, round_ids: Sequence[int]) -> Batch:
+    """Rounds (with their scores and holes) by id, as columns."""
+    fill_wanted(source, round_ids)
+
+    rounds = source.execute(
+        'select r.id, r."userId", r."teeTime", r."courseId", c.name, c.city, c.country, r."adjustedGrossScore", '
+        'r."totalStrokes", r."parPlayed", r."scoreDifferential", r."existingHandicapIndex", '
+        'r."updatedHandicapIndex", r."exceptionalScoreAdjustment" '
+        'from round r join temp.wanted w on w.id = r.id left join course c on c.id = r."courseId" '
+        'order by r.id').fetchall()
+
+    score_columns = table_columns(source, "score")
+    optional = ", ".join(f's."{name}"' if name in score_columns else "null"
+                         for name in ("putts", "fairwayHit", "penaltyStrokes"))
+    scores = source.execute(
+        f'select s."roundId", s.strokes, h.id is not null and h."teeId" = r."teeId", h."holeNumber", h.par, '
+        f'h.distance, {optional} '
+        f'from score s join temp.wanted w on w.id = s."roundId" join round r on r.id = s."roundId" '
+        f'left join hole h on h.id = s."holeId"').fetchall()
+
+    columns = as_columns(rounds, 14)
+    player_ids, player = np.unique(np.array(columns[1], dtype=object), return_inverse=True)
+    round_id = np.array(columns[0], dtype=np.int64)
+
+    def floats(values) -> np.ndarray:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    score_columns = as_columns(scores, 9)
+    position = np.searchsorted(round_id, np.array(score_columns[0], dtype=np.int64))
+    return Batch(
+        player_ids=player_ids.astype(str),
+        round_id=round_id,
+        player=player.astype(np.int64),
+        tee_time=_seconds(columns[2]),
+        course_id=np.array([-1 if value is None else value for value in columns[3]], dtype=np.int64),
+        course_name=list(columns[4]), course_city=list(columns[5]), course_country=list(columns[6]),
+        ags=floats(columns[7]), total_strokes=floats(columns[8]), par_played=floats(columns[9]),
+        differential=floats(columns[10]), existing_index=floats(columns[11]), updated_index=floats(columns[12]),
+        esr=floats(columns[13]),
+        score_round=position.astype(np.int64),
+        strokes=floats(score_columns[1]),
+        found=np.array([bool(value) for value in score_columns[2]], dtype=bool),
+        hole_number=np.nan_to_num(floats(score_columns[3])).astype(np.int64),
+        par=floats(score_columns[4]),
+        distance=floats(score_columns[5]),
+        putts=floats(score_columns[6]),
+        fairway_hit=floats(score_columns[7]),
+        penalties=floats(score_columns[8]),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Kernel
+# ---------------------------------------------------------------------------
+
+def _per_key(keys: np.ndarray, size: int, weights=None) -> np.ndarray:
+    return np.bincount(keys, weights=weights, minlength=size).astype(np.float64)
+
+
+def _bucketed(player: np.ndarray, bucket: np.ndarray, buckets: int, players: int, weights=None) -> np.ndarray:
+    return _per_key(player * buckets + bucket, players * buckets, weights).reshape(players, buckets)
+
+
+def _reduce_at(ufunc, keys: np.ndarray, size: int, values: np.ndarray) -> np.ndarray:
+    out = np.full(size, np.nan)
+    ufunc.at(out, keys, values)
+    return out
+
+
+def _runs(round_position: np.ndarray, condition: np.ndarray, rounds: int):
+    """
+    Per round: longest run of `condition`, number of runs, total run length and
+    the run still open at the round's last hole. Holes are in round, hole order.
+    """
+    continues = np.r_[False, (round_position[1:] == round_position[:-1]) & condition[:-1]]
+    starts = condition & ~continues
+    run_id = np.cumsum(starts) - 1
+    lengths = np.bincount(run_id[condition], minlength=int(starts.sum())).astype(np.float64)
+    run_round = round_position[starts]
+
+    longest = np.zeros(rounds)
+    np.maximum.at(longest, run_round, lengths)
+    count = _per_key(run_round, rounds)
+    total = _per_key(run_round, rounds, lengths)
+
+    ending = np.zeros(rounds)
+    last = np.r_[round_position[1:] != round_position[:-1], True] if len(round_position) else np.zeros(0, bool)
+    open_at_end = last & condition
+    ending[round_position[open_at_end]] = lengths[run_id[open_at_end]]
+    return longest, count, total, ending
+
+
+def compute_partials(batch: Batch) -> np.ndarray:
+    """The partial vector of every player in the batch."""
+    players, rounds = len(batch.player_ids), len(batch.round_id)
+    out = LAYOUT.empty(players)
+    field = LAYOUT.fields
+    p = batch.player
+
+    def put(name: str, values: np.ndarray) -> None:
+        out[:, field[name]] = values.reshape(players, -1)
+
+    # Score level
+    sr = batch.score_round
+    n_scores = _per_key(sr, rounds)
+    found = batch.found
+    to_par = batch.strokes - batch.par
+    not_par_or_better = ~(found & (to_par <= 0))
+    bogey_free = _per_key(sr, rounds, not_par_or_better) == 0
+
+    has_putts = ~np.isnan(batch.putts)
+    has_penalties = ~np.isnan(batch.penalties)
+    scale = np.where(n_scores == 9, 2.0, 1.0)
+    putts_complete = (_per_key(sr, rounds, ~has_putts) == 0) & (n_scores > 0)
+    penalties_complete = (_per_key(sr, rounds, ~has_penalties) == 0) & (n_scores > 0)
+    putts_per_round = _per_key(sr, rounds, np.nan_to_num(batch.putts)) * scale
+    penalties_per_round = _per_key(sr, rounds, np.nan_to_num(batch.penalties)) * scale
+    gir_eligible = has_putts & found
+    gir_hit = gir_eligible & (batch.strokes - batch.putts <= batch.par - 2)
+    fir_eligible = ~np.isnan(batch.fairway_hit) & found & (batch.par != 3)
+    fir_hit = fir_eligible & (batch.fairway_hit == 1)
+
+    # Streaks walk each round's found holes in hole order
+    ordered = np.flatnonzero(found)
+    ordered = ordered[np.lexsort((batch.hole_number[ordered], sr[ordered]))]
+    longest_par, par_streaks, par_streak_total, ending_par = _runs(sr[ordered], to_par[ordered] <= 0, rounds)
+    longest_bogey, _, _, _ = _runs(sr[ordered], to_par[ordered] >= 1, rounds)
+
+    # Round level
+    put("rounds", _per_key(p, players))
+    put("sum_ags", _per_key(p, players, batch.ags))
+    with_par = batch.par_played > 0
+    put("par_rounds", _per_key(p[with_par], players))
+    put("sum_par", _per_key(p[with_par], players, batch.par_played[with_par]))
+    finite = np.isfinite(batch.differential)
+    put("diff_n", _per_key(p[finite], players))
+    put("sum_diff", _per_key(p[finite], players, batch.differential[finite]))
+    put("sum_diff_sq", _per_key(p[finite], players, batch.differential[finite] ** 2))
+    put("min_diff", _reduce_at(np.fmin, p, players, batch.differential))
+    put("max_diff", _reduce_at(np.fmax, p, players, batch.differential))
+    put("total_strokes", _per_key(p, players, batch.total_strokes))
+    put("score_rows", _per_key(p, players, n_scores))
+    put("bogey_free", _per_key(p, players, bogey_free))
+    put("putts_rounds", _per_key(p, players, putts_complete))
+    put("putts_total", _per_key(p, players, np.where(putts_complete, putts_per_round, 0)))
+    put("penalty_rounds", _per_key(p, players, penalties_complete))
+    put("penalty_total", _per_key(p, players, np.where(penalties_complete, penalties_per_round, 0)))
+    put("gir_holes", _per_key(p[sr], players, gir_eligible))
+    put("gir_hits", _per_key(p[sr], players, gir_hit))
+    put("gir_rounds", _per_key(p, players, _per_key(sr, rounds, gir_eligible) > 0))
+    put("fir_holes", _per_key(p[sr], players, fir_eligible))
+    put("fir_hits", _per_key(p[sr], players, fir_hit))
+    put("fir_rounds", _per_key(p, players, _per_key(sr, rounds, fir_eligible) > 0))
+    put("par_streaks", _per_key(p, players, par_streaks))
+    put("par_streak_total", _per_key(p, players, par_streak_total))
+    put("longest_par_streak", _reduce_at(np.fmax, p, players, longest_par))
+    put("longest_bogey_streak", _reduce_at(np.fmax, p, players, longest_bogey))
+
+    seconds = batch.tee_time.astype(np.float64)
+    put("first_time", _reduce_at(np.fmin, p, players, seconds))
+    put("last_time", _reduce_at(np.fmax, p, players, seconds))
+    # Earliest/latest round per player; ties go to the higher round id, the
+    # later submission
+    order = np.lexsort((batch.round_id, batch.tee_time, p))
+    if rounds:
+        first = order[np.r_[True, p[order][1:] != p[order][:-1]]]
+        last = order[np.r_[p[order][1:] != p[order][:-1], True]]
+        out[p[first], field["first_existing_index"].start] = batch.existing_index[first]
+        out[p[last], field["last_updated_index"].start] = batch.updated_index[last]
+        out[p[last], field["last_round_par_streak"].start] = ending_par[last]
+
+    days = np.floor_divide(batch.tee_time, DAY)
+    day_of_week = (days + 4) % 7  # 1970-01-01 was a Thursday; Sunday = 0 as in getDay()
+    hour = (batch.tee_time % DAY) // 3600
+    period = np.where(hour < 12, 0, np.where(hour < 17, 1, 2))
+    month = batch.tee_time.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64) % 12
+    lunar_age = np.mod((batch.tee_time - KNOWN_NEW_MOON) / DAY, SYNODIC_MONTH) / SYNODIC_MONTH
+    lunar = np.searchsorted(LUNAR_EDGES, lunar_age, side="right") % 8
+    diff0 = np.nan_to_num(batch.differential)
+
+    put("dow_n", _bucketed(p, day_of_week, 7, players))
+    put("dow_ags", _bucketed(p, day_of_week, 7, players, batch.ags))
+    put("dow_diff", _bucketed(p, day_of_week, 7, players, diff0))
+    put("dow_strokes", _bucketed(p, day_of_week, 7, players, batch.total_strokes))
+    put("period_n", _bucketed(p, period, 3, players))
+    put("period_ags", _bucketed(p, period, 3, players, batch.ags))
+    nine_or_eighteen = (n_scores == 9) | (n_scores == 18)
+    holes_type = (n_scores[nine_or_eighteen] == 18).astype(np.int64)
+    put("holes_n", _bucketed(p[nine_or_eighteen], holes_type, 2, players))
+    put("holes_diff", _bucketed(p[nine_or_eighteen], holes_type, 2, players, diff0[nine_or_eighteen]))
+    season = SEASON_OF_MONTH[month]
+    put("season_n", _bucketed(p, season, 4, players))
+    put("season_diff", _bucketed(p, season, 4, players, diff0))
+    put("lunar_n", _bucketed(p, lunar, 8, players))
+    put("lunar_diff", _bucketed(p, lunar, 8, players, diff0))
+
+    # Hole level, found holes only
+    hp = p[sr][found]
+    strokes = batch.strokes[found]
+    par = batch.par[found]
+    diff = to_par[found]
+    distance = batch.distance[found]
+    number = batch.hole_number[found]
+
+    par_type = (par >= 3) & (par <= 5)
+    put("par_type_strokes", _bucketed(hp[par_type], (par[par_type] - 3).astype(np.int64), 3, players,
+                                      strokes[par_type]))
+    put("par_type_n", _bucketed(hp[par_type], (par[par_type] - 3).astype(np.int64), 3, players))
+    put("score_bins", _bucketed(hp, (np.clip(diff, -2, 3) + 2).astype(np.int64), 6, players))
+
+    numbered = (number >= 1) & (number <= 18)
+    hole = number[numbered] - 1
+    hn = hp[numbered]
+    put("hole_n", _bucketed(hn, hole, 18, players))
+    put("hole_strokes", _bucketed(hn, hole, 18, players, strokes[numbered]))
+    put("hole_par", _bucketed(hn, hole, 18, players, par[numbered]))
+    put("hole_pars", _bucketed(hn, hole, 18, players, diff[numbered] == 0))
+    put("hole_birdies", _bucketed(hn, hole, 18, players, diff[numbered] < 0))
+    put("hole_bogeys", _bucketed(hn, hole, 18, players, diff[numbered] >= 1))
+
+    band = np.where(distance < 350, 0, np.where(distance < 450, 1, 2))
+    put("band_strokes", _bucketed(hp, band, 3, players, strokes))
+    put("band_par", _bucketed(hp, band, 3, players, par))
+    put("band_n", _bucketed(hp, band, 3, players))
+    put("band_min_distance", _reduce_at(np.fmin, hp * 3 + band, players * 3, distance))
+    put("band_max_distance", _reduce_at(np.fmax, hp * 3 + band, players * 3, distance))
+    put("total_distance", _per_key(hp, players, np.nan_to_num(distance)))
+    return out
+
+
+def _groups(*keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct key tuples (as rows) and each input row's group."""
+    stacked = np.stack(keys, axis=1) if keys[0].size else np.zeros((0, len(keys)), dtype=np.int64)
+    unique, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    return unique, inverse.reshape(-1)
+
+
+def bucket_rows(batch: Batch) -> Dict[str, List[tuple]]:
+    """Rows for the bucket tables, aggregated over the batch."""
+    ids = batch.player_ids
+    p = batch.player
+    rows: Dict[str, List[tuple]] = {}
+
+    with_course = batch.course_id > 0
+    index = np.flatnonzero(with_course)
+    unique, group = _groups(p[index], batch.course_id[index])
+    n = len(unique)
+    first = np.full(n, -1)
+    order = index[np.lexsort((batch.tee_time[index],))]
+    first[group[np.searchsorted(index, order)][::-1]] = order[::-1]  # Earliest round of each group wins
+    diff = batch.differential[index]
+    rows["course"] = [
+        (ids[player], int(course_id), batch.course_name[first[g]] or "", batch.course_city[first[g]] or "",
+         batch.course_country[first[g]] or "", int(count), float(sum_diff), float(min_diff), float(max_diff),
+         float(sum_ags), int(first_time))
+        for g, ((player, course_id), count, sum_diff, min_diff, max_diff, sum_ags, first_time) in enumerate(zip(
+            unique, _per_key(group, n), _per_key(group, n, diff), _reduce_at(np.fmin, group, n, diff),
+            _reduce_at(np.fmax, group, n, diff), _per_key(group, n, batch.ags[index]),
+            _reduce_at(np.fmin, group, n, batch.tee_time[index].astype(np.float64))))
+    ]
+
+    year_month = batch.tee_time.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    unique, group = _groups(p, year_month)
+    n = len(unique)
+    rows["month"] = [
+        (ids[player], int(1970 + ym // 12), int(ym % 12), int(count), float(sum_diff))
+        for (player, ym), count, sum_diff in zip(unique, _per_key(group, n),
+                                                  _per_key(group, n, np.nan_to_num(batch.differential)))
+    ]
+
+    histogram = []
+    score_player = p[batch.score_round]
+    score_time = batch.tee_time[batch.score_round].astype(np.float64)
+    for kind, player, value, seen in (("hole", score_player, batch.strokes, score_time),
+                                      ("round", p, batch.ags, batch.tee_time.astype(np.float64))):
+        valid = ~np.isnan(value)
+        unique, group = _groups(player[valid], value[valid].astype(np.int64))
+        n = len(unique)
+        histogram += [(ids[pl], kind, int(v), int(count), int(first_seen))
+                      for (pl, v), count, first_seen in zip(unique, _per_key(group, n),
+                                                            _reduce_at(np.fmin, group, n, seen[valid]))]
+    rows["histogram"] = histogram
+
+    hole_found = batch.found & (batch.course_id[batch.score_round] > 0)
+    unique, _ = _groups(score_player[hole_found], batch.course_id[batch.score_round][hole_found],
+                        batch.hole_number[hole_found])
+    rows["hole"] = [(ids[player], int(course_id), int(number)) for player, course_id, number in unique]
+
+    exceptional = np.flatnonzero(batch.esr > 0)
+    rows["exceptional"] = [
+        (int(batch.round_id[i]), ids[p[i]], batch.course_name[i] or "", batch.course_country[i] or "",
+         int(batch.tee_time[i]), float(batch.differential[i]), float(batch.esr[i]))
+        for i in exceptional
+    ]
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+STORE_SCHEMA = """
+create table if not exists stats_round (round_id integer primary key, player_id text not null,
+    tee_time integer not null, fingerprint integer not null);
+create index if not exists stats_round_player on stats_round (player_id, tee_time);
+create table if not exists stats_partial (player_id text primary key, state blob not null);
+create table if not exists stats_course (player_id text not null, course_id integer not null, name text,
+    city text, country text, rounds integer not null, sum_diff real not null, min_diff real, max_diff real,
+    sum_ags real not null, first_time integer not null, primary key (player_id, course_id));
+create table if not exists stats_month (player_id text not null, year integer not null, month integer not null,
+    rounds integer not null, sum_diff real not null, primary key (player_id, year, month));
+create table if not exists stats_histogram (player_id text not null, kind text not null, value integer not null,
+    count integer not null, first_time integer not null, primary key (player_id, kind, value));
+create table if not exists stats_hole (player_id text not null, course_id integer not null,
+    hole_number integer not null, primary key (player_id, course_id, hole_number));
+create table if not exists stats_exceptional (round_id integer primary key, player_id text not null,
+    course_name text, country text, tee_time integer not null, differential real, adjustment real);
+create index if not exists stats_exceptional_player on stats_exceptional (player_id);
+create table if not exists player_statistics (player_id text primary key, computed_at text not null,
+    stats text not null);
+"""
+
+PLAYER_TABLES = ("stats_round", "stats_partial", "stats_course", "stats_month", "stats_histogram", "stats_hole",
+                 "stats_exceptional", "player_statistics")
+
+UPSERTS = {
+    "course": "insert into stats_course values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+              "on conflict (player_id, course_id) do update set rounds = rounds + excluded.rounds, "
+              "sum_diff = sum_diff + excluded.sum_diff, min_diff = min(min_diff, excluded.min_diff), "
+              "max_diff = max(max_diff, excluded.max_diff), sum_ags = sum_ags + excluded.sum_ags, "
+              "name = case when excluded.first_time < first_time then excluded.name else name end, "
+              "first_time = min(first_time, excluded.first_time)",
+    "month": "insert into stats_month values (?, ?, ?, ?, ?) on conflict (player_id, year, month) "
+             "do update set rounds = rounds + excluded.rounds, sum_diff = sum_diff + excluded.sum_diff",
+    "histogram": "insert into stats_histogram values (?, ?, ?, ?, ?) on conflict (player_id, kind, value) "
+                 "do update set count = count + excluded.count, first_time = min(first_time, excluded.first_time)",
+    "hole": "insert or ignore into stats_hole values (?, ?, ?)",
+    "exceptional": "insert or replace into stats_exceptional values (?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+def open_store(path: str) -> sqlite3.Connection:
+    return _open_store(path, STORE_SCHEMA, "player_id text")
+
+
+def apply_batch(store: sqlite3.Connection, batch: Batch, fingerprints: Dict[int, Tuple[str, int]],
+                replace: bool) -> None:
+    """
+    Fold a batch into the store: merged into the players' existing
+    statistics, or replacing them (the batch then holds all their rounds).
+    """
+    ids = [str(pid) for pid in batch.player_ids]
+    partials = compute_partials(batch)
+    set_affected(store, ids)
+
+    if replace:
+        delete_affected(store, PLAYER_TABLES, "player_id")
+    else:
+        existing = partial_states(store, "stats_partial", "player_id")
+        if existing:
+            previous = LAYOUT.empty(len(ids))
+            for row, pid in enumerate(ids):
+                if pid in existing:
+                    previous[row] = np.frombuffer(existing[pid], dtype=np.float64)
+            partials = LAYOUT.merge(previous, partials)
+
+    store.executemany("insert or replace into stats_partial values (?, ?)",
+                      ((pid, partials[row].tobytes()) for row, pid in enumerate(ids)))
+    for table, rows in bucket_rows(batch).items():
+        store.executemany(UPSERTS[table], rows)
+    store.executemany("insert or replace into stats_round values (?, ?, ?, ?)",
+                      ((int(round_id), ids[player], int(tee_time), fingerprints[int(round_id)][1])
+                       for round_id, player, tee_time in zip(batch.round_id, batch.player, batch.tee_time)))
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _mean(total: float, count: float) -> float:
+    return float(total / count) if count else 0.0
+
+
+def _mode(histogram: List[Tuple[int, int, int]]) -> Tuple[Optional[int], int]:
+    """Most frequent value; ties go to the value seen first, as the screens' Map iteration does."""
+    if not histogram:
+        return None, 0
+    value, count, _ = min(histogram, key=lambda row: (-row[1], row[2]))
+    return value, count
+
+
+def _run_ending_at(weeks: List[int], week: int) -> int:
+    present = set(weeks)
+    streak = 0
+    while week - streak in present:
+        streak += 1
+    return streak
+
+
+def render(player_id: str, state: np.ndarray, extra: dict, now: int, handicap_index: float) -> dict:
+    """The statistics screens' values for one player, named as in lib/statistics/types.ts."""
+    v = {name: state[field] for name, field in LAYOUT.fields.items()}
+    one = {name: float(values[0]) for name, values in v.items() if len(values) == 1}
+    rounds = one["rounds"]
+
+    first_index, last_index = one["first_existing_index"], one["last_updated_index"]
+    first_finite = np.isfinite(first_index)
+    first = first_index if first_finite else 0.0
+    last = last_index if np.isfinite(last_index) else 0.0
+    overview = {
+        "totalRounds": int(rounds),
+        "avgScore": _mean(one["sum_ags"], rounds),
+        "avgPar": _mean(one["sum_par"], one["par_rounds"]) if one["par_rounds"] else None,
+        "bestDifferential": one["min_diff"] if rounds else 0,
+        "worstDifferential": one["max_diff"] if rounds else 0,
+        "improvementRate": (first - last) / first * 100 if first_finite and first_index != 0 else 0,
+        "currentHandicap": handicap_index,
+        "handicapChange": last - first if rounds else 0,
+    }
+
+    courses = sorted(extra["course"], key=lambda row: (-row[5], row[10]))
+    course_performance = [
+        {"courseId": course_id, "courseName": name, "city": city, "country": country, "roundCount": count,
+         "avgDifferential": sum_diff / count, "bestDifferential": min_diff, "worstDifferential": max_diff,
+         "avgScore": sum_ags / count}
+        for _, course_id, name, city, country, count, sum_diff, min_diff, max_diff, sum_ags, _ in courses
+    ]
+
+    day_of_week = [
+        {"day": DAYS_OF_WEEK[d], "dayIndex": d, "roundCount": int(v["dow_n"][d]),
+         "avgScore": _mean(v["dow_ags"][d], v["dow_n"][d]), "avgDifferential": _mean(v["dow_diff"][d], v["dow_n"][d]),
+         "totalStrokes": float(v["dow_strokes"][d])}
+        for d in range(7)
+    ]
+    time_of_day = [
+        {"period": name, "roundCount": int(v["period_n"][i]), "avgScore": _mean(v["period_ags"][i], v["period_n"][i]),
+         "percentage": float(v["period_n"][i] / (rounds or 1) * 100)}
+        for i, name in enumerate(PERIODS)
+    ]
+    holes_played = [
+        {"type": name, "count": int(v["holes_n"][i]), "avgDifferential": _mean(v["holes_diff"][i], v["holes_n"][i])}
+        for i, name in enumerate(("9-hole", "18-hole"))
+    ]
+
+    months = sorted(extra["month"], key=lambda row: (row[1], row[2]))
+    rounds_per_month = [{"month": MONTHS[month][:3], "year": year, "count": count}
+                        for _, year, month, count, _ in months]
+    most_active = max(months, key=lambda row: row[3], default=None)  # First (earliest) of equal counts
+    best_months = [row for row in months if row[3] >= 2]
+    best_month = min(best_months, key=lambda row: row[4] / row[3], default=None)
+
+    bins = v["score_bins"]
+    total_holes = float(bins.sum()) or 1
+    distribution = {name: {"count": int(bins[i]), "percentage": float(bins[i] / total_holes * 100)}
+                    for i, name in enumerate(SCORE_BINS)}
+
+    hole_stats = [
+        {"holeNumber": h + 1, "avgStrokes": _mean(v["hole_strokes"][h], v["hole_n"][h]),
+         "avgOverPar": _mean(v["hole_strokes"][h], v["hole_n"][h]) - _mean(v["hole_par"][h], v["hole_n"][h]),
+         "totalPlayed": int(v["hole_n"][h]), "parCount": int(v["hole_pars"][h]),
+         "birdieCount": int(v["hole_birdies"][h]), "bogeyCount": int(v["hole_bogeys"][h])}
+        for h in range(18)
+    ]
+    halves = {}
+    for half, holes in (("front9", slice(0, 9)), ("back9", slice(9, 18))):
+        count = v["hole_n"][holes].sum()
+        avg_strokes = _mean(v["hole_strokes"][holes].sum(), count)
+        halves[half] = {"avgStrokes": avg_strokes,
+                        "avgOverPar": avg_strokes - _mean(v["hole_par"][holes].sum(), count),
+                        "totalHoles": int(count)}
+    difference = abs(halves["front9"]["avgOverPar"] - halves["back9"]["avgOverPar"])
+    better_half = "even"
+    if difference > 0.05:
+        better_half = "front" if halves["front9"]["avgOverPar"] < halves["back9"]["avgOverPar"] else "back"
+
+    distance_performance = [
+        {"category": category, "label": label,
+         "avgOverPar": _mean(v["band_strokes"][i], v["band_n"][i]) - _mean(v["band_par"][i], v["band_n"][i]),
+         "holeCount": int(v["band_n"][i]),
+         "minDistance": float(v["band_min_distance"][i]) if v["band_n"][i] else 0,
+         "maxDistance": float(v["band_max_distance"][i]) if v["band_n"][i] else 0}
+        for i, (category, label) in enumerate(DISTANCE_BANDS)
+    ]
+
+    lucky_number, _ = _mode(extra["histogram"].get("hole", []))
+    signature, signature_count = _mode(extra["histogram"].get("round", []))
+
+    phase_stats = [
+        {"phase": phase, "phaseName": name, "emoji": emoji, "roundCount": int(v["lunar_n"][i]),
+         "avgDifferential": _mean(v["lunar_diff"][i], v["lunar_n"][i])}
+        for i, (phase, name, emoji) in enumerate(LUNAR_PHASES)
+    ]
+    with_rounds = [phase for phase in phase_stats if phase["roundCount"]]
+
+    times = extra["times"]
+    days_since_last = (now - int(one["last_time"])) // DAY if rounds else 0
+    golf_age = (now - min(int(one["first_time"]), now)) // DAY if rounds else 0
+    longest_gap = max(((b - a) // DAY for a, b in zip(times, times[1:])), default=0)
+    weeks = [(t // DAY + 4) // 7 for t in times]
+
+    diff_n = one["diff_n"]
+    mean = _mean(one["sum_diff"], diff_n)
+    std = float(np.sqrt(max(0.0, one["sum_diff_sq"] / diff_n - mean ** 2))) if diff_n >= 2 and rounds >= 2 else 0.0
+
+    exceptional = sorted(extra["exceptional"], key=lambda row: -row[4])
+    countries = {row[4] for row in extra["course"] if row[4]}
+
+    return {
+        "playerId": player_id,
+        "overview": overview,
+        "coursePerformance": course_performance,
+        "dayOfWeek": day_of_week,
+        "timeOfDay": time_of_day,
+        "holesPlayed": holes_played,
+        "roundsPerMonth": rounds_per_month,
+        "fun": {
+            "totalStrokes": one["total_strokes"],
+            "avgStrokesPerHole": _mean(one["total_strokes"], one["score_rows"]),
+            "strokesByDayOfWeek": day_of_week,
+            "strokesByParType": [
+                {"parType": par, "totalStrokes": float(v["par_type_strokes"][i]),
+                 "avgStrokes": _mean(v["par_type_strokes"][i], v["par_type_n"][i]), "holeCount": int(v["par_type_n"][i])}
+                for i, par in enumerate((3, 4, 5))
+            ],
+            "scoreDistribution": distribution,
+            "daysSinceLastRound": int(days_since_last),
+            "golfAgeDays": int(golf_age),
+            "perfectHoles": {"total": int(bins[:3].sum()), "eagles": int(bins[0]), "birdies": int(bins[1]),
+                             "pars": int(bins[2])},
+            "bogeyFreeRounds": int(one["bogey_free"]),
+            "holeByHoleStats": {
+                "holeStats": hole_stats,
+                "frontBackComparison": {**halves, "betterHalf": better_half, "difference": difference},
+                "streakStats": {
+                    "longestParStreak": int(np.nan_to_num(one["longest_par_streak"])),
+                    "longestBogeyStreak": int(np.nan_to_num(one["longest_bogey_streak"])),
+                    "currentParStreak": int(np.nan_to_num(one["last_round_par_streak"])),
+                    "averageParStreak": _mean(one["par_streak_total"], one["par_streaks"]),
+                },
+                "distancePerformance": distance_performance,
+                "totalDistancePlayed": one["total_distance"],
+                "luckyNumber": lucky_number,
+                "signatureScore": signature if signature_count > 1 else None,
+            },
+            "lunarPerformance": {
+                "phaseStats": phase_stats,
+                "bestPhase": min(with_rounds, key=lambda phase: phase["avgDifferential"], default=None),
+                "worstPhase": max(with_rounds, key=lambda phase: phase["avgDifferential"], default=None),
+            },
+            "uniqueHolesPlayed": extra["holes"],
+            "uniqueCoursesPlayed": len(extra["course"]),
+            "countriesPlayed": len(countries),
+        },
+        "activity": {
+            "avgRoundsPerMonth": rounds / max(1, golf_age / 30) if rounds else 0,
+            "mostActiveMonth": {"month": MONTHS[most_active[2]], "year": most_active[1], "count": most_active[3]}
+            if most_active else None,
+            "longestGap": int(longest_gap),
+            "currentStreak": _run_ending_at(weeks, (now // DAY + 4) // 7) if rounds else 0,
+            "seasonalStats": [
+                {"season": name, "roundCount": int(v["season_n"][i]),
+                 "avgDifferential": _mean(v["season_diff"][i], v["season_n"][i])}
+                for i, name in enumerate(SEASONS)
+            ],
+        },
+        "performance": {
+            "consistencyRating": round(max(0.0, min(100.0, 100 - std * 10))) if rounds >= 3 else 0,
+            "scoringConsistency": std,
+            "bestMonth": {"month": MONTHS[best_month[2]], "year": best_month[1],
+                          "avgDifferential": best_month[4] / best_month[3], "roundCount": best_month[3]}
+            if best_month else None,
+            "uniqueCourses": len(extra["course"]),
+            "exceptionalRounds": [
+                {"roundId": round_id, "courseName": name, "country": country,
+                 "date": str(np.datetime64(tee_time, "s")), "differential": differential,
+                 "adjustment": adjustment}
+                for round_id, _, name, country, tee_time, differential, adjustment in exceptional
+            ],
+        },
+        "shotLevel": {
+            "puttsPerRound": {"value": _mean(one["putts_total"], one["putts_rounds"]) if one["putts_rounds"] else None,
+                              "sampleSize": int(one["putts_rounds"])},
+            "girPercentage": {"value": one["gir_hits"] / one["gir_holes"] * 100 if one["gir_holes"] else None,
+                              "sampleSize": int(one["gir_rounds"])},
+            "firPercentage": {"value": one["fir_hits"] / one["fir_holes"] * 100 if one["fir_holes"] else None,
+                              "sampleSize": int(one["fir_rounds"])},
+            "penaltiesPerRound": {"value": _mean(one["penalty_total"], one["penalty_rounds"])
+                                  if one["penalty_rounds"] else None,
+                                  "sampleSize": int(one["penalty_rounds"])},
+        },
+    }
+
+
+def materialize(store: sqlite3.Connection, source: sqlite3.Connection, player_ids: Sequence[str],
+                now: Optional[datetime] = None) -> None:
+    """Re-render the statistics rows of the given players from their stored aggregates."""
+    now = now or datetime.now()
+    now_seconds = int(np.datetime64(now.replace(microsecond=0)).astype("datetime64[s]").astype(np.int64))
+    computed_at = now.isoformat(timespec="seconds")
+    set_affected(store, player_ids)
+    in_affected = "where player_id in (select player_id from temp.affected)"
+
+    def grouped(query: str, key_index: int = 0) -> Dict[str, list]:
+        result: Dict[str, list] = {}
+        for row in store.execute(query):
+            result.setdefault(row[key_index], []).append(row)
+        return result
+
+    states = partial_states(store, "stats_partial", "player_id")
+    courses = grouped(f"select * from stats_course {in_affected}")
+    months = grouped(f"select * from stats_month {in_affected}")
+    histograms: Dict[str, Dict[str, list]] = {}
+    for player_id, kind, value, count, first_time in store.execute(f"select * from stats_histogram {in_affected}"):
+        histograms.setdefault(player_id, {}).setdefault(kind, []).append((value, count, first_time))
+    holes = dict(store.execute(f"select player_id, count(*) from stats_hole {in_affected} group by player_id"))
+    exceptional = grouped(f"select * from stats_exceptional {in_affected}", key_index=1)
+    times: Dict[str, List[int]] = {}
+    for player_id, tee_time in store.execute(
+            f"select player_id, tee_time from stats_round {in_affected} order by player_id, tee_time"):
+        times.setdefault(player_id, []).append(tee_time)
+
+    handicaps: Dict[str, float] = {}
+    ids = list(states)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        handicaps.update(source.execute(
+            f'select id, "handicapIndex" from profile where id in ({",".join("?" * len(chunk))})', chunk))
+
+    rows = []
+    for player_id, state in states.items():
+        extra = {"course": courses.get(player_id, []), "month": months.get(player_id, []),
+                 "histogram": histograms.get(player_id, {}), "holes": holes.get(player_id, 0),
+                 "exceptional": exceptional.get(player_id, []), "times": times.get(player_id, [])}
+        stats = render(player_id, np.frombuffer(state, dtype=np.float64), extra, now_seconds,
+                       float(handicaps.get(player_id) or 0))
+        rows.append((player_id, computed_at, json.dumps(stats, ensure_ascii=False)))
+    store.executemany("insert or replace into player_statistics values (?, ?, ?)", rows)
+
+
+# ---------------------------------------------------------------------------
+# Build and refresh
+# ---------------------------------------------------------------------------
+
+def build(store: sqlite3.Connection, source: sqlite3.Connection) -> int:
+    """Recompute every player's statistics; returns the number of players."""
+    fingerprints = round_fingerprints(source)
+    batch = load_batch(source, sorted(fingerprints))
+    store.execute("begin")
+    for table in PLAYER_TABLES:
+        store.execute(f"delete from {table}")
+    apply_batch(store, batch, fingerprints, replace=True)
+    materialize(store, source, list(batch.player_ids))
+    store.execute("commit")
+    return len(batch.player_ids)
+
+
+def refresh(store: sqlite3.Connection, source: sqlite3.Connection) -> Tuple[int, int, int]:
+    """
+    Bring the store up to date with the source.
+
+    Returns (players with only new rounds, players recomputed, new rounds).
+    """
+    fingerprints = round_fingerprints(source)
+    plan = plan_refresh(fingerprints, stored_fingerprints(store, "stats_round", "player_id"))
+    store.execute("begin")
+    appended_players = refresh_batches(
+        store, source, plan, PLAYER_TABLES, "player_id", load_batch,
+        lambda batch, replace: apply_batch(store, batch, fingerprints, replace),
+        lambda batch: [str(pid) for pid in batch.player_ids])
+    touched = appended_players | {fingerprints[round_id][0] for round_id in plan.recompute_rounds}
+    if touched:
+        materialize(store, source, sorted(touched))
+    store.execute("commit")
+    return len(appended_players - plan.recompute), len(plan.recompute), plan.new_rounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materialized player statistics")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("build", "Recompute every player's statistics"),
+                            ("refresh", "Apply new, changed and deleted rounds")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("source", help="sqlite database with the app's round/score/hole/course/profile tables")
+        sub.add_argument("--store", default=DEFAULT_STORE)
+    show_parser = subparsers.add_parser("show", help="Print one player's statistics row")
+    show_parser.add_argument("player_id")
+    show_parser.add_argument("--store", default=DEFAULT_STORE)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        if not os.path.isfile(args.store):
+            print(f"Error: {args.store} not found")
+            sys.exit(1)
+        show_row(open_store(args.store), "player_statistics", "player_id", args.player_id,
+                 f"no statistics for {args.player_id}")
+        return
+
+    if not os.path.isfile(args.source):
+        print(f"Error: {args.source} not found")
+        sys.exit(1)
+
+    source = sqlite3.connect(args.source)
+    store = open_store(args.store)
+    started = time.perf_counter()
+    if args.command == "build":
+        players = build(store, source)
+        print(f"Built statistics for {players} players in {time.perf_counter() - started:.2f}s -> {args.store}")
+    else:
+        appended, recomputed, new_rounds = refresh(store, source)
+        print(f"Refreshed in {time.perf_counter() - started:.2f}s: {new_rounds} new rounds merged into "
+              f"{appended} players, {recomputed} players recomputed -> {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Daily playing conditions calculation (PCC) for every course and tee.
+
+Score differentials from handicap-core assume normal conditions. WHS adjusts
+them by a PCC of -1 to +3 when a day's scores on a course were clearly worse
+(wind, rain, a firm setup) or better than the players' indexes predict. That
+needs every round played on the course that day, so it runs here as a batch
+job over the round table rather than in the per-player queue processor:
+
+  1. eligible rounds in the window: approved 18-hole rounds (not
+     quarantined) by players with an index of 36.0 or less
+  2. grouped by tee and day; each round contributes its raw differential
+     (before ESR) minus the player's index going into the round
+  3. per group with at least --min-scores rounds: trimmed mean of those
+     gaps, less the gap an average round shows in normal conditions
+     (--expected), pulled one standard error towards zero so that a small
+     field's noise does not move differentials, then truncated towards zero
+     and clamped to -1..+3
+
+Grouping, sorting, trimming and the means run as NumPy operations over all
+rounds of the window at once. The results replace the window's rows of
+playing_conditions (created if missing) in one transaction.
+
+handicap-core does not apply PCC (plans/README.md, COMPLIANCE-02), so nothing
+here changes a differential or enqueues a recalculation; the table is what an
+engine that does would read, keyed by tee and day.
+
+--synthetic builds a stand-in database (the queue_load.py schema) with fields
+of synthetic players on many course-days, some with planted condition
+shifts, and reports how many planted shifts were recovered.
+
+Usage:
+    python scripts/playing_conditions.py DATABASE.sqlite [--date 2026-05-02] [--days 1]
+    python scripts/playing_conditions.py DATABASE.sqlite --all
+    python scripts/playing_conditions.py --synthetic 5000 [--db pcc-standin.sqlite]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from stats_store import standin_path, table_columns
+
+
+MAX_ELIGIBLE_INDEX = 36.0
+MIN_SCORES = 8
+EXPECTED_GAP = 3.0  # A typical differential sits about three strokes above the index
+TRIM = 0.1  # Share of gaps dropped at each end of a group
+STANDARD_ERRORS = 1.0  # Margin a group's mean must clear before it counts
+PCC_MIN, PCC_MAX = -1, 3
+
+PCC_SCHEMA = """
+create table if not exists playing_conditions (tee_id integer not null, play_date text not null,
+    course_id integer not null, pcc integer not null, raw_adjustment real not null, scores integer not null,
+    computed_at text not null, primary key (tee_id, play_date));
+"""
+
+
+@dataclass
+class EligibleScores:
+    course_id: np.ndarray
+    tee_id: np.ndarray
+    day: np.ndarray  # Days since 1970
+    gap: np.ndarray  # Raw differential minus the index going into the round
+
+
+@dataclass
+class PccResult:
+    course_id: np.ndarray
+    tee_id: np.ndarray
+    day: np.ndarray
+    scores: np.ndarray
+    raw: np.ndarray
+    pcc: np.ndarray
+
+
+def load_scores(db: sqlite3.Connection, start: Optional[date], end: Optional[date]) -> EligibleScores:
+    columns = table_columns(db, "round")
+    filters = ['r."existingHandicapIndex" <= ?']
+    params: list = [MAX_ELIGIBLE_INDEX]
+    if "holes_played" in columns:
+        filters.append("r.holes_played = 18")
+    if "approvalStatus" in columns:
+        filters.append("r.\"approvalStatus\" = 'approved'")
+    if "quarantined" in columns:
+        filters.append("not r.quarantined")
+    if start is not None:
+        filters.append('substr(r."teeTime", 1, 10) between ? and ?')
+        params += [start.isoformat(), end.isoformat()]
+
+    rows = db.execute(
+        f'select r."courseId", r."teeId", substr(r."teeTime", 1, 10), '
+        f'r."scoreDifferential" + r."exceptionalScoreAdjustment" - r."existingHandicapIndex" '
+        f'from round r where {" and ".join(filters)}', params).fetchall()
+    columns = list(zip(*rows)) if rows else [(), (), (), ()]
+    return EligibleScores(
+        course_id=np.array(columns[0], dtype=np.int64),
+        tee_id=np.array(columns[1], dtype=np.int64),
+        day=np.array(columns[2], dtype="datetime64[D]").astype(np.int64),
+        gap=np.array(columns[3], dtype=np.float64),
+    )
+
+
+def compute_pcc(scores: EligibleScores, min_scores: int = MIN_SCORES, expected: float = EXPECTED_GAP,
+                trim: float = TRIM) -> PccResult:
+    """PCC of every tee-day with enough eligible scores."""
+    order = np.lexsort((scores.gap, scores.day, scores.tee_id))
+    tee, day, gap = scores.tee_id[order], scores.day[order], scores.gap[order]
+    total = len(gap)
+
+    starts_mask = np.r_[True, (tee[1:] != tee[:-1]) | (day[1:] != day[:-1])] if total else np.zeros(0, bool)
+    starts = np.flatnonzero(starts_mask)
+    group = np.cumsum(starts_mask) - 1
+    counts = np.diff(np.r_[starts, total])
+
+    # Gaps are sorted within each group, so trimming is a rank window
+    cut = np.floor(counts * trim).astype(np.int64)
+    rank = np.arange(total) - starts[group]
+    keep = (rank >= cut[group]) & (rank < (counts - cut)[group])
+    kept = counts - 2 * cut
+    kept_n = np.maximum(kept, 1)
+    means = np.bincount(group[keep], weights=gap[keep], minlength=len(starts)) / kept_n
+    squares = np.bincount(group[keep], weights=gap[keep] ** 2, minlength=len(starts)) / kept_n
+    standard_error = np.sqrt(np.maximum(squares - means ** 2, 0) / np.maximum(kept - 1, 1))
+
+    enough = counts >= min_scores
+    excess = means[enough] - expected
+    raw = np.sign(excess) * np.maximum(np.abs(excess) - STANDARD_ERRORS * standard_error[enough], 0)
+    return PccResult(
+        course_id=scores.course_id[order][starts][enough],
+        tee_id=tee[starts][enough],
+        day=day[starts][enough],
+        scores=counts[enough],
+        raw=raw,
+        pcc=np.clip(np.trunc(raw), PCC_MIN, PCC_MAX).astype(np.int64),
+    )
+
+
+def write_pcc(db: sqlite3.Connection, result: PccResult, start: Optional[date], end: Optional[date]) -> None:
+    """Replace the window's playing_conditions rows with the result, in one transaction."""
+    computed_at = datetime.now().isoformat(timespec="seconds")
+    days = np.datetime_as_string(result.day.astype("datetime64[D]")).tolist()
+    db.executescript(PCC_SCHEMA)
+    with db:
+        if start is None:
+            db.execute("delete from playing_conditions")
+        else:
+            db.execute("delete from playing_conditions where play_date between ? and ?",
+                       (start.isoformat(), end.isoformat()))
+        db.executemany(
+            "insert into playing_conditions values (?, ?, ?, ?, ?, ?, ?)",
+            zip(result.tee_id.tolist(), days, result.course_id.tolist(), result.pcc.tolist(),
+                np.round(result.raw, 2).tolist(), result.scores.tolist(), [computed_at] * len(days)))
+
+
+def run(db: sqlite3.Connection, start: Optional[date], end: Optional[date], min_scores: int,
+        expected: float) -> PccResult:
+    started = time.perf_counter()
+    scores = load_scores(db, start, end)
+    loaded = time.perf_counter()
+    result = compute_pcc(scores, min_scores, expected)
+    computed = time.perf_counter()
+    write_pcc(db, result, start, end)
+    written = time.perf_counter()
+
+    window = "all days" if start is None else f"{start} to {end}"
+    adjusted = int(np.count_nonzero(result.pcc))
+    print(f"{window}: {len(scores.gap)} eligible rounds, {len(result.pcc)} tee-days with {min_scores}+ scores, "
+          f"{adjusted} adjusted")
+    for value in range(PCC_MIN, PCC_MAX + 1):
+        if value:
+            print(f"  PCC {value:+d}: {int(np.count_nonzero(result.pcc == value))}")
+    print(f"Loaded in {loaded - started:.2f}s, computed in {computed - loaded:.3f}s, "
+          f"written in {written - computed:.2f}s")
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Synthetic stand-in
+# ---------------------------------------------------------------------------
+
+def _differential(adjusted_gross: int, rating: float, slope: int) -> float:
+    value = (adjusted_gross - rating) * 113 / slope
+    return float(np.ceil(value * 10) / 10) if value < 0 else round(value, 1)
+
+
+def build_synthetic(path: str, course_days: int, seed: int = 7) -> dict:
+    """
+    A stand-in database with `course_days` tee-days of fields.
+
+    Returns the planted condition shift (strokes) of each (tee id, day).
+    """
+    from queue_load import STANDIN_SCHEMA
+
+    rng = random.Random(seed)
+    db = sqlite3.connect(path, isolation_level=None)
+    db.executescript(STANDIN_SCHEMA)
+    db.execute("drop trigger if exists enqueue_handicap_calculation")  # Not a queue test
+    db.execute("begin")
+
+    tees = []
+    for course in range(max(1, course_days // 20)):
+        course_id = db.execute(
+            "insert into course (name, city, country, \"approvalStatus\") values (?, 'Town', 'Scotland', 'approved')",
+            (f"Synthetic Links {course + 1}",)).lastrowid
+        for name in ("White", "Yellow"):
+            rating = round(rng.uniform(67.0, 74.5), 1)
+            slope = rng.randint(110, 140)
+            tee_id = db.execute(
+                'insert into "teeInfo" ("courseId", name, gender, "courseRating18", "slopeRating18", "totalPar", '
+                '"approvalStatus") values (?, ?, \'mens\', ?, ?, 72, \'approved\')',
+                (course_id, name, rating, slope)).lastrowid
+            tees.append((course_id, tee_id, rating, slope))
+
+    players = [(f"synthetic-{i:06d}", round(min(54.0, max(-2.0, rng.gauss(18, 9))), 1)) for i in range(5000)]
+    db.executemany('insert into profile (id, email, "handicapIndex") values (?, ?, ?)',
+                   ((player_id, f"{player_id}@example.invalid", index) for player_id, index in players))
+
+    first_day = date(2026, 4, 1)
+    planted = {}
+    round_rows = []
+    used = set()
+    while len(planted) < course_days:
+        course_id, tee_id, rating, slope = rng.choice(tees)
+        day = first_day + timedelta(days=rng.randrange(180))
+        if (tee_id, day) in used:
+            continue
+        used.add((tee_id, day))
+        shift = rng.choice([0.0] * 6 + [rng.uniform(-2.0, 5.0)])
+        planted[(tee_id, day.isoformat())] = shift
+        for player_id, index in rng.sample(players, rng.randint(4, 40)):
+            gap = rng.gauss(EXPECTED_GAP, 3.0) + shift
+            adjusted_gross = round(rating + (index + gap) * slope / 113)
+            differential = _differential(adjusted_gross, rating, slope)
+            tee_time = f"{day.isoformat()}T{rng.randint(7, 16):02d}:{rng.randrange(0, 60, 10):02d}:00"
+            round_rows.append((player_id, course_id, tee_id, tee_time, adjusted_gross, adjusted_gross,
+                               differential, index, index))
+    db.executemany(
+        'insert into round ("userId", "courseId", "teeId", "teeTime", "totalStrokes", "adjustedGrossScore", '
+        '"scoreDifferential", "existingHandicapIndex", "updatedHandicapIndex", "parPlayed", "approvalStatus", '
+        'holes_played) values (?, ?, ?, ?, ?, ?, ?, ?, ?, 72, \'approved\', 18)', round_rows)
+    db.execute("commit")
+    db.close()
+    print(f"Synthetic stand-in: {len(round_rows)} rounds on {course_days} tee-days -> {path}")
+    return planted
+
+
+def report_recovery(result: PccResult, planted: dict) -> None:
+    """How the computed PCCs compare with the shifts planted in the synthetic fields."""
+    days = np.datetime_as_string(result.day.astype("datetime64[D]")).tolist()
+    computed = dict(zip(zip(result.tee_id.tolist(), days), result.pcc.tolist()))
+    exact = within_one = wrong_way = 0
+    for key, value in computed.items():
+        target = int(np.clip(np.trunc(planted[key]), PCC_MIN, PCC_MAX))
+        exact += value == target
+        within_one += abs(value - target) <= 1
+        wrong_way += value * target < 0 or (target == 0 and value != 0)
+    n = len(computed) or 1
+    print(f"Against planted shifts: {exact / n:.1%} exact, {within_one / n:.1%} within one, "
+          f"{wrong_way / n:.1%} adjusted in the wrong direction or without a shift")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily playing conditions calculation per course and tee")
+    parser.add_argument("database", nargs="?", help="sqlite database with the app's round table")
+    parser.add_argument("--date", help="Last day of the window (default: yesterday)")
+    parser.add_argument("--days", type=int, default=1, help="Days in the window")
+    parser.add_argument("--all", action="store_true", help="Every day in the database")
+    parser.add_argument("--min-scores", type=int, default=MIN_SCORES)
+    parser.add_argument("--expected", type=float, default=EXPECTED_GAP,
+                        help="Differential minus index of an average round in normal conditions")
+    parser.add_argument("--synthetic", type=int, metavar="COURSE_DAYS",
+                        help="Build a synthetic stand-in with this many tee-days and run on it")
+    parser.add_argument("--db", help="Keep the synthetic stand-in at this path")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        path, temporary = standin_path(args.db, "pcc-standin-")
+        planted = build_synthetic(path, args.synthetic)
+        with sqlite3.connect(path) as db:
+            result = run(db, None, None, args.min_scores, args.expected)
+        report_recovery(result, planted)
+        if temporary:
+            os.remove(path)
+        return
+
+    if not args.database:
+        parser.error("a database is required unless --synthetic is given")
+    if not os.path.isfile(args.database):
+        print(f"Error: {args.database} not found")
+        sys.exit(1)
+
+    start = end = None
+    if not args.all:
+        try:
+            end = date.fromisoformat(args.date) if args.date else date.today() - timedelta(days=1)
+        except ValueError:
+            print(f"Error: invalid --date {args.date!r}; expected YYYY-MM-DD")
+            sys.exit(1)
+        start = end - timedelta(days=max(1, args.days) - 1)
+
+    with sqlite3.connect(args.database) as db:
+        run(db, start, end, args.min_scores, args.expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+"""
+Load-test the handicap queue processor with synthetic players and rounds.
+
+Every approved round insert/update/delete enqueues its player in
+handicap_calculation_queue, and the process-handicap-queue edge function
+drains the queue BATCH_SIZE players per invocation. This replays a burst
+(the first weekend of a season, a re-rating that touches thousands of
+players) and reports how fast the queue drains:
+
+  - synthetic players, each with a skill level, playing 18-hole rounds on
+    tees from the course catalog (scripts/sql), scored hole by hole from par,
+    stroke index and the tee's rating
+  - rounds submitted at --rate rounds/s while a drain loop invokes the
+    processor every --interval seconds (0 = back to back; cron runs it every
+    60 s in production), or with --rate 0 a burst: every round submitted
+    first, then the queue drained, so each player is one job
+  - drain throughput, processor time per job (median over invocations),
+    per-job latency percentiles (first enqueue to job deleted) and database
+    statements per job
+
+Two targets:
+
+  standin    (default) a throwaway sqlite database with the tables, the
+             enqueue trigger and a processor that issues the edge function's
+             statements in the same order: queue batch, then per job
+             profile, rounds, tees, holes, scores and the
+             process_handicap_updates writes (one UPDATE per round). The
+             handicap math is simplified (best differentials of the last 20);
+             the point is the query pattern and its cost as players gain
+             rounds.
+  supabase   a local Supabase (`supabase start`). Players are created through
+             the auth admin API, catalog courses and rounds through PostgREST,
+             and the real edge function is invoked with the cron secret.
+             Needs SUPABASE_SERVICE_ROLE_KEY and HANDICAP_CRON_SECRET;
+             statement counts come from pg_stat_statements when --database-url
+             is given and psycopg is installed.
+
+--save writes the report as JSON; --compare fails (exit 1) when statements
+per job grow by more than --tolerance, or more jobs fail, than in a saved
+report, so a regression in the processor shows up before production. While
+rounds arrive during the drain, how many of a player's rounds one job
+coalesces depends on thread timing, so jobs and statements vary from run to
+run; --compare therefore takes burst runs only, with the baseline's players,
+rounds and batch size, where both are fixed. Timing is not: processor time
+per job (the median invocation, steadier than the drain's jobs/s) still
+moves by a third between runs on a shared machine, so it is reported
+against the baseline and fails the comparison only with --time-tolerance.
+
+Usage:
+    python scripts/queue_load.py [--players 500] [--rounds-per-player 20] [--rate 0] [--batch-size 25]
+    python scripts/queue_load.py --target supabase --players 200 --rate 50 --interval 5
+    python scripts/queue_load.py --save queue-baseline.json
+    python scripts/queue_load.py --compare queue-baseline.json [--tolerance 0.2] [--time-tolerance 0.5]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from course_catalog import DEFAULT_SQL_DIR, CatalogCourse, CatalogTee, load_catalog
+
+
+DEFAULT_BATCH_SIZE = 25  # HANDICAP_QUEUE_BATCH_SIZE default in the edge function
+MAX_SCORE_DIFFERENTIAL = 54
+SUPABASE_URL = "http://127.0.0.1:54321"
+FUNCTION_PATH = "/functions/v1/process-handicap-queue"
+
+# WHS Rule 5.2a: differentials counted (and adjustment) by rounds in the record
+BEST_DIFFERENTIALS = {3: (1, -2.0), 4: (1, -1.0), 5: (1, 0.0), 6: (2, -1.0), 7: (2, 0.0), 8: (2, 0.0),
+                      9: (3, 0.0), 10: (3, 0.0), 11: (3, 0.0), 12: (4, 0.0), 13: (4, 0.0), 14: (4, 0.0),
+                      15: (5, 0.0), 16: (5, 0.0), 17: (6, 0.0), 18: (6, 0.0), 19: (7, 0.0), 20: (8, 0.0)}
+
+
+# ---------------------------------------------------------------------------
+# Synthetic workload
+# ---------------------------------------------------------------------------
+
+@dataclass
+class SyntheticRound:
+    course_index: int
+    tee_index: int
+    tee_time: datetime
+    strokes: List[int]  # One per hole, in hole order
+
+
+@dataclass
+class SyntheticPlayer:
+    user_id: str
+    email: str
+    skill: float  # The handicap index the player's scores are drawn around
+    gender: str
+    rounds: List[SyntheticRound] = field(default_factory=list)
+
+
+def playable_tees(courses: List[CatalogCourse]) -> List[Tuple[int, int]]:
+    """(course, tee) indexes of 18-hole tees the processor accepts."""
+    tees = []
+    for course_index, course in enumerate(courses):
+        for tee_index, tee in enumerate(course.tees):
+            if len(tee.holes) == 18 and tee.slope_rating_18 and tee.course_rating_18:
+                tees.append((course_index, tee_index))
+    return tees
+
+
+def hole_strokes(tee: CatalogTee, skill: float, rng: random.Random) -> List[int]:
+    """
+    Hole-by-hole strokes for a player of the given index on this tee.
+
+    The expected total is the tee's rating plus the player's course
+    handicap; strokes over par go to the lowest stroke indexes first, with
+    per-hole noise so players post the occasional blow-up and birdie.
+    """
+    course_handicap = skill * tee.slope_rating_18 / 113 + (tee.course_rating_18 - tee.total_par)
+    strokes = []
+    for hole in tee.holes:
+        received = course_handicap / 18 + (1 if hole.hcp <= course_handicap % 18 else 0)
+        expected = hole.par + max(received, -1)
+        strokes.append(max(1, round(rng.gauss(expected, 0.9))))
+    return strokes
+
+
+def generate_players(courses: List[CatalogCourse], players: int, rounds_per_player: int,
+                     seed: int = 1, run_tag: str = "") -> List[SyntheticPlayer]:
+    """Players with their rounds; run_tag keeps the ids of repeated runs apart."""
+    rng = random.Random(seed)
+    tees = playable_tees(courses)
+    by_gender: Dict[str, List[Tuple[int, int]]] = {}
+    for course_index, tee_index in tees:
+        by_gender.setdefault(courses[course_index].tees[tee_index].gender, []).append((course_index, tee_index))
+
+    start = datetime(2026, 4, 1, 8, 0)
+    result = []
+    for i in range(players):
+        gender = "ladies" if rng.random() < 0.3 and by_gender.get("ladies") else "mens"
+        skill = min(54.0, max(0.0, rng.gauss(18, 8)))
+        label = f"{run_tag or seed}-{i}"
+        player = SyntheticPlayer(str(uuid.uuid5(uuid.NAMESPACE_URL, f"queue-load/{label}")),
+                                 f"load-{label}@handicappin.local", round(skill, 1), gender)
+        home_tees = rng.sample(by_gender[gender], min(3, len(by_gender[gender])))
+        for r in range(rounds_per_player):
+            course_index, tee_index = rng.choice(home_tees)
+            tee_time = start + timedelta(days=r * 3, minutes=rng.randrange(0, 600))
+            strokes = hole_strokes(courses[course_index].tees[tee_index], skill, rng)
+            player.rounds.append(SyntheticRound(course_index, tee_index, tee_time, strokes))
+        result.append(player)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# sqlite stand-in
+# ---------------------------------------------------------------------------
+
+STANDIN_SCHEMA = """
+create table course (id integer primary key, name text not null, city text, country text,
+    "approvalStatus" text not null);
+create table "teeInfo" (id integer primary key, "courseId" integer not null references course(id),
+    name text not null, gender text not null, "courseRating18" real not null, "slopeRating18" integer not null,
+    "totalPar" integer not null, "approvalStatus" text not null, "isArchived" integer not null default 0);
+create table hole (id integer primary key, "teeId" integer not null references "teeInfo"(id),
+    "holeNumber" integer not null, par integer not null, hcp integer not null, distance integer not null);
+create table profile (id text primary key, email text not null, "handicapIndex" real not null default 54,
+    "initialHandicapIndex" real not null default 54);
+create table round (id integer primary key, "userId" text not null references profile(id),
+    "courseId" integer not null, "teeId" integer not null, "teeTime" text not null,
+    "totalStrokes" integer not null, "parPlayed" integer not null, "adjustedGrossScore" integer not null default 0,
+    "adjustedPlayedScore" integer not null default 0, "courseHandicap" integer not null default 0,
+    "scoreDifferential" real not null default 0, "existingHandicapIndex" real not null default 54,
+    "updatedHandicapIndex" real not null default 54, "exceptionalScoreAdjustment" real not null default 0,
+    "approvalStatus" text not null, quarantined integer not null default 0, holes_played integer not null,
+    nine_hole_section text);
+create index "idx_round_userId" on round ("userId");
+create table score (id integer primary key, "userId" text not null, "roundId" integer not null references round(id),
+    "holeId" integer not null, strokes integer not null, "hcpStrokes" integer not null default 0);
+create index "idx_score_roundId" on score ("roundId");
+create index "idx_hole_teeId" on hole ("teeId");
+create table handicap_calculation_queue (id integer primary key, user_id text not null unique,
+    event_type text not null, created_at text not null default (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    last_updated text not null default (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+    status text not null default 'pending', attempts integer not null default 0, error_message text);
+create index idx_handicap_queue_status_created on handicap_calculation_queue (status, created_at);
+create trigger enqueue_handicap_calculation after insert on round begin
+    insert into handicap_calculation_queue (user_id, event_type) values (new."userId", 'round_insert')
+    on conflict (user_id) do update set last_updated = strftime('%Y-%m-%d %H:%M:%f', 'now'),
+        event_type = excluded.event_type, status = 'pending', attempts = 0;
+end;
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.execute("pragma journal_mode = wal")
+    connection.execute("pragma synchronous = normal")
+    return connection
+
+
+def _placeholders(values: List) -> str:
+    return ",".join("?" * len(values))
+
+
+class StandInTarget:
+    """sqlite database plus a processor mirroring the edge function's statements."""
+
+    name = "standin"
+
+    def __init__(self, courses: List[CatalogCourse], batch_size: int, path: Optional[str] = None):
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".sqlite", prefix="queue-load-")
+            os.close(fd)
+            self._cleanup = path
+        else:
+            self._cleanup = None
+        self.path = path
+        self.batch_size = batch_size
+        self.courses = courses
+        self.statements = 0
+
+        setup = _connect(path)
+        setup.executescript(STANDIN_SCHEMA)
+        setup.close()
+        self._producer = _connect(path)
+        self._processor = _connect(path)
+        self._processor.set_trace_callback(self._count_statement)
+        self._observer = _connect(path)
+        self.course_ids: Dict[int, int] = {}
+        self.tee_ids: Dict[Tuple[int, int], int] = {}
+        self.hole_ids: Dict[Tuple[int, int], List[int]] = {}
+
+    def _count_statement(self, sql: str) -> None:
+        if sql.lstrip()[:6].upper() not in ("BEGIN", "COMMIT", "ROLLBA"):
+            self.statements += 1
+
+    def seed(self, players: List[SyntheticPlayer]) -> None:
+        db = self._producer
+        db.execute("begin")
+        used = {(r.course_index, r.tee_index) for player in players for r in player.rounds}
+        course_ids = self.course_ids
+        for course_index, tee_index in sorted(used):
+            course = self.courses[course_index]
+            if course_index not in course_ids:
+                course_ids[course_index] = db.execute(
+                    "insert into course (name, city, country, \"approvalStatus\") values (?, ?, ?, 'approved')",
+                    (course.name, course.city, course.country)).lastrowid
+            tee = course.tees[tee_index]
+            tee_id = db.execute(
+                'insert into "teeInfo" ("courseId", name, gender, "courseRating18", "slopeRating18", "totalPar", '
+                "\"approvalStatus\") values (?, ?, ?, ?, ?, ?, 'approved')",
+                (course_ids[course_index], tee.name, tee.gender, tee.course_rating_18, tee.slope_rating_18,
+                 tee.total_par)).lastrowid
+            self.tee_ids[(course_index, tee_index)] = tee_id
+            self.hole_ids[(course_index, tee_index)] = [
+                db.execute('insert into hole ("teeId", "holeNumber", par, hcp, distance) values (?, ?, ?, ?, ?)',
+                           (tee_id, hole.hole_number, hole.par, hole.hcp, hole.distance)).lastrowid
+                for hole in tee.holes
+            ]
+        db.executemany("insert into profile (id, email) values (?, ?)",
+                       [(player.user_id, player.email) for player in players])
+        db.execute("commit")
+
+    def submit_round(self, player: SyntheticPlayer, played: SyntheticRound) -> None:
+        db = self._producer
+        key = (played.course_index, played.tee_index)
+        tee = self.courses[played.course_index].tees[played.tee_index]
+        db.execute("begin")
+        round_id = db.execute(
+            'insert into round ("userId", "courseId", "teeId", "teeTime", "totalStrokes", "parPlayed", '
+            "\"approvalStatus\", holes_played) values (?, ?, ?, ?, ?, ?, 'approved', 18)",
+            (player.user_id, self.course_ids[played.course_index], self.tee_ids[key],
+             played.tee_time.isoformat(), sum(played.strokes), tee.total_par)).lastrowid
+        db.executemany('insert into score ("userId", "roundId", "holeId", strokes) values (?, ?, ?, ?)',
+                       [(player.user_id, round_id, hole_id, strokes)
+                        for hole_id, strokes in zip(self.hole_ids[key], played.strokes)])
+        db.execute("commit")
+
+    def queue_state(self) -> Tuple[Set[str], Set[str]]:
+        """(pending, failed) user ids in the queue."""
+        pending, failed = set(), set()
+        for user_id, status in self._observer.execute("select user_id, status from handicap_calculation_queue"):
+            (failed if status == "failed" else pending).add(user_id)
+        return pending, failed
+
+    def invoke(self) -> int:
+        """One processor invocation; returns the number of jobs taken."""
+        db = self._processor
+        jobs = db.execute(
+            "select id, user_id, attempts from handicap_calculation_queue where status = 'pending' "
+            "order by created_at limit ?", (self.batch_size,)).fetchall()
+        for job_id, user_id, attempts in jobs:
+            try:
+                self._process_job(db, job_id, user_id)
+            except sqlite3.Error as exc:
+                if db.in_transaction:
+                    db.execute("rollback")
+                db.execute("update handicap_calculation_queue set attempts = ?, error_message = ?, status = ? "
+                           "where id = ?", (attempts + 1, str(exc), "failed" if attempts + 1 >= 3 else "pending",
+                                            job_id))
+        return len(jobs)
+
+    def _process_job(self, db: sqlite3.Connection, job_id: int, user_id: str) -> None:
+        profile = db.execute('select "initialHandicapIndex" from profile where id = ?', (user_id,)).fetchone()
+        if profile is None:
+            raise sqlite3.Error(f"User profile not found for {user_id}")
+        rounds = db.execute(
+            'select id, "teeId" from round where "userId" = ? and "approvalStatus" = \'approved\' '
+            'and quarantined = 0 order by "teeTime"', (user_id,)).fetchall()
+        if not rounds:
+            db.execute("begin")
+            db.execute('update profile set "handicapIndex" = ? where id = ?', (MAX_SCORE_DIFFERENTIAL, user_id))
+            db.execute("delete from handicap_calculation_queue where id = ?", (job_id,))
+            db.execute("commit")
+            return
+
+        tee_ids = sorted({tee_id for _, tee_id in rounds})
+        round_ids = [round_id for round_id, _ in rounds]
+        tees = {row[0]: row for row in db.execute(
+            f'select id, "courseRating18", "slopeRating18" from "teeInfo" where id in ({_placeholders(tee_ids)})', tee_ids)}
+        holes = {row[0]: row for row in db.execute(
+            f'select id, "teeId", par, hcp from hole where "teeId" in ({_placeholders(tee_ids)})', tee_ids)}
+        scores: Dict[int, List[Tuple[int, int]]] = {}
+        for round_id, hole_id, strokes in db.execute(
+                f'select "roundId", "holeId", strokes from score where "roundId" in ({_placeholders(round_ids)})', round_ids):
+            scores.setdefault(round_id, []).append((hole_id, strokes))
+
+        updates = []
+        differentials: List[float] = []
+        index = float(profile[0])
+        for round_id, tee_id in rounds:
+            _, rating, slope = tees[tee_id]
+            course_handicap = round(index * slope / 113)
+            # Net double bogey per hole
+            adjusted = 0
+            for hole_id, strokes in scores.get(round_id, []):
+                _, _, par, hcp = holes[hole_id]
+                received = course_handicap // 18 + (1 if hcp <= course_handicap % 18 else 0)
+                adjusted += min(strokes, par + 2 + received)
+            differential = round((113 / slope) * (adjusted - rating), 1)
+            differentials.append(differential)
+            previous, index = index, handicap_index(differentials[-20:], index)
+            updates.append((previous, differential, index, adjusted, course_handicap, round_id))
+
+        db.execute("begin")
+        for previous, differential, new_index, adjusted, course_handicap, round_id in updates:
+            db.execute('update round set "existingHandicapIndex" = ?, "scoreDifferential" = ?, '
+                       '"updatedHandicapIndex" = ?, "adjustedGrossScore" = ?, "courseHandicap" = ? where id = ?',
+                       (previous, differential, new_index, adjusted, course_handicap, round_id))
+        db.execute('update profile set "handicapIndex" = ? where id = ?', (index, user_id))
+        db.execute("delete from handicap_calculation_queue where id = ?", (job_id,))
+        db.execute("commit")
+
+    def close(self) -> None:
+        for connection in (self._producer, self._processor, self._observer):
+            connection.close()
+        if self._cleanup:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self._cleanup + suffix):
+                    os.remove(self._cleanup + suffix)
+
+
+def handicap_index(differentials: List[float], current: float) -> float:
+    counted = BEST_DIFFERENTIALS.get(len(differentials))
+    if counted is None:
+        return current
+    best, adjustment = counted
+    average = sum(sorted(differentials)[:best]) / best
+    return min(MAX_SCORE_DIFFERENTIAL, math.floor((average + adjustment) * 10) / 10)
+
+
+# ---------------------------------------------------------------------------
+# Local Supabase
+# ---------------------------------------------------------------------------
+
+class SupabaseTarget:
+    """A local Supabase stack: PostgREST for data, the real edge function for processing."""
+
+    name = "supabase"
+
+    def __init__(self, courses: List[CatalogCourse], url: str, service_key: str, cron_secret: str,
+                 run_tag: str, database_url: Optional[str] = None):
+        import requests
+
+        self.courses = courses
+        self.run_tag = run_tag
+        self.url = url.rstrip("/")
+        self.cron_secret = cron_secret
+        self.session = requests.Session()
+        self.session.headers.update({"apikey": service_key, "Authorization": f"Bearer {service_key}",
+                                     "Content-Type": "application/json"})
+        self._statements = None
+        if database_url:
+            try:
+                import psycopg
+
+                self._statements = psycopg.connect(database_url, autocommit=True)
+            except ImportError:
+                print("psycopg is not installed; statement counts are skipped", file=sys.stderr)
+        self.tee_ids: Dict[Tuple[int, int], int] = {}
+        self.course_ids: Dict[int, int] = {}
+        self.hole_ids: Dict[Tuple[int, int], List[int]] = {}
+
+    @property
+    def statements(self) -> Optional[int]:
+        if self._statements is None:
+            return None
+        row = self._statements.execute(
+            "select coalesce(sum(calls), 0) from pg_stat_statements s join pg_roles r on r.oid = s.userid "
+            "where r.rolname in ('service_role', 'authenticator', 'postgres')").fetchone()
+        return int(row[0])
+
+    def _rest(self, method: str, path: str, body=None, prefer: str = "return=representation"):
+        response = self.session.request(method, f"{self.url}/rest/v1/{path}", json=body,
+                                        headers={"Prefer": prefer}, timeout=60)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path}: {response.status_code} {response.text[:200]}")
+        return response.json() if response.text else None
+
+    def seed(self, players: List[SyntheticPlayer]) -> None:
+        used = sorted({(r.course_index, r.tee_index) for player in players for r in player.rounds})
+        for course_index, tee_index in used:
+            course = self.courses[course_index]
+            if course_index not in self.course_ids:
+                self.course_ids[course_index] = self._rest("POST", "course", {
+                    "name": f"{course.name} (load test {self.run_tag})", "city": course.city, "country": course.country,
+                    "website": course.website, "approvalStatus": "approved"})[0]["id"]
+            tee = course.tees[tee_index]
+            tee_row = self._rest("POST", "teeInfo", {
+                "courseId": self.course_ids[course_index], "name": tee.name, "gender": tee.gender,
+                "courseRating18": tee.course_rating_18, "slopeRating18": tee.slope_rating_18,
+                "courseRatingFront9": tee.course_rating_front_9, "slopeRatingFront9": tee.slope_rating_front_9,
+                "courseRatingBack9": tee.course_rating_back_9, "slopeRatingBack9": tee.slope_rating_back_9,
+                "outPar": tee.out_par, "inPar": tee.in_par, "totalPar": tee.total_par,
+                "outDistance": tee.out_distance, "inDistance": tee.in_distance,
+                "totalDistance": tee.total_distance, "distanceMeasurement": tee.distance_measurement,
+                "approvalStatus": "approved"})[0]
+            self.tee_ids[(course_index, tee_index)] = tee_row["id"]
+            holes = self._rest("POST", "hole", [
+                {"teeId": tee_row["id"], "holeNumber": hole.hole_number, "par": hole.par, "hcp": hole.hcp,
+                 "distance": hole.distance} for hole in tee.holes])
+            self.hole_ids[(course_index, tee_index)] = [
+                hole["id"] for hole in sorted(holes, key=lambda hole: hole["holeNumber"])]
+
+        for player in players:
+            response = self.session.post(f"{self.url}/auth/v1/admin/users", timeout=60, json={
+                "id": player.user_id, "email": player.email, "password": uuid.uuid4().hex,
+                "email_confirm": True})
+            if response.status_code >= 400 and "already" not in response.text:
+                raise RuntimeError(f"Creating {player.email}: {response.status_code} {response.text[:200]}")
+        self._rest("POST", "profile?on_conflict=id", [
+            {"id": player.user_id, "email": player.email, "verified": True} for player in players],
+            prefer="resolution=merge-duplicates,return=minimal")
+
+    def submit_round(self, player: SyntheticPlayer, played: SyntheticRound) -> None:
+        key = (played.course_index, played.tee_index)
+        tee = self.courses[played.course_index].tees[played.tee_index]
+        # Inserted pending with its scores, then approved: the approval is
+        # what enqueues the player, so the processor never sees a round
+        # without its scores
+        round_row = self._rest("POST", "round", {
+            "userId": player.user_id, "courseId": self.course_ids[played.course_index],
+            "teeId": self.tee_ids[key], "teeTime": played.tee_time.isoformat(),
+            "totalStrokes": sum(played.strokes), "parPlayed": tee.total_par,
+            "adjustedGrossScore": sum(played.strokes), "adjustedPlayedScore": sum(played.strokes),
+            "courseHandicap": 0, "scoreDifferential": 0, "existingHandicapIndex": MAX_SCORE_DIFFERENTIAL,
+            "updatedHandicapIndex": MAX_SCORE_DIFFERENTIAL, "approvalStatus": "pending",
+            "course_rating_used": tee.course_rating_18, "slope_rating_used": tee.slope_rating_18,
+            "holes_played": 18, "submitted_via": "queue-load"})[0]
+        self._rest("POST", "score", [
+            {"userId": player.user_id, "roundId": round_row["id"], "holeId": hole_id, "strokes": strokes}
+            for hole_id, strokes in zip(self.hole_ids[key], played.strokes)], prefer="return=minimal")
+        self._rest("PATCH", f"round?id=eq.{round_row['id']}", {"approvalStatus": "approved"},
+                   prefer="return=minimal")
+
+    def queue_state(self) -> Tuple[Set[str], Set[str]]:
+        rows = self._rest("GET", "handicap_calculation_queue?select=user_id,status")
+        pending = {row["user_id"] for row in rows if row["status"] != "failed"}
+        failed = {row["user_id"] for row in rows if row["status"] == "failed"}
+        return pending, failed
+
+    def invoke(self) -> int:
+        response = self.session.post(f"{self.url}{FUNCTION_PATH}", timeout=300,
+                                     headers={"x-cron-secret": self.cron_secret},
+                                     json={"scheduled": True, "timestamp": datetime.now(timezone.utc).isoformat()})
+        if response.status_code != 200:
+            raise RuntimeError(f"process-handicap-queue: {response.status_code} {response.text[:200]}")
+        return int(response.json().get("processed", 0))
+
+    def close(self) -> None:
+        if self._statements is not None:
+            self._statements.close()
+
+
+# ---------------------------------------------------------------------------
+# Run and report
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LoadReport:
+    target: str
+    players: int
+    rounds: int
+    rate: float
+    batch_size: Optional[int]
+    jobs_completed: int = 0
+    jobs_failed: int = 0
+    invocations: int = 0
+    submit_seconds: float = 0.0
+    drain_seconds: float = 0.0
+    throughput_jobs_per_s: float = 0.0
+    ms_per_job: float = 0.0  # Median over invocations of invocation time / jobs taken
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    statements: Optional[int] = None
+    statements_per_job: Optional[float] = None
+    timed_out: bool = False
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[position]
+
+
+def run_load(target, players: List[SyntheticPlayer], rate: float, interval: float,
+             timeout: float, batch_size: Optional[int]) -> LoadReport:
+    """Submit every player's rounds at `rate` while draining the queue; measure the drain."""
+    submissions = [(player, played) for played_index in range(max(len(p.rounds) for p in players))
+                   for player in players if played_index < len(player.rounds)
+                   for played in [player.rounds[played_index]]]
+    report = LoadReport(target.name, len(players), len(submissions), rate, batch_size)
+
+    lock = threading.Lock()
+    outstanding: Dict[str, float] = {}  # user id -> first enqueue not yet processed
+    latencies: List[float] = []
+    producer_done = threading.Event()
+    producer_errors: List[BaseException] = []
+
+    def produce():
+        started = time.perf_counter()
+        try:
+            for i, (player, played) in enumerate(submissions):
+                if rate > 0:
+                    delay = started + i / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                submitted = time.perf_counter()
+                target.submit_round(player, played)
+                # Only once committed, or a poll would see the player as
+                # not queued and count the job as done
+                with lock:
+                    outstanding.setdefault(player.user_id, submitted)
+        except BaseException as exc:
+            producer_errors.append(exc)
+        finally:
+            report.submit_seconds = time.perf_counter() - started
+            producer_done.set()
+
+    if rate > 0:
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+    else:
+        # A burst is queued in full before the first invocation, so the jobs
+        # and their statements are the same on every run
+        produce()
+        producer = None
+        if producer_errors:
+            raise producer_errors[0]
+    statements_before = target.statements
+    started = time.perf_counter()
+
+    failed: Set[str] = set()
+    job_ms: List[float] = []
+    while True:
+        if time.perf_counter() - started > timeout:
+            report.timed_out = True
+            break
+        invoked = time.perf_counter()
+        taken = target.invoke()
+        if taken:
+            job_ms.append((time.perf_counter() - invoked) * 1000 / taken)
+        report.invocations += 1
+        pending, failed = target.queue_state()
+        now = time.perf_counter()
+        with lock:
+            for user_id in [user_id for user_id in outstanding if user_id not in pending]:
+                enqueued = outstanding.pop(user_id)
+                if user_id not in failed:
+                    latencies.append((now - enqueued) * 1000)
+            idle = not outstanding
+        if producer_done.is_set() and idle:
+            break
+        if interval:
+            time.sleep(interval)
+        elif not taken:
+            time.sleep(0.01)
+
+    report.drain_seconds = time.perf_counter() - started
+    if producer is not None:
+        producer.join()
+    if producer_errors:
+        raise producer_errors[0]
+
+    statements_after = target.statements
+    latencies.sort()
+    report.jobs_completed = len(latencies)
+    report.jobs_failed = len(failed)
+    report.throughput_jobs_per_s = round(report.jobs_completed / report.drain_seconds, 1) if report.drain_seconds else 0
+    job_ms.sort()
+    report.ms_per_job = round(percentile(job_ms, 0.5), 2)
+    report.latency_ms = {name: round(percentile(latencies, fraction), 1)
+                         for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))}
+    if statements_before is not None and statements_after is not None:
+        report.statements = statements_after - statements_before
+        report.statements_per_job = round(report.statements / max(1, report.jobs_completed), 1)
+    return report
+
+
+def print_report(report: LoadReport) -> None:
+    print(f"Target: {report.target} | {report.players} players, {report.rounds} rounds "
+          f"at {'burst' if not report.rate else f'{report.rate:g}/s'} "
+          f"(submitted in {report.submit_seconds:.1f}s)")
+    print(f"Drained {report.jobs_completed} jobs in {report.drain_seconds:.2f}s over {report.invocations} "
+          f"invocations: {report.throughput_jobs_per_s} jobs/s ({report.ms_per_job} ms/job in the processor), "
+          f"{report.jobs_failed} failed" + (" (TIMED OUT)" if report.timed_out else ""))
+    latency = report.latency_ms
+    print(f"Job latency ms: p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    if report.statements is not None:
+        print(f"Statements: {report.statements} ({report.statements_per_job} per job)")
+
+
+def comparable(report: LoadReport, baseline: dict) -> Optional[str]:
+    """Why the report cannot be compared with the baseline, or None."""
+    if report.rate or baseline.get("rate"):
+        return "--compare needs burst runs (--rate 0); with a rate the jobs depend on thread timing"
+    if not baseline.get("ms_per_job"):
+        return "the baseline predates ms_per_job; save it again"
+    for name in ("target", "players", "rounds", "batch_size"):
+        if baseline.get(name) != getattr(report, name):
+            return f"the baseline has {name} {baseline.get(name)}, this run {getattr(report, name)}"
+    return None
+
+
+def compare_reports(report: LoadReport, baseline: dict, tolerance: float,
+                    time_tolerance: Optional[float] = None) -> List[str]:
+    """Regressions against a saved report, as messages."""
+    regressions = []
+    if time_tolerance is not None:
+        limit = baseline["ms_per_job"] * (1 + time_tolerance)
+        if report.ms_per_job > limit:
+            regressions.append(f"{report.ms_per_job} ms/job in the processor > {limit:.2f} "
+                               f"(baseline {baseline['ms_per_job']})")
+    if report.statements_per_job is not None and baseline.get("statements_per_job"):
+        ceiling = baseline["statements_per_job"] * (1 + tolerance)
+        if report.statements_per_job > ceiling:
+            regressions.append(f"{report.statements_per_job} statements/job > {ceiling:.1f} "
+                               f"(baseline {baseline['statements_per_job']})")
+    if report.jobs_failed > baseline.get("jobs_failed", 0):
+        regressions.append(f"{report.jobs_failed} failed jobs (baseline {baseline.get('jobs_failed', 0)})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the handicap queue processor")
+    parser.add_argument("--target", choices=("standin", "supabase"), default="standin")
+    parser.add_argument("--sql-dir", default=DEFAULT_SQL_DIR, help="Course catalog to draw tees from")
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--rounds-per-player", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=0, help="Rounds submitted per second (0 = burst)")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Seconds between processor invocations (0 = back to back)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Jobs per invocation (standin; set HANDICAP_QUEUE_BATCH_SIZE for supabase)")
+    parser.add_argument("--timeout", type=float, default=600, help="Give up draining after this many seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="Keep the stand-in database at this path")
+    parser.add_argument("--supabase-url", default=os.environ.get("SUPABASE_URL", SUPABASE_URL))
+    parser.add_argument("--database-url", help="Postgres URL for pg_stat_statements counts (supabase)")
+    parser.add_argument("--save", help="Write the report as JSON")
+    parser.add_argument("--compare", help="Fail on a regression against this saved report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed growth of statements per job")
+    parser.add_argument("--time-tolerance", type=float,
+                        help="Also fail when processor time per job grows by more than this")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.sql_dir):
+        print(f"Error: {args.sql_dir} not found")
+        sys.exit(1)
+    courses = load_catalog(args.sql_dir)
+    if not playable_tees(courses):
+        print(f"Error: no 18-hole tees in {args.sql_dir}")
+        sys.exit(1)
+
+    if args.target == "supabase":
+        # Courses, tees and players are real rows there; a fresh tag per run
+        # keeps them clear of the unique keys left by earlier runs
+        run_tag = uuid.uuid4().hex[:8]
+        service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+        cron_secret = os.environ.get("HANDICAP_CRON_SECRET")
+        if not service_key or not cron_secret:
+            print("Error: set SUPABASE_SERVICE_ROLE_KEY and HANDICAP_CRON_SECRET for --target supabase")
+            sys.exit(1)
+        target = SupabaseTarget(courses, args.supabase_url, service_key, cron_secret, run_tag, args.database_url)
+        batch_size = None
+    else:
+        run_tag = ""
+        target = StandInTarget(courses, args.batch_size, args.db)
+        batch_size = args.batch_size
+
+    players = generate_players(courses, args.players, args.rounds_per_player, args.seed, run_tag)
+
+    try:
+        seeding = time.perf_counter()
+        target.seed(players)
+        print(f"Seeded {len(players)} players on {len(target.tee_ids)} tees in "
+              f"{time.perf_counter() - seeding:.1f}s", file=sys.stderr)
+        report = run_load(target, players, args.rate, args.interval, args.timeout, batch_size)
+    except (OSError, RuntimeError) as e:
+        # Connection refused, or a PostgREST/function error, on the supabase target
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        target.close()
+
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(asdict(report), f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problem = comparable(report, baseline)
+        if problem:
+            print(f"Error: cannot compare with {args.compare}: {problem}")
+            sys.exit(1)
+        print(f"Processor time: {report.ms_per_job} ms/job (baseline {baseline['ms_per_job']}, "
+              f"{(report.ms_per_job / baseline['ms_per_job'] - 1) * 100:+.0f}%)")
+        regressions = compare_reports(report, baseline, args.tolerance, args.time_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions or report.timed_out:
+            sys.exit(1)
+    elif report.timed_out:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
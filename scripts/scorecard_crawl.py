@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Crawl club websites for scorecards and stage what is found for review.
+
+Takes the Website column of an OSM harvest CSV (scotland.py, osm_harvest.py)
+and, for every club, fetches the home page and the few same-site pages
+whose links look like a scorecard ("Scorecard", "Scorekort", "The Course"
+...). Each page goes through scorecard_html's extractor; the first page
+with a scorecard is staged as a --stream record:
+
+    <stage-dir>/golfpass/<site>.txt      for parse_scorecard.py --stream
+    <stage-dir>/transposed/<site>.txt    for parse_scorecard_transposed.py --stream
+    <stage-dir>/index.csv                one row per club: staged, no scorecard,
+                                         disallowed by robots.txt, unreachable
+
+Records carry the OSM course name and website, so a reviewer only has to
+check them and add any missing city or tee lines before piping them into
+the parsers.
+
+Requests share one pooled aiohttp session. Each host gets at most
+--per-host requests at a time and robots.txt is fetched once per host and
+obeyed (an unreachable robots.txt means "don't crawl", as in RFC 9309).
+Clubs are worked on by --concurrency asyncio workers and every request has
+a --timeout, so a slow host only holds up its own club. HTML parsing runs
+in a process pool so it never stalls the event loop.
+
+The `serve` subcommand is a stand-in for the web: it serves
+<fixtures>/<host>/<path> by Host header, with an optional <host>/_delay file
+holding seconds to wait before each response. Point a crawl at it with
+--connect-to:
+
+    python scripts/scorecard_crawl.py serve fixtures/ --port 8765 &
+    python scripts/scorecard_crawl.py crawl sites.csv --connect-to 127.0.0.1:8765
+
+Usage:
+    python scripts/scorecard_crawl.py crawl scotland_golf_courses.csv [--stage-dir scorecard_staging]
+        [--concurrency 100] [--per-host 2] [--max-pages 5] [--timeout 20]
+    python scripts/scorecard_crawl.py serve FIXTURES_DIR [--port 8765]
+
+Requires aiohttp for `crawl` (pip install aiohttp).
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+from scorecard_stream import RECORD_DELIMITER
+from scotland import normalize_website
+
+
+DEFAULT_STAGE_DIR = "scorecard_staging"
+USER_AGENT = "handicappin-course-ingest/1.0"
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+MAX_REDIRECTS = 5
+
+# Strong hints first; a link matching either is a candidate
+SCORECARD_LINK = re.compile(r"score\s*-?\s*card|scorekort|slope", re.IGNORECASE)
+COURSE_LINK = re.compile(r"the[-_ ]?course|course[-_ ]?(?:guide|info)|hole[-_ ]by[-_ ]hole|banen|baneguide|hull",
+                         re.IGNORECASE)
+
+INDEX_FIELDS = ["Club Name", "Course Name", "Website", "Status", "Page", "Kind", "Notes"]
+
+
+@dataclass
+class CrawlTarget:
+    club_name: str
+    course_name: str
+    website: str
+
+
+@dataclass
+class CrawlResult:
+    target: CrawlTarget
+    status: str  # "staged", "no-scorecard", "robots-disallowed" or "unreachable"
+    page: str = ""
+    kind: str = ""
+    notes: List[str] = field(default_factory=list)
+
+
+def read_targets(path: str) -> List[CrawlTarget]:
+    """Clubs with a website from an OSM CSV, one per distinct site."""
+    targets = []
+    seen = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            website = normalize_website(row.get("website", ""))
+            if not website or website.casefold() in seen:
+                continue
+            seen.add(website.casefold())
+            club_name = row.get("club name") or row.get("name", "")
+            targets.append(CrawlTarget(club_name, row.get("course name") or club_name, website))
+    return targets
+
+
+def site_slug(website: str) -> str:
+    parsed = urlparse(website)
+    host = parsed.netloc.casefold()
+    host = host[4:] if host.startswith("www.") else host
+    return re.sub(r"[^a-z0-9]+", "_", host + parsed.path.casefold()).strip("_")
+
+
+def same_site(url: str, website: str) -> bool:
+    def bare(host: str) -> str:
+        host = host.casefold().split(":")[0]
+        return host[4:] if host.startswith("www.") else host
+    return bare(urlparse(url).netloc) == bare(urlparse(website).netloc)
+
+
+def candidate_links(links: List[Tuple[str, str]], base_url: str, website: str, limit: int) -> List[str]:
+    """Same-site links that look like scorecard pages, best first."""
+    ranked = {}
+    for href, text in links:
+        url = urljoin(base_url, href).split("#")[0]
+        if not url.startswith(("http://", "https://")) or not same_site(url, website):
+            continue
+        haystack = f"{href} {text}"
+        if SCORECARD_LINK.search(haystack):
+            rank = 0
+        elif COURSE_LINK.search(haystack):
+            rank = 1
+        else:
+            continue
+        ranked[url] = min(rank, ranked.get(url, rank))
+    return sorted(ranked, key=lambda url: ranked[url])[:limit]
+
+
+def analyse_page(html: str, url: str, name: str, website: str):
+    """Extract scorecards and links from a page; runs in a worker process."""
+    from scorecard_html import extract_page, parse_page
+
+    page = parse_page(html)
+    return extract_page(page, url, name=name, website=website), page.links
+
+
+class Stager:
+    def __init__(self, stage_dir: str):
+        self.stage_dir = stage_dir
+        os.makedirs(stage_dir, exist_ok=True)
+        self._index_file = open(os.path.join(stage_dir, "index.csv"), "w", newline="", encoding="utf-8")
+        self._index = csv.writer(self._index_file)
+        self._index.writerow(INDEX_FIELDS)
+        self.counts: Dict[str, int] = {}
+
+    def stage(self, result: CrawlResult, record: Optional[str] = None) -> None:
+        if record is not None:
+            kind_dir = os.path.join(self.stage_dir, result.kind)
+            os.makedirs(kind_dir, exist_ok=True)
+            with open(os.path.join(kind_dir, f"{site_slug(result.target.website)}.txt"), "w",
+                      encoding="utf-8") as f:
+                f.write(f"{record}\n{RECORD_DELIMITER}\n")
+
+        target = result.target
+        self._index.writerow([target.club_name, target.course_name, target.website, result.status,
+                              result.page, result.kind, "; ".join(result.notes)])
+        self._index_file.flush()
+        self.counts[result.status] = self.counts.get(result.status, 0) + 1
+
+    def close(self) -> None:
+        self._index_file.close()
+
+
+class Crawler:
+    def __init__(self, session, pool: ProcessPoolExecutor, per_host: int, max_pages: int,
+                 connect_to: Optional[str] = None):
+        self.session = session
+        self.pool = pool
+        self.per_host = per_host
+        self.max_pages = max_pages
+        self.connect_to = connect_to
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._robots: Dict[str, asyncio.Task] = {}
+
+    def _route(self, url: str) -> Tuple[str, Dict[str, str]]:
+        headers = {"User-Agent": USER_AGENT, "Accept": "text/html,*/*;q=0.5"}
+        if not self.connect_to:
+            return url, headers
+        parsed = urlparse(url)
+        headers["Host"] = parsed.netloc
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        return f"http://{self.connect_to}{path}", headers
+
+    def _slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.casefold()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    async def fetch(self, url: str, html_only: bool = True) -> Tuple[int, str, str]:
+        """(status, final url, body) following redirects; status 0 if unreachable."""
+        import aiohttp
+
+        for _ in range(MAX_REDIRECTS + 1):
+            request_url, headers = self._route(url)
+            try:
+                async with self._slot(url):
+                    async with self.session.get(request_url, headers=headers, allow_redirects=False) as response:
+                        if response.status in (301, 302, 303, 307, 308) and "Location" in response.headers:
+                            url = urljoin(url, response.headers["Location"])
+                            continue
+                        if response.status != 200:
+                            return response.status, url, ""
+                        if html_only and "html" not in response.headers.get("Content-Type", "text/html"):
+                            return response.status, url, ""
+                        body = await response.content.read(MAX_PAGE_BYTES)
+                        return 200, url, body.decode(response.charset or "utf-8", errors="replace")
+            except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, LookupError):
+                return 0, url, ""
+        return 0, url, ""
+
+    async def _load_robots(self, origin: str) -> Optional[RobotFileParser]:
+        status, _, body = await self.fetch(f"{origin}/robots.txt", html_only=False)
+        robots = RobotFileParser()
+        if status == 200:
+            robots.parse(body.splitlines())
+        elif 400 <= status < 500:
+            robots.allow_all = True
+        else:
+            return None  # Unreachable or server error: treat the site as off limits
+        return robots
+
+    async def allowed(self, url: str) -> Optional[bool]:
+        """Whether robots.txt allows url; None if robots.txt could not be read."""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin not in self._robots:
+            self._robots[origin] = asyncio.ensure_future(self._load_robots(origin))
+        robots = await self._robots[origin]
+        return None if robots is None else robots.can_fetch(USER_AGENT, url)
+
+    async def crawl(self, target: CrawlTarget) -> Tuple[CrawlResult, Optional[str]]:
+        loop = asyncio.get_running_loop()
+        queue = [target.website]
+        visited = set()
+        notes = []
+        pages_left = self.max_pages + 1  # The home page plus candidates
+
+        while queue and pages_left:
+            url = queue.pop(0)
+            if url in visited:
+                continue
+            visited.add(url)
+
+            allowed = await self.allowed(url)
+            if not allowed:
+                if url == target.website:
+                    status = "unreachable" if allowed is None else "robots-disallowed"
+                    notes.append("robots.txt unreachable" if allowed is None else "robots.txt disallows the site")
+                    return CrawlResult(target, status, notes=notes), None
+                notes.append(f"robots.txt disallows {url}")
+                continue
+
+            pages_left -= 1
+            status, final_url, html = await self.fetch(url)
+            if not html:
+                if url == target.website:
+                    return CrawlResult(target, "unreachable", notes=[f"HTTP {status}" if status else "no response"]), None
+                continue
+
+            scorecards, links = await loop.run_in_executor(
+                self.pool, analyse_page, html, final_url, target.course_name, target.website)
+            if scorecards:
+                scorecard = scorecards[0]
+                return CrawlResult(target, "staged", final_url, scorecard.kind,
+                                   notes + scorecard.warnings), scorecard.record
+
+            if url == target.website:
+                queue.extend(candidate_links(links, final_url, target.website, self.max_pages))
+
+        return CrawlResult(target, "no-scorecard", notes=notes), None
+
+
+async def crawl_all(targets: List[CrawlTarget], stager: Stager, concurrency: int, per_host: int,
+                    max_pages: int, timeout: float, connect_to: Optional[str] = None) -> None:
+    import aiohttp
+
+    # With --connect-to every request goes to one address; politeness is
+    # enforced per original host by Crawler instead of by the connector
+    connector = aiohttp.TCPConnector(limit=concurrency * per_host,
+                                     limit_per_host=0 if connect_to else per_host, ttl_dns_cache=300)
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=min(timeout, 10))
+    queue: asyncio.Queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+
+    started = time.perf_counter()
+    done = 0
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        with ProcessPoolExecutor() as pool:
+            crawler = Crawler(session, pool, per_host, max_pages, connect_to)
+
+            async def worker():
+                nonlocal done
+                while True:
+                    try:
+                        target = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    result, record = await crawler.crawl(target)
+                    stager.stage(result, record)
+                    done += 1
+                    if done % 100 == 0 or done == len(targets):
+                        print(f"{done}/{len(targets)} clubs ({time.perf_counter() - started:.1f}s)",
+                              file=sys.stderr)
+
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, len(targets)) or 1)))
+
+
+def serve(fixtures_dir: str, port: int) -> None:
+    """Serve <fixtures_dir>/<host>/<path> by Host header, as a stand-in for the web."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    root = os.path.abspath(fixtures_dir)
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            host = (self.headers.get("Host") or "").split(":")[0].casefold()
+            site_dir = os.path.join(root, host)
+            path = os.path.normpath(os.path.join(site_dir, self.path.split("?")[0].lstrip("/")))
+            if os.path.isdir(path):
+                path = os.path.join(path, "index.html")
+
+            delay_file = os.path.join(site_dir, "_delay")
+            if os.path.isfile(delay_file):
+                with open(delay_file) as f:
+                    time.sleep(float(f.read().strip() or 0))
+
+            if not path.startswith(site_dir + os.sep) or not os.path.isfile(path):
+                self.send_error(404)
+                return
+
+            with open(path, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            content_type = "text/plain" if path.endswith(".txt") else "text/html; charset=utf-8"
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    server.daemon_threads = True
+    print(f"Serving {root} on http://127.0.0.1:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl club websites for scorecards")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl")
+    crawl_parser.add_argument("sites", help="CSV with a Website column (e.g. from scotland.py)")
+    crawl_parser.add_argument("--stage-dir", default=DEFAULT_STAGE_DIR)
+    crawl_parser.add_argument("--concurrency", type=int, default=100, help="Clubs crawled at once")
+    crawl_parser.add_argument("--per-host", type=int, default=2, help="Requests in flight per host")
+    crawl_parser.add_argument("--max-pages", type=int, default=5, help="Candidate pages tried per club")
+    crawl_parser.add_argument("--timeout", type=float, default=20.0, help="Seconds per request")
+    crawl_parser.add_argument("--connect-to", help="Send every request to this HOST:PORT (a stand-in server)")
+    crawl_parser.add_argument("--limit", type=int, help="Only crawl the first N clubs")
+
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("fixtures", help="Directory with one subdirectory per host")
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.fixtures, args.port)
+        return
+
+    if not os.path.isfile(args.sites):
+        print(f"Error: {args.sites} not found")
+        sys.exit(1)
+
+    targets = read_targets(args.sites)[:args.limit]
+    stager = Stager(args.stage_dir)
+    try:
+        asyncio.run(crawl_all(targets, stager, max(1, args.concurrency), max(1, args.per_host),
+                              args.max_pages, args.timeout, args.connect_to))
+    finally:
+        stager.close()
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(stager.counts.items()))
+    print(f"Crawled {len(targets)} clubs: {summary or 'nothing'} -> {args.stage_dir}")
+
+
+if __name__ == "__main__":
+    main()
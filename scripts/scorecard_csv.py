@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Bulk import of transposed scorecards from a multi-course CSV/TSV file.
+
+Clubs and federations send spreadsheets with many courses in one sheet.
+Each course is a block of rows: key/value metadata rows, one `tee` row per
+tee, then the holes-as-rows grid that parse_scorecard_transposed.py reads:
+
+    name,Bærum GK
+    city,Bærum
+    country,Norway
+    website,https://www.baerumgk.no
+    unit,m
+    tee,48 (Gul),m,"69,1",130
+    tee,42 (Rød),w,"70,4",126
+    Hull,58,48 (Gul),42 (Rød),Hcp,Par
+    1,276,259,234,9,4
+    ...
+    SUM,5022,4744,4305,,70
+    name,Next Course
+    ...
+
+A `name` row starts a new course; blank rows are ignored. A tee row's
+gender is m/w (or h/d, herrer/damer), and CR and Slope may also share one
+cell ("69,1/130"). Delimiter is tab for .tsv/.tab files and sniffed from
+`,`, `;` and tab otherwise (Excel exports in Norway use `;`).
+
+The file is read one row at a time and each course is converted and
+written as soon as its block ends, so memory stays bounded by the largest
+course. Blocks become stream records for parse_scorecard_transposed's
+parse_record, so ratings go through parse_tee_metadata and the grid through
+parse_transposed_scorecard exactly as in the interactive tool.
+
+Usage:
+    python scripts/scorecard_csv.py courses.csv [--out-dir scripts/sql] [--cache-dir .parse-cache]
+"""
+
+import argparse
+import csv
+import os
+import sys
+from typing import Iterator, List, Optional
+
+from scorecard_stream import ScorecardRecord, open_writer, run_stream
+
+
+METADATA_KEYS = {"name", "city", "country", "website", "unit"}
+LADIES = {"w", "d", "f", "l", "dame", "damer", "ladies", "women", "kvinner"}
+SUMMARY_ROWS = {"ut", "out", "inn", "in", "sum", "total"}
+SNIFF_BYTES = 8192
+DELIMITERS = (",", ";", "\t")  # Ties go to the first
+
+
+def detect_delimiter(path: str, sample: str) -> str:
+    """
+    The candidate that splits the most sample lines into several fields.
+
+    csv.Sniffer is thrown by comma-decimal ratings ("69,1") in `;` files.
+    """
+    if path.lower().endswith((".tsv", ".tab")):
+        return "\t"
+    lines = sample.splitlines()[:-1] or sample.splitlines()  # Last line may be cut off
+    return max(DELIMITERS, key=lambda d: sum(1 for row in csv.reader(lines, delimiter=d) if len(row) > 1))
+
+
+def tee_line(cells: List[str]) -> str:
+    """
+    `tee:` record line from a tee row's cells after the `tee` label.
+
+    Incomplete rows are passed through as they are, so parse_tee_metadata
+    rejects that one course rather than the whole file.
+    """
+    cells = cells + [""] * (4 - len(cells))
+    name, gender = cells[0], cells[1].lower()
+    gender = "w" if gender in LADIES else "m"
+    cr_slope = f"{cells[2]}/{cells[3]}" if cells[3] else cells[2]
+    return f"{name}, {gender} | {cr_slope}"
+
+
+def grid_line(cells: List[str], width: int) -> str:
+    # parse_transposed_scorecard drops empty tab fields, which would shift a
+    # hole row's columns; "-" keeps the position and parses as missing
+    if cells[0].lower() in SUMMARY_ROWS:
+        return "\t".join(cell for cell in cells if cell)
+    cells = (cells + [""] * width)[:width]
+    return "\t".join(cell or "-" for cell in cells)
+
+
+class _Block:
+    def __init__(self, line: int):
+        self.line = line
+        self.metadata: dict[str, list[str]] = {}
+        self.rows: List[str] = []
+        self.width = 0
+
+    def record(self) -> ScorecardRecord:
+        return ScorecardRecord(metadata=self.metadata, scorecard_text="\n".join(self.rows), line=self.line)
+
+
+def iter_course_records(rows: Iterator[List[str]]) -> Iterator[ScorecardRecord]:
+    """Group spreadsheet rows into one record per course, yielding each as it ends."""
+    block: Optional[_Block] = None
+
+    for line_number, row in enumerate(rows, 1):
+        cells = [cell.strip() for cell in row]
+        while cells and not cells[-1]:
+            cells.pop()
+        if not cells or not cells[0]:
+            continue
+
+        key = cells[0].lower()
+        if key == "name":
+            if block is not None:
+                yield block.record()
+            block = _Block(line_number)
+
+        if block is None:
+            raise ValueError(f"Line {line_number}: expected a 'name' row before '{cells[0]}'")
+
+        if key in METADATA_KEYS and not block.rows:
+            block.metadata.setdefault(key, []).append(cells[1] if len(cells) > 1 else "")
+        elif key == "tee" and not block.rows:
+            block.metadata.setdefault("tee", []).append(tee_line(cells[1:]))
+        elif not block.rows:
+            # Grid header: Hull/Hole, tee columns, Hcp, Par
+            block.width = len(cells)
+            block.rows.append("\t".join(cells))
+        else:
+            block.rows.append(grid_line(cells, block.width))
+
+    if block is not None:
+        yield block.record()
+
+
+def iter_file_records(path: str) -> Iterator[ScorecardRecord]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        delimiter = detect_delimiter(path, f.read(SNIFF_BYTES))
+        f.seek(0)
+        yield from iter_course_records(csv.reader(f, delimiter=delimiter))
+
+
+def iter_files_records(paths: List[str], failed: List[str]) -> Iterator[ScorecardRecord]:
+    """The records of every file in turn; files stopped by a malformed row are added to `failed`."""
+    for path in paths:
+        print(f"Importing {path}", file=sys.stderr)
+        try:
+            yield from iter_file_records(path)
+        except ValueError as e:
+            # A malformed row outside any course block stops that file
+            failed.append(path)
+            print(f"Error in {path}: {e}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import many transposed scorecards from a CSV/TSV file")
+    parser.add_argument("files", nargs="+", help="CSV or TSV files")
+    parser.add_argument("--out-dir", help="Write one SQL file per course here instead of stdout")
+    parser.add_argument("--cache-dir", help="Reuse parse results cached here for unchanged courses")
+    parser.add_argument("--cache-max-mb", type=float, default=256)
+    args = parser.parse_args(argv)
+
+    import parse_scorecard_transposed
+
+    cache = None
+    if args.cache_dir:
+        from parse_cache import ParseCache
+
+        cache = ParseCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+
+    for path in args.files:
+        if not os.path.isfile(path):
+            print(f"Error: {path} not found")
+            sys.exit(1)
+
+    # One stream over all files: one writer, one summary and one cache report
+    failed_files: List[str] = []
+    failures = run_stream(iter_files_records(args.files, failed_files), parse_scorecard_transposed.parse_record,
+                          open_writer(args.out_dir), cache=cache, module_name=parse_scorecard_transposed.__name__)
+
+    sys.exit(1 if failures or failed_files else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Extract scorecards from saved HTML pages into parser stream records.
+
+Reads GolfPass course pages and club scorecard pages saved from a browser,
+finds the scorecard tables and writes them as the delimited records that
+`parse_scorecard.py --stream` and `parse_scorecard_transposed.py --stream`
+read (see scorecard_stream.py), so nobody has to copy tables by hand:
+
+    python scripts/scorecard_html.py pages/golfpass/*.html | python scripts/parse_scorecard.py --stream
+    python scripts/scorecard_html.py pages/ --out-dir extracted [--jobs 8]
+
+Pages are recognised by their tables:
+- GolfPass: tee rows carrying "M: 69.3/121" ratings, with Par and Handicap
+  rows. Emitted as GolfPass text rows.
+- Club pages: a holes-as-rows table headed "Hull/Hole, <tees>, Hcp, Par".
+  Emitted as tab-separated transposed rows. A second table with CR and
+  Slope columns, if present, becomes the record's `tee:` lines; without one
+  the record is still written and the tee lines must be added by hand.
+
+The course name comes from the page's <h1> (or og:title / <title>). Unit
+defaults to yards for GolfPass and meters for club pages unless the table
+says otherwise. Each page is read in chunks through a streaming HTMLParser,
+and directories are processed across --jobs worker processes; output keeps
+the input order. Without --out-dir, records of one --kind go to stdout;
+with it, golfpass.txt and transposed.txt are written there.
+"""
+
+import argparse
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from scorecard_stream import RECORD_DELIMITER
+
+
+CHUNK_SIZE = 64 * 1024
+KINDS = ("golfpass", "transposed")
+
+RATING_PATTERN = re.compile(r'\bM:\s*[\d.]+/\d+')
+CR_SLOPE_NUMBER = re.compile(r'^\d+(?:[.,]\d+)?$')
+HOLE_HEADERS = {"hull", "hole", "hul", "hål"}
+SUMMARY_ROWS = {"ut", "out", "inn", "in", "sum", "total"}
+LADIES_WORDS = ("dame", "ladies", "women", "kvinner", "damer")
+MENS_WORDS = ("herre", "men", "menn", "herrer")
+SKIPPED_TAGS = {"script", "style", "noscript", "svg"}
+# "Bærum GK - Scorekort", "Aberdour Golf Club Scorecard | GolfPass"
+TITLE_SUFFIX = re.compile(r"\s*(?:[-–|:]\s*)?\b(?:scorecard|score card|scorekort|golfpass)\b.*$", re.IGNORECASE)
+
+
+@dataclass
+class PageTables:
+    tables: List[List[List[str]]] = field(default_factory=list)
+    h1: str = ""
+    title: str = ""
+    og_title: str = ""
+    canonical: str = ""
+    links: List[Tuple[str, str]] = field(default_factory=list)  # (href, anchor text)
+
+
+@dataclass
+class ExtractedScorecard:
+    kind: str  # "golfpass" or "transposed"
+    source: str
+    record: str  # Record text without the trailing delimiter
+    warnings: List[str] = field(default_factory=list)
+
+
+class ScorecardTableParser(HTMLParser):
+    """Collects every table's cell texts, plus the page's title candidates."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.page = PageTables()
+        self._tables: List[List[List[str]]] = []  # Stack, for nested tables
+        self._cell: Optional[List[str]] = None
+        self._capture: Optional[str] = None  # "h1" or "title" while inside one
+        self._captured: List[str] = []
+        self._link: Optional[Tuple[str, List[str]]] = None  # Open <a>: href, text
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            return
+
+        if tag == "table":
+            self._tables.append([])
+        elif tag == "tr" and self._tables:
+            self._tables[-1].append([])
+        elif tag in ("td", "th") and self._tables:
+            if not self._tables[-1]:
+                self._tables[-1].append([])
+            self._cell = []
+        elif tag == "br" and self._cell is not None:
+            self._cell.append(" ")
+        elif tag in ("h1", "title") and not getattr(self.page, tag):
+            self._capture = tag
+            self._captured = []
+        elif tag == "meta":
+            attributes = dict(attrs)
+            if attributes.get("property") == "og:title" and not self.page.og_title:
+                self.page.og_title = (attributes.get("content") or "").strip()
+        elif tag == "link":
+            attributes = dict(attrs)
+            if "canonical" in (attributes.get("rel") or "").split():
+                self.page.canonical = attributes.get("href") or ""
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            self._link = (href, []) if href else None
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+
+        if tag in ("td", "th") and self._cell is not None:
+            self._tables[-1][-1].append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "table" and self._tables:
+            table = [row for row in self._tables.pop() if any(row)]
+            if table:
+                self.page.tables.append(table)
+        elif tag == self._capture:
+            setattr(self.page, tag, " ".join("".join(self._captured).split()))
+            self._capture = None
+        elif tag == "a" and self._link is not None:
+            href, text = self._link
+            self.page.links.append((href, " ".join("".join(text).split())))
+            self._link = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._cell is not None:
+            self._cell.append(data)
+        if self._capture:
+            self._captured.append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+
+
+def parse_page(html: str) -> PageTables:
+    parser = ScorecardTableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.page
+
+
+def read_page(path: str) -> PageTables:
+    parser = ScorecardTableParser()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    return parser.page
+
+
+def is_golfpass_table(table: List[List[str]]) -> bool:
+    labels = [row[0].lower() for row in table if row]
+    return any(label.startswith("par") for label in labels) and any(
+        RATING_PATTERN.search(" ".join(row)) for row in table
+    )
+
+
+def is_transposed_table(table: List[List[str]]) -> bool:
+    header = [cell.lower() for cell in table[0]]
+    return (
+        bool(header) and header[0] in HOLE_HEADERS
+        and any(cell in ("hcp", "handicap") for cell in header)
+        and "par" in header
+        and any(row and row[0].isdigit() for row in table[1:])
+    )
+
+
+def is_ratings_table(table: List[List[str]]) -> bool:
+    return any("slope" in cell.lower() for cell in table[0])
+
+
+def golfpass_rows(table: List[List[str]]) -> List[str]:
+    # Tee name and "M: .../... W: .../..." may sit in one cell or two; either
+    # way parse_tee_row sees "White M: 69.3/121 W: 72.1/125 374 ..."
+    return ["\t".join(cell for cell in row if cell) for row in table if any(row)]
+
+
+def transposed_rows(table: List[List[str]]) -> List[str]:
+    width = len(table[0])
+    rows = ["\t".join(table[0])]
+    for row in table[1:]:
+        if not row or not row[0]:
+            continue
+        if row[0].lower() in SUMMARY_ROWS:
+            rows.append("\t".join(cell for cell in row if cell))
+            continue
+        # The transposed parser drops empty tab fields, which would shift
+        # columns; "-" keeps the position and parses as a missing value
+        cells = (row + [""] * width)[:width]
+        rows.append("\t".join(cell or "-" for cell in cells))
+    return rows
+
+
+def tee_gender(text: str) -> Optional[str]:
+    words = re.findall(r"[a-zæøå]+", text.lower())
+    if any(word.startswith(LADIES_WORDS) for word in words) or "w" in words or "d" in words:
+        return "w"
+    if any(word.startswith(MENS_WORDS) for word in words) or "m" in words or "h" in words:
+        return "m"
+    return None
+
+
+def ratings_tee_lines(table: List[List[str]], tee_names: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    `tee:` lines from a ratings table, and warnings for rows that don't fit.
+
+    Handles one row per tee with a gender column ("Tee | Kjønn | CR | Slope")
+    and one row per tee with CR/Slope column pairs per gender
+    ("Tee | Herrer CR | Herrer Slope | Damer CR | Damer Slope").
+    """
+    header = [cell.lower() for cell in table[0]]
+    cr_columns = [i for i, cell in enumerate(header)
+                  if ("cr" in cell.split() or "rating" in cell) and "slope" not in cell]
+    slope_columns = [i for i, cell in enumerate(header) if "slope" in cell]
+    gender_column = next((i for i, cell in enumerate(header)
+                          if cell in ("kjønn", "gender", "sex", "m/w", "m/d", "h/d")), None)
+
+    by_name = {name.casefold(): name for name in tee_names}
+    lines = []
+    warnings = []
+
+    for row in table[1:]:
+        if not row or not row[0]:
+            continue
+        tee_name = by_name.get(row[0].casefold())
+        if tee_name is None:
+            # "48 (Gul)" in the ratings table against a "48" column, or vice versa
+            tee_name = next((name for key, name in by_name.items()
+                             if row[0].casefold().startswith(key) or key.startswith(row[0].casefold())), None)
+        if tee_name is None:
+            warnings.append(f"ratings row '{row[0]}' matches no tee column {tee_names}")
+            continue
+
+        for cr_index, slope_index in zip(cr_columns, slope_columns):
+            if max(cr_index, slope_index) >= len(row):
+                continue
+            cr, slope = row[cr_index], row[slope_index]
+            if not CR_SLOPE_NUMBER.match(cr) or not slope.isdigit():
+                continue
+            if gender_column is not None and gender_column < len(row):
+                gender = tee_gender(row[gender_column]) or "m"
+            else:
+                gender = tee_gender(header[cr_index]) or "m"
+            lines.append(f"tee: {tee_name}, {gender} | {cr}/{slope}")
+
+    return lines, warnings
+
+
+def detect_unit(tables: Iterable[List[List[str]]], default: str) -> str:
+    for table in tables:
+        text = " ".join(" ".join(row) for row in table[:2]).lower()
+        if "yards" in text or "yds" in text:
+            return "y"
+        if "meter" in text or "metres" in text:
+            return "m"
+    return default
+
+
+def course_name(page: PageTables, path: str) -> str:
+    for candidate in (page.h1, page.og_title, page.title):
+        name = TITLE_SUFFIX.sub("", candidate).strip()
+        if name:
+            return name
+    return os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+
+
+def format_record(metadata: List[Tuple[str, str]], rows: List[str]) -> str:
+    return "\n".join([f"{key}: {value}" for key, value in metadata if value] + rows)
+
+
+def extract_file(path: str) -> List[ExtractedScorecard]:
+    """Scorecards found in one saved page; normally zero or one."""
+    return extract_page(read_page(path), path)
+
+
+def extract_page(page: PageTables, source: str, name: Optional[str] = None,
+                 website: Optional[str] = None) -> List[ExtractedScorecard]:
+    """
+    Scorecards in a parsed page. name and website override what the page
+    says (a crawl knows the club it came from).
+    """
+    name = name or course_name(page, source)
+    found = []
+
+    golfpass = [table for table in page.tables if is_golfpass_table(table)]
+    if golfpass:
+        table = golfpass[0]
+        metadata = [("name", name), ("website", website or ""), ("unit", detect_unit([table], "y"))]
+        found.append(ExtractedScorecard("golfpass", source, format_record(metadata, golfpass_rows(table))))
+
+    transposed = [table for table in page.tables if is_transposed_table(table)]
+    if transposed:
+        table = transposed[0]
+        tee_names = []
+        for cell in table[0][1:]:
+            if cell.lower() in ("hcp", "handicap", "par"):
+                break
+            tee_names.append(cell)
+
+        tee_lines, warnings = [], []
+        for ratings in (t for t in page.tables if is_ratings_table(t)):
+            tee_lines, warnings = ratings_tee_lines(ratings, tee_names)
+            if tee_lines:
+                break
+        if not tee_lines:
+            warnings.append("no ratings table; add 'tee:' lines by hand")
+
+        if website is None and page.canonical:
+            parsed = urlparse(page.canonical)
+            website = f"{parsed.scheme}://{parsed.netloc}" if parsed.netloc else ""
+
+        metadata = [("name", name), ("website", website or ""), ("unit", detect_unit([table], "m"))]
+        record = format_record(metadata, tee_lines + transposed_rows(table))
+        found.append(ExtractedScorecard("transposed", source, record, warnings))
+
+    return found
+
+
+def iter_pages(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for filename in sorted(files):
+                    if filename.lower().endswith((".html", ".htm")):
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+
+def _extract_or_error(path: str):
+    try:
+        return extract_file(path), None
+    except (OSError, ValueError) as e:
+        return [], str(e)
+
+
+def _extract_pages(pages: List[str], jobs: int):
+    """(scorecards, error) of each page in order, in worker processes when jobs > 1."""
+    if jobs <= 1 or len(pages) < 2:
+        yield from map(_extract_or_error, pages)
+        return
+    # Imported here: multiprocessing costs every single-process run ~20 ms of startup
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(_extract_or_error, pages, chunksize=16)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract scorecards from saved HTML pages")
+    parser.add_argument("paths", nargs="+", help="HTML files or directories of them")
+    parser.add_argument("--kind", choices=KINDS, default="golfpass",
+                        help="Records written to stdout (without --out-dir)")
+    parser.add_argument("--out-dir", help="Write golfpass.txt and transposed.txt here")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    pages = list(iter_pages(args.paths))
+    if not pages:
+        print("Error: No HTML pages found")
+        sys.exit(1)
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        outputs = {kind: open(os.path.join(args.out_dir, f"{kind}.txt"), "w", encoding="utf-8")
+                   for kind in KINDS}
+    else:
+        outputs = {args.kind: sys.stdout}
+
+    counts = dict.fromkeys(KINDS, 0)
+    without_scorecard = 0
+    failed = 0
+
+    for path, (scorecards, error) in zip(pages, _extract_pages(pages, args.jobs)):
+        if error:
+            failed += 1
+            print(f"{path}: {error}", file=sys.stderr)
+            continue
+        if not scorecards:
+            without_scorecard += 1
+            continue
+
+        for scorecard in scorecards:
+            for warning in scorecard.warnings:
+                print(f"{path}: {warning}", file=sys.stderr)
+            out = outputs.get(scorecard.kind)
+            if out is None:
+                continue
+            out.write(scorecard.record)
+            out.write(f"\n{RECORD_DELIMITER}\n")
+            counts[scorecard.kind] += 1
+
+    for kind, out in outputs.items():
+        if out is not sys.stdout:
+            out.close()
+
+    summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+    print(f"Extracted {summary} scorecard(s) from {len(pages)} page(s); "
+          f"{without_scorecard} without a scorecard, {failed} failed", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Streaming helpers shared by the scorecard parsers' pipe mode.
+
+A stream is any number of scorecard records separated by a line containing
+only `---`. Each record starts with `key: value` metadata lines followed by
+the scorecard rows in the format the parser expects:
+
+    name: Aberdour Golf Club
+    city: Aberdour
+    country: Scotland
+    website: https://www.aberdourgolfclub.co.uk
+    unit: y
+    Hole    1    2    3 ...
+    White M: 66.6/120    160    159 ...
+    Par    3    3    4 ...
+    ---
+    name: Next Course
+    ...
+
+The transposed parser additionally takes one `tee:` line per tee, holding
+the interactive prompts' two answers separated by `|`:
+
+    tee: 48 (Gul), m | 69,1/130
+
+Records are parsed one at a time and each course's SQL is written once it
+has been generated in full, so a record that fails part-way leaves nothing
+behind and memory use does not grow with the length of the stream.
+"""
+
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, Optional
+
+
+RECORD_DELIMITER = "---"
+METADATA_KEYS = {"name", "city", "country", "website", "unit", "tee"}
+METADATA_PATTERN = re.compile(r'^\s*([A-Za-z]+)\s*:\s*(.*?)\s*$')
+
+
+@dataclass
+class ScorecardRecord:
+    metadata: dict[str, list[str]]  # key -> values in input order
+    scorecard_text: str
+    line: int  # Line number of the record's first line in the stream
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        values = self.metadata.get(key)
+        return values[-1] if values and values[-1] else default
+
+    def get_all(self, key: str) -> list[str]:
+        return self.metadata.get(key, [])
+
+
+@dataclass
+class ParsedRecord:
+    course_name: str
+    model: object  # The parser's own course object(s), kept by the parse cache
+    sql_parts: Iterable[str]
+
+
+@dataclass
+class _PendingRecord:
+    line: int
+    metadata: dict[str, list[str]] = field(default_factory=dict)
+    body: list[str] = field(default_factory=list)
+
+
+def iter_records(lines: Iterable[str]) -> Iterator[ScorecardRecord]:
+    """
+    Yield records from an iterable of lines (e.g. sys.stdin) as they complete.
+
+    Metadata lines are only recognised before the first scorecard row, so a
+    GolfPass tee row such as "White M: 69.3/121 ..." is never mistaken for one.
+    """
+    pending = None
+
+    for line_number, raw_line in enumerate(lines, 1):
+        line = raw_line.rstrip("\r\n")
+
+        if line.strip() == RECORD_DELIMITER:
+            if pending is not None and (pending.body or pending.metadata):
+                yield _finish(pending)
+            pending = None
+            continue
+
+        if pending is None:
+            if not line.strip():
+                continue
+            pending = _PendingRecord(line=line_number)
+
+        if not pending.body:
+            match = METADATA_PATTERN.match(line)
+            if match and match.group(1).lower() in METADATA_KEYS:
+                pending.metadata.setdefault(match.group(1).lower(), []).append(match.group(2))
+                continue
+            if not line.strip():
+                continue
+
+        pending.body.append(line)
+
+    if pending is not None and (pending.body or pending.metadata):
+        yield _finish(pending)
+
+
+def _finish(pending: _PendingRecord) -> ScorecardRecord:
+    return ScorecardRecord(
+        metadata=pending.metadata,
+        scorecard_text="\n".join(pending.body),
+        line=pending.line,
+    )
+
+
+def course_sql_filename(course_name: str, sql_dir: str = "scripts/sql") -> str:
+    """File name the interactive parsers use when saving a course."""
+    return os.path.join(sql_dir, f"{course_name.lower().replace(' ', '_')}.sql")
+
+
+class StreamSqlWriter:
+    """Writes each course's SQL to one output stream, separated by a blank line."""
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self.courses_written = 0
+
+    def write_course(self, course_name: str, parts: Iterable[str]) -> Optional[str]:
+        if self.courses_written:
+            self.stream.write("\n\n")
+        _write_parts(self.stream, parts)
+        self.stream.write("\n")
+        self.stream.flush()
+        self.courses_written += 1
+        return None
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class DirectorySqlWriter:
+    """Writes each course's SQL to its own file, named like the interactive save."""
+
+    def __init__(self, sql_dir: str):
+        self.sql_dir = sql_dir
+        self.courses_written = 0
+        os.makedirs(sql_dir, exist_ok=True)
+
+    def write_course(self, course_name: str, parts: Iterable[str]) -> Optional[str]:
+        filename = course_sql_filename(course_name, self.sql_dir)
+        with open(filename, "w") as f:
+            _write_parts(f, parts)
+        self.courses_written += 1
+        return filename
+
+    def close(self) -> None:
+        pass
+
+
+def _write_parts(stream: IO[str], parts: Iterable[str]) -> None:
+    # Same output as stream.write('\n'.join(parts)) without building the string
+    first = True
+    for part in parts:
+        if not first:
+            stream.write("\n")
+        stream.write(part)
+        first = False
+
+
+def open_writer(out_dir: Optional[str]):
+    return DirectorySqlWriter(out_dir) if out_dir else StreamSqlWriter(sys.stdout)
+
+
+def add_stream_arguments(parser) -> None:
+    """Add the pipe-mode options shared by both parsers to an ArgumentParser."""
+    parser.add_argument("--stream", action="store_true",
+                        help="Read delimited scorecard records from stdin")
+    parser.add_argument("--out-dir", help="With --stream, write one SQL file per course here")
+    parser.add_argument("--cache-dir",
+                        help="With --stream, reuse parse results cached here for unchanged records")
+    parser.add_argument("--cache-max-mb", type=float, default=256,
+                        help="Evict least recently used cache entries above this size")
+
+
+def stream_main(args, parse_record, module_name: str) -> None:
+    """Run pipe mode for parsed command-line args and exit with its status."""
+    cache = None
+    if args.cache_dir:
+        from parse_cache import ParseCache
+
+        cache = ParseCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+
+    failures = run_stream(iter_records(sys.stdin), parse_record, open_writer(args.out_dir),
+                          cache=cache, module_name=module_name)
+    sys.exit(1 if failures else 0)
+
+
+def run_stream(records: Iterable[ScorecardRecord], parse_record, writer,
+               cache=None, module_name: Optional[str] = None) -> int:
+    """
+    Parse and write every record, reporting progress on stderr.
+
+    parse_record(record) parses one record into a ParsedRecord and raises on
+    bad input. A bad record is reported and skipped. With a ParseCache,
+    records whose key (see parse_cache.record_key) is already cached are
+    written from the cache without being parsed; module_name names the
+    parser module for the key. Returns the number of failed records.
+    """
+    failures = 0
+
+    for record in records:
+        key = cache.key(module_name, record) if cache is not None else None
+        entry = cache.get(key) if cache is not None else None
+
+        if entry is not None:
+            course_name, sql_parts = entry.course_name, [entry.sql]
+        else:
+            try:
+                parsed = parse_record(record)
+                # The SQL is generated lazily and can still fail on bad data, so build
+                # it here rather than half-way through writing; one course is bounded
+                course_name, sql_parts = parsed.course_name, list(parsed.sql_parts)
+            except Exception as e:
+                failures += 1
+                print(f"Error in record at line {record.line}: {e}", file=sys.stderr)
+                continue
+
+            if cache is not None:
+                sql = "\n".join(sql_parts)
+                cache.put(key, cache.entry(course_name, parsed.model, sql))
+                sql_parts = [sql]
+
+        filename = writer.write_course(course_name, sql_parts)
+        if filename:
+            print(f"Saved {course_name} to {filename}", file=sys.stderr)
+
+    writer.close()
+    print(f"Wrote {writer.courses_written} course(s), {failures} failed", file=sys.stderr)
+    if cache is not None:
+        print(f"Cache: {cache.hits} hit(s), {cache.misses} miss(es), "
+              f"{len(cache)} entries, {cache.total_bytes / 1024:.0f} KiB", file=sys.stderr)
+    return failures
@@ -1,8 +1,8 @@
 import csv
+import math
 import re
-from typing import Dict, List, Tuple
-
-import requests
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
 
 OUTPUT_FILE = "scotland_golf_courses.csv"
 
@@ -12,39 +12,69 @@ ENDPOINTS = [
     "https://overpass.private.coffee/api/interpreter",
 ]
 
-QUERIES = [
-    """
-    [out:json][timeout:300];
-    area["ISO3166-2"="GB-SCT"]->.searchArea;
-    (
-      node["leisure"="golf_course"](area.searchArea);
-      way["leisure"="golf_course"](area.searchArea);
-      relation["leisure"="golf_course"](area.searchArea);
-    );
-    out tags center;
-    """,
+GOLF_COURSE_SELECTORS = ("node", "way", "relation")
+FULL_OUTPUT = "out tags center;"
+DUPLICATE_DEGREES = 0.02  # Same-named located rows closer than this (~2 km) are one course
+CSV_HEADER = ["Club Name", "Course Name", "Website", "Lat", "Lon"]
+
+# Club name, course name, website, lat, lon; the position is None (an empty
+# CSV cell) for an element without one
+Row = Tuple[str, str, str, Optional[float], Optional[float]]
+
+
+def golf_course_query(scope: str, area: str = "") -> str:
+    """Overpass query for golf courses in scope, a bbox or a named area set."""
+    lines = ["[out:json][timeout:300];"]
+    if area:
+        lines.append(area)
+    lines.append("(")
+    lines += [f'  {kind}["leisure"="golf_course"]{scope};' for kind in GOLF_COURSE_SELECTORS]
+    lines += [");", FULL_OUTPUT]
+    return "\n".join(lines)
+
+
+def with_versions(query: str) -> str:
+    """A golf_course_query that also returns each element's version and timestamp."""
+    if not query.endswith(FULL_OUTPUT):
+        raise ValueError("Not a golf_course_query")
+    return query[:-len(FULL_OUTPUT)] + "out tags center meta;"
+
+
+def changed_since_query(query: str, since: str) -> str:
     """
-    [out:json][timeout:300];
-    area
-      ["name"="Scotland"]
-      ["boundary"="administrative"]
-      ["admin_level"="4"]->.searchArea;
-    (
-      node["leisure"="golf_course"](area.searchArea);
-      way["leisure"="golf_course"](area.searchArea);
-      relation["leisure"="golf_course"](area.searchArea);
-    );
-    out tags center;
-    """,
+    A golf_course_query that lists the ids of all matching elements but
+    returns full elements only for those edited after `since`.
+
+    The id list is what reveals deletions (and elements that lost their
+    golf tags), which `newer` on its own cannot.
     """
-    [out:json][timeout:300];
-    (
-      node["leisure"="golf_course"](54.55,-8.80,60.95,-0.40);
-      way["leisure"="golf_course"](54.55,-8.80,60.95,-0.40);
-      relation["leisure"="golf_course"](54.55,-8.80,60.95,-0.40);
-    );
-    out tags center;
-    """,
+    if not query.endswith(FULL_OUTPUT):
+        raise ValueError("Not a golf_course_query")
+    return query[:-len(FULL_OUTPUT)] + f'out ids;\nnwr._(newer:"{since}");\nout tags center meta;'
+
+
+def iso_area_query(iso_code: str) -> str:
+    """Golf courses inside the area tagged with an ISO 3166-1 or 3166-2 code."""
+    tag = "ISO3166-2" if "-" in iso_code else "ISO3166-1"
+    return golf_course_query("(area.searchArea)", f'area["{tag}"="{iso_code}"]->.searchArea;')
+
+
+def admin_area_query(name: str, admin_level: int) -> str:
+    return golf_course_query(
+        "(area.searchArea)",
+        f'area["name"="{name}"]["boundary"="administrative"]["admin_level"="{admin_level}"]->.searchArea;',
+    )
+
+
+def bbox_query(south: float, west: float, north: float, east: float) -> str:
+    return golf_course_query(f"({south},{west},{north},{east})")
+
+
+# Tried in order until one returns rows: ISO code, admin boundary name, bbox
+QUERIES = [
+    iso_area_query("GB-SCT"),
+    admin_area_query("Scotland", 4),
+    bbox_query(54.55, -8.80, 60.95, -0.40),
 ]
 
 
@@ -75,101 +105,208 @@ def pick_name(tags: Dict[str, str], *keys: str) -> str:
     return ""
 
 
-def fetch_osm_data() -> List[Dict]:
+def fetch_osm_data(
+    queries: List[str] = QUERIES,
+    endpoints: List[str] = ENDPOINTS,
+    limiter=None,
+    label: str = "",
+    allow_empty: bool = False,
+) -> List[Dict]:
+    """
+    Run the queries against each endpoint in turn; first non-empty result wins.
+
+    limiter (osm_harvest.EndpointRateLimiter) paces requests per endpoint when
+    several harvests run at once; label prefixes the progress lines. With
+    allow_empty, a successful empty response is a result (e.g. a tile of sea).
+    """
+    payload, _ = fetch_osm_payload(queries, endpoints, limiter, label, allow_empty)
+    return payload.get("elements", [])
+
+
+def fetch_osm_payload(
+    queries: List[str] = QUERIES,
+    endpoints: List[str] = ENDPOINTS,
+    limiter=None,
+    label: str = "",
+    allow_empty: bool = False,
+) -> Tuple[Dict, str]:
+    """
+    Like fetch_osm_data, but returns the whole Overpass response and the
+    query that produced it. The response's osm3s.timestamp_osm_base is the
+    point in time the data reflects.
+    """
+    # Imported here so the offline steps (build_rows, write_csv) load without it
+    import requests
+
     last_error = None
+    prefix = f"[{label}] " if label else ""
 
-    for endpoint in ENDPOINTS:
-        for i, query in enumerate(QUERIES, start=1):
+    for endpoint in endpoints:
+        for i, query in enumerate(queries, start=1):
             try:
-                response = requests.post(
-                    endpoint,
-                    data={"data": query},
-                    headers={
-                        "Accept": "application/json",
-                        "User-Agent": "scotland-golf-courses/1.0",
-                    },
-                    timeout=300,
-                )
+                with limiter.slot(endpoint) if limiter else nullcontext():
+                    response = requests.post(
+                        endpoint,
+                        data={"data": query},
+                        headers={
+                            "Accept": "application/json",
+                            "User-Agent": "scotland-golf-courses/1.0",
+                        },
+                        timeout=300,
+                    )
                 response.raise_for_status()
                 payload = response.json()
                 elements = payload.get("elements", [])
 
                 print(
-                    f"Endpoint: {endpoint} | Query {i} | "
+                    f"{prefix}Endpoint: {endpoint} | Query {i} | "
                     f"Elements: {len(elements)}"
                 )
 
-                if elements:
-                    return elements
+                if elements or allow_empty:
+                    return payload, query
             except Exception as exc:
                 last_error = exc
-                print(f"Failed: {endpoint} | Query {i} | {exc}")
+                print(f"{prefix}Failed: {endpoint} | Query {i} | {exc}")
 
     raise RuntimeError(f"All Overpass queries failed or returned 0 rows: {last_error}")
 
 
-def build_rows(elements: List[Dict]) -> List[Tuple[str, str, str]]:
+def element_coordinates(element: Dict) -> Optional[Tuple[float, float]]:
+    """(lat, lon) of a node, or the center Overpass adds for ways/relations."""
+    if "lat" in element and "lon" in element:
+        return float(element["lat"]), float(element["lon"])
+    center = element.get("center")
+    if center and "lat" in center and "lon" in center:
+        return float(center["lat"]), float(center["lon"])
+    return None
+
+
+def element_row(element: Dict) -> Optional[Row]:
+    tags = element.get("tags", {})
+    if not tags:
+        return None
+
+    club_name = pick_name(
+        tags,
+        "operator",
+        "club",
+        "brand",
+        "name",
+        "official_name",
+    )
+    course_name = pick_name(
+        tags,
+        "golf:course:name",
+        "name",
+        "official_name",
+        "short_name",
+    )
+    website = pick_website(tags)
+
+    if not club_name and not course_name:
+        return None
+
+    if not club_name:
+        club_name = course_name
+
+    if not course_name:
+        course_name = club_name
+
+    lat, lon = element_coordinates(element) or (None, None)
+    return club_name, course_name, website, lat, lon
+
+
+def row_key(row: Tuple[str, ...]) -> Tuple[str, str, str]:
+    club_name, course_name, website = row[:3]
+    return (
+        club_name.casefold(),
+        course_name.casefold(),
+        website.casefold(),
+    )
+
+
+def build_rows(elements: List[Dict]) -> List[Row]:
     rows = []
 
     for element in elements:
-        tags = element.get("tags", {})
-        if not tags:
-            continue
+        row = element_row(element)
+        if row:
+            rows.append(row)
 
-        club_name = pick_name(
-            tags,
-            "operator",
-            "club",
-            "brand",
-            "name",
-            "official_name",
-        )
-        course_name = pick_name(
-            tags,
-            "golf:course:name",
-            "name",
-            "official_name",
-            "short_name",
-        )
-        website = pick_website(tags)
-
-        if not club_name and not course_name:
-            continue
+    deduped = {}
+    for row in rows:
+        deduped[row_key(row)] = row
 
-        if not club_name:
-            club_name = course_name
+    clean_rows = list(deduped.values())
+    clean_rows.sort(key=lambda row: (row[0].casefold(), row[1].casefold()))
+    return clean_rows
 
-        if not course_name:
-            course_name = club_name
 
-        rows.append((club_name, course_name, website))
+def _same_place(a: Tuple[float, float], b: Tuple[float, float]) -> bool:
+    lat_gap = abs(a[0] - b[0])
+    lon_gap = abs(a[1] - b[1]) * math.cos(math.radians(a[0]))
+    return lat_gap < DUPLICATE_DEGREES and lon_gap < DUPLICATE_DEGREES
 
-    deduped = {}
-    for club_name, course_name, website in rows:
-        key = (
-            club_name.casefold(),
-            course_name.casefold(),
-            website.casefold(),
-        )
-        deduped[key] = (club_name, course_name, website)
 
-    clean_rows = list(deduped.values())
-    clean_rows.sort(key=lambda row: (row[0].casefold(), row[1].casefold()))
+def build_located_rows(elements: List[Dict]) -> List[Row]:
+    """
+    Like build_rows, but only for courses with a position, deduplicated by place.
+
+    Elements without a position are dropped. Rows with the same names and
+    website are one course only when they are also within about 2 km of each
+    other (a course mapped as both a node and a way); same-named courses in
+    different places (two "Municipal Golf Course" rows without a website)
+    are kept apart, where build_rows keeps the last of them. Located rows
+    feed course_geo_index.py.
+    """
+    deduped: Dict[Tuple[str, str, str], List[Row]] = {}
+    for element in elements:
+        row = element_row(element)
+        if not row or row[3] is None:
+            continue
+        places = deduped.setdefault(row_key(row), [])
+        for i, kept in enumerate(places):
+            if _same_place(kept[3:], row[3:]):
+                places[i] = row
+                break
+        else:
+            places.append(row)
+
+    clean_rows = [row for places in deduped.values() for row in places]
+    clean_rows.sort(key=lambda row: (row[0].casefold(), row[1].casefold(), row[3], row[4]))
     return clean_rows
 
 
-def write_csv(rows: List[Tuple[str, str, str]], filename: str) -> None:
+def write_csv(rows: List[Row], filename: str) -> None:
     with open(filename, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["Club Name", "Course Name", "Website"])
+        writer.writerow(CSV_HEADER)
         writer.writerows(rows)
 
 
-def main() -> None:
+def has_current_header(filename: str) -> bool:
+    """Whether filename exists and has write_csv's current columns."""
+    try:
+        with open(filename, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None) == CSV_HEADER
+    except FileNotFoundError:
+        return False
+
+
+def read_csv(filename: str) -> List[Tuple[str, ...]]:
+    """Rows of a CSV from write_csv, as text; files from before Lat/Lon get empty cells."""
+    with open(filename, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Header
+        return [tuple(row[:5]) + ("",) * (5 - len(row)) for row in reader if len(row) >= 3]
+
+
+def main(output_file: str = OUTPUT_FILE) -> None:
     elements = fetch_osm_data()
     rows = build_rows(elements)
-    write_csv(rows, OUTPUT_FILE)
-    print(f"Wrote {len(rows)} rows to {OUTPUT_FILE}")
+    write_csv(rows, output_file)
+    print(f"Wrote {len(rows)} rows to {output_file}")
 
 
 if __name__ == "__main__":
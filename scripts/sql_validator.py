@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Validate course seed SQL against a model of the course/teeInfo/hole schema.
+
+The only other check is building seed.sql and running `supabase db reset`,
+which takes minutes and stops at the first bad file. This reads the
+generators' `do $$` blocks with course_catalog.iter_insert_statements and
+checks, without a database:
+
+- every column exists, is not given twice, and matches the value count
+- value types (integer, numeric, text, uuid, boolean) and NOT NULL columns
+- enum-like text columns: gender, distanceMeasurement, approvalStatus, source
+- `returning id into` variables are declared, and courseId/teeId refer to a
+  variable bound to a course/tee insert
+- the unique keys: course (name, country, city) across all files, the
+  active teeInfo (course, name, gender) and hole (tee, holeNumber)
+- that every tee has 9 or 18 holes, numbered from 1 (a warning otherwise:
+  nothing in the schema enforces it, but the app expects one or the other)
+
+Errors would fail the seed. Warnings are values the database accepts but
+the app's tee/hole forms reject (packages/handicap-core/src/types.ts).
+Files are checked in parallel worker processes.
+
+Usage:
+    python scripts/sql_validator.py [scripts/sql | FILE.sql ...] [--jobs N] [--no-warnings]
+
+Output is `path:line: error|warning: message`; exits 1 if there are errors.
+"""
+
+import argparse
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from course_catalog import (
+    COURSE_TABLE, DEFAULT_SQL_DIR, HOLE_TABLE, TEE_TABLE,
+    SqlVariable, iter_course_files, iter_insert_statements,
+)
+
+
+UUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+DECLARE_PATTERN = re.compile(r'^\s*(\w+)\s+(?:integer|int|bigint)\s*;', re.IGNORECASE | re.MULTILINE)
+BOOLEAN_LITERALS = {"true", "false"}
+
+APPROVAL_STATUSES = ("pending", "approved", "rejected")
+
+
+@dataclass(frozen=True)
+class Column:
+    type: str  # "serial", "integer", "numeric", "text", "uuid" or "boolean"
+    nullable: bool = False
+    has_default: bool = False
+    allowed: Optional[Tuple[str, ...]] = None
+    references: Optional[str] = None  # Table a variable in this column must be bound to
+
+
+@dataclass(frozen=True)
+class Table:
+    columns: Dict[str, Column]
+
+
+# Mirrors apps/web/db/schema.ts
+SCHEMA = {
+    COURSE_TABLE: Table({
+        "id": Column("serial", has_default=True),
+        "name": Column("text"),
+        "approvalStatus": Column("text", has_default=True, allowed=APPROVAL_STATUSES),
+        "country": Column("text", has_default=True),
+        "city": Column("text", has_default=True),
+        "website": Column("text", nullable=True),
+        "submittedBy": Column("uuid", nullable=True),
+        "source": Column("text", has_default=True, allowed=("user", "ingest")),
+    }),
+    TEE_TABLE: Table({
+        "id": Column("serial", has_default=True),
+        "courseId": Column("integer", references=COURSE_TABLE),
+        "name": Column("text"),
+        "gender": Column("text", allowed=("mens", "ladies")),
+        "courseRating18": Column("numeric"),
+        "slopeRating18": Column("integer"),
+        "courseRatingFront9": Column("numeric"),
+        "slopeRatingFront9": Column("integer"),
+        "courseRatingBack9": Column("numeric"),
+        "slopeRatingBack9": Column("integer"),
+        "outPar": Column("integer"),
+        "inPar": Column("integer"),
+        "totalPar": Column("integer"),
+        "outDistance": Column("integer"),
+        "inDistance": Column("integer"),
+        "totalDistance": Column("integer"),
+        "distanceMeasurement": Column("text", has_default=True, allowed=("meters", "yards")),
+        "approvalStatus": Column("text", has_default=True, allowed=APPROVAL_STATUSES),
+        "isArchived": Column("boolean", has_default=True),
+        "version": Column("integer", has_default=True),
+        "submittedBy": Column("uuid", nullable=True),
+        "parentTeeId": Column("integer", nullable=True, references=TEE_TABLE),
+    }),
+    HOLE_TABLE: Table({
+        "id": Column("serial", has_default=True),
+        "teeId": Column("integer", references=TEE_TABLE),
+        "holeNumber": Column("integer"),
+        "par": Column("integer"),
+        "distance": Column("integer"),
+        "hcp": Column("integer"),
+    }),
+}
+
+# teeSchema / holeSchema ranges the app enforces when a tee is edited
+APP_RANGES = {
+    TEE_TABLE: {
+        "courseRating18": (40, 90), "slopeRating18": (45, 165),
+        "courseRatingFront9": (20, 45), "slopeRatingFront9": (45, 165),
+        "courseRatingBack9": (20, 45), "slopeRatingBack9": (45, 165),
+        "outPar": (27, 40), "inPar": (27, 40), "totalPar": (54, 80),
+    },
+    HOLE_TABLE: {"holeNumber": (1, 18), "par": (1, 5), "hcp": (1, 18), "distance": (1, 700)},
+}
+
+HOLES_PER_TEE = (9, 18)
+
+
+@dataclass
+class Finding:
+    line: int
+    severity: str  # "error" or "warning"
+    message: str
+
+
+@dataclass
+class FileReport:
+    path: str
+    findings: List[Finding] = field(default_factory=list)
+    course_keys: List[Tuple[Tuple[str, str, str], int]] = field(default_factory=list)
+
+    def error(self, line: int, message: str) -> None:
+        self.findings.append(Finding(line, "error", message))
+
+    def warning(self, line: int, message: str) -> None:
+        self.findings.append(Finding(line, "warning", message))
+
+
+@dataclass
+class _Binding:
+    """One `returning id into` assignment; reassigned variables get a new one."""
+    table: str
+    line: int
+    label: str
+    holes: Dict[int, int] = field(default_factory=dict)  # holeNumber -> line
+
+
+def _type_error(column: Column, value) -> Optional[str]:
+    if column.type in ("integer", "serial"):
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    elif column.type == "numeric":
+        ok = isinstance(value, (int, float))
+    elif column.type == "text":
+        ok = isinstance(value, str)
+    elif column.type == "uuid":
+        ok = isinstance(value, str) and UUID_PATTERN.match(value) is not None
+    else:  # boolean
+        ok = isinstance(value, SqlVariable) and value.name.lower() in BOOLEAN_LITERALS
+    return None if ok else f"expected {column.type}, got {value!r}"
+
+
+def validate_sql(sql_text: str, path: str = "<sql>") -> FileReport:
+    report = FileReport(path)
+
+    if sql_text.count("$$") % 2:
+        report.error(1, "unbalanced $$ quoting; the do block is not closed")
+
+    declared = {name.lower() for name in DECLARE_PATTERN.findall(sql_text)}
+    uses_do_block = "do $$" in sql_text.lower()
+
+    bindings: Dict[str, _Binding] = {}
+    active_tees: Dict[Tuple[int, str, str], int] = {}  # (course binding, name, gender) -> line
+    tees: List[_Binding] = []
+
+    try:
+        statements = list(iter_insert_statements(sql_text))
+    except ValueError as e:
+        match = re.match(r'line (\d+): (.*)', str(e))
+        report.error(int(match.group(1)) if match else 1, match.group(2) if match else str(e))
+        return report
+
+    for stmt in statements:
+        table_name = COURSE_TABLE if stmt.table.lower() == COURSE_TABLE else \
+            TEE_TABLE if stmt.table.lower() == TEE_TABLE.lower() else HOLE_TABLE
+        table = SCHEMA[table_name]
+        line = stmt.line
+
+        if len(stmt.columns) != len(stmt.values):
+            report.error(line, f"{len(stmt.columns)} columns but {len(stmt.values)} values")
+            continue
+        if len(set(stmt.columns)) != len(stmt.columns):
+            report.error(line, "a column is listed more than once")
+
+        row = stmt.as_dict()
+        refs: Dict[str, _Binding] = {}
+
+        for name, value in row.items():
+            column = table.columns.get(name)
+            if column is None:
+                report.error(line, f"{stmt.table} has no column \"{name}\"")
+                continue
+
+            if value is None:
+                if not column.nullable:
+                    report.error(line, f"\"{name}\" is not null")
+                continue
+
+            if column.references and isinstance(value, SqlVariable):
+                binding = bindings.get(value.name.lower())
+                if binding is None:
+                    report.error(line, f"\"{name}\" uses {value.name}, which no earlier insert returned into")
+                elif binding.table != column.references:
+                    report.error(line, f"\"{name}\" uses {value.name}, which holds a {binding.table} id")
+                else:
+                    refs[name] = binding
+                continue
+
+            problem = _type_error(column, value)
+            if problem:
+                report.error(line, f"\"{name}\": {problem}")
+            elif column.allowed and value not in column.allowed:
+                report.error(line, f"\"{name}\" is '{value}', expected one of {', '.join(column.allowed)}")
+
+            low_high = APP_RANGES.get(table_name, {}).get(name)
+            if low_high and isinstance(value, (int, float)) and not low_high[0] <= value <= low_high[1]:
+                report.warning(line, f"\"{name}\" is {value}, the app allows {low_high[0]}-{low_high[1]}")
+
+        for name, column in table.columns.items():
+            if name not in row and not column.nullable and not column.has_default:
+                report.error(line, f"missing \"{name}\", which is not null and has no default")
+
+        # Unique keys
+        if table_name == COURSE_TABLE:
+            if all(isinstance(row.get(k), str) for k in ("name", "country", "city")):
+                report.course_keys.append(((row["name"], row["country"], row["city"]), line))
+            elif "country" not in row or "city" not in row:
+                report.warning(line, "country/city fall back to the column defaults (Scotland, St. Andrews)")
+        elif table_name == TEE_TABLE and "courseId" in refs:
+            active = row.get("approvalStatus", "pending") == "approved" and \
+                not (isinstance(row.get("isArchived"), SqlVariable) and row["isArchived"].name.lower() == "true")
+            key = (id(refs["courseId"]), row.get("name"), row.get("gender"))
+            if active and key in active_tees:
+                report.error(line, f"duplicate active tee '{row.get('name')}' ({row.get('gender')}), "
+                                   f"first inserted at line {active_tees[key]} (teeInfo_active_unique)")
+            elif active:
+                active_tees[key] = line
+        elif table_name == HOLE_TABLE and "teeId" in refs:
+            tee = refs["teeId"]
+            number = row.get("holeNumber")
+            if number in tee.holes:
+                report.error(line, f"hole {number} already inserted for tee {tee.label} at line "
+                                   f"{tee.holes[number]} (hole_teeId_holeNumber_key)")
+            elif isinstance(number, int):
+                tee.holes[number] = line
+
+        if stmt.returning_into:
+            variable = stmt.returning_into.lower()
+            if uses_do_block and variable not in declared:
+                report.error(line, f"returning into {stmt.returning_into}, which is not declared")
+            binding = _Binding(table_name, line, f"'{row.get('name')}' ({row.get('gender', '')})".replace(" ()", ""))
+            bindings[variable] = binding
+            if table_name == TEE_TABLE:
+                tees.append(binding)
+
+    for tee in tees:
+        if sorted(tee.holes) not in [list(range(1, n + 1)) for n in HOLES_PER_TEE]:
+            report.warning(tee.line, f"tee {tee.label} has {len(tee.holes)} holes, expected holes 1-9 or 1-18")
+
+    return report
+
+
+def validate_file(path: str) -> FileReport:
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        report = FileReport(path)
+        report.error(1, str(e))
+        return report
+    return validate_sql(text, path)
+
+
+def duplicate_course_findings(reports: List[FileReport]) -> None:
+    """The seed concatenates every file, so course keys must be unique across them."""
+    first_seen: Dict[Tuple[str, str, str], Tuple[str, int]] = {}
+    for report in reports:
+        for key, line in report.course_keys:
+            if key in first_seen:
+                other_path, other_line = first_seen[key]
+                report.error(line, f"course '{key[0]}' ({key[2]}, {key[1]}) is also inserted at "
+                                   f"{other_path}:{other_line} (course_name_country_city_key)")
+            else:
+                first_seen[key] = (report.path, line)
+
+
+def validate_paths(paths: List[str], jobs: int = 0) -> List[FileReport]:
+    if jobs == 1 or len(paths) < 2:
+        reports = [validate_file(path) for path in paths]
+    else:
+        # Imported here: multiprocessing costs every single-process run ~20 ms of startup
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+            reports = list(pool.map(validate_file, paths, chunksize=max(1, len(paths) // (4 * (os.cpu_count() or 1)))))
+    duplicate_course_findings(reports)
+    return reports
+
+
+def collect_paths(targets: List[str]) -> List[str]:
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(iter_course_files(target))
+        else:
+            paths.append(target)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate course seed SQL without a database")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_SQL_DIR],
+                        help="Course SQL files or directories (default: scripts/sql)")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-warnings", action="store_true")
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.paths)
+    for path in paths:
+        if not os.path.isfile(path):
+            print(f"Error: {path} not found")
+            sys.exit(1)
+
+    reports = validate_paths(paths, args.jobs)
+
+    errors = warnings = 0
+    for report in reports:
+        for finding in sorted(report.findings, key=lambda f: f.line):
+            if finding.severity == "warning":
+                warnings += 1
+                if args.no_warnings:
+                    continue
+            else:
+                errors += 1
+            print(f"{report.path}:{finding.line}: {finding.severity}: {finding.message}")
+
+    print(f"Checked {len(paths)} course files, {errors} error(s), {warnings} warning(s)")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
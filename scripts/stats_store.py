@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Shared plumbing of the batch statistics jobs over the app's round table.
+
+player_stats.py and course_difficulty.py keep one partial vector per key (a
+player, a tee) in a sqlite store next to a fingerprint of every source round
+they folded in. Everything except the kernel and the rendering is the same
+for both and lives here:
+
+  schema probe     table_columns() for optional columns of a source export
+  source batches   fill_wanted() loads round ids into temp.wanted for joins,
+                   as_columns() turns fetched rows into columns
+  store            open_store() with a temp.affected key table, and
+                   set_affected()/delete_affected()/partial_states() over it
+  refresh plan     plan_refresh() compares source fingerprints with the
+                   store's: keys with an edited, deleted or moved round are
+                   recomputed, new rounds of other keys are only added in;
+                   refresh_batches() applies a plan through the job's
+                   load_batch/apply_batch
+  CLI              show_row() prints one stored JSON row; standin_path()
+                   picks where a --synthetic stand-in database goes
+
+playing_conditions.py and nine_hole_differentials.py use the schema probe and
+the stand-in helper.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+# Round id -> (key the round belongs to, fingerprint of what the job reads from it)
+Fingerprints = Dict[int, Tuple[Hashable, int]]
+
+
+# ---------------------------------------------------------------------------
+# Source data
+# ---------------------------------------------------------------------------
+
+def table_columns(db: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in db.execute(f'pragma table_info("{table}")')}
+
+
+def fill_wanted(source: sqlite3.Connection, round_ids: Iterable[int]) -> None:
+    """Replace temp.wanted with the given round ids, for joins against round and score."""
+    source.execute("create temp table if not exists wanted (id integer primary key)")
+    source.execute("delete from temp.wanted")
+    source.executemany("insert into temp.wanted (id) values (?)", ((round_id,) for round_id in round_ids))
+
+
+def as_columns(rows: Sequence[tuple], width: int) -> List[tuple]:
+    """Fetched rows as `width` columns (empty ones when there are no rows)."""
+    return list(zip(*rows)) if rows else [()] * width
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+def open_store(path: str, schema: str, key: str) -> sqlite3.Connection:
+    """Open (creating) a store; `key` declares temp.affected's column, e.g. "player_id text"."""
+    store = sqlite3.connect(path, isolation_level=None)
+    store.execute("pragma journal_mode = wal")
+    store.executescript(schema)
+    store.execute(f"create temp table if not exists affected ({key} primary key)")
+    return store
+
+
+def set_affected(store: sqlite3.Connection, keys: Iterable) -> None:
+    store.execute("delete from temp.affected")
+    store.executemany("insert or ignore into temp.affected values (?)", ((key,) for key in keys))
+
+
+def delete_affected(store: sqlite3.Connection, tables: Sequence[str], key_column: str) -> None:
+    """Delete the rows of the keys in temp.affected from every table."""
+    for table in tables:
+        store.execute(f"delete from {table} where {key_column} in (select {key_column} from temp.affected)")
+
+
+def partial_states(store: sqlite3.Connection, table: str, key_column: str) -> Dict[Hashable, bytes]:
+    """Stored partial vectors of the keys in temp.affected."""
+    return dict(store.execute(
+        f"select {key_column}, state from {table} where {key_column} in (select {key_column} from temp.affected)"))
+
+
+def stored_fingerprints(store: sqlite3.Connection, table: str, key_column: str) -> Fingerprints:
+    return {round_id: (key, fingerprint) for round_id, key, fingerprint in store.execute(
+        f"select round_id, {key_column}, fingerprint from {table}")}
+
+
+# ---------------------------------------------------------------------------
+# Refresh
+# ---------------------------------------------------------------------------
+
+@dataclass
+class RefreshPlan:
+    recompute: Set[Hashable]  # Keys rebuilt from all their rounds
+    recompute_rounds: List[int]  # Every source round of those keys
+    appended: List[int]  # New rounds of the other keys, added into their vectors
+    new_rounds: int
+
+
+def plan_refresh(fingerprints: Fingerprints, stored: Fingerprints) -> RefreshPlan:
+    """What a refresh has to do to bring the stored rounds in line with the source's."""
+    recompute = set()
+    for round_id, (key, fingerprint) in stored.items():
+        current = fingerprints.get(round_id)
+        if current is None or current[1] != fingerprint or current[0] != key:
+            recompute.add(key)
+        if current is not None and current[0] != key:
+            # A round moved to another key changes both keys
+            recompute.add(current[0])
+    new_rounds = [round_id for round_id in fingerprints if round_id not in stored]
+    return RefreshPlan(
+        recompute=recompute,
+        recompute_rounds=sorted(round_id for round_id, (key, _) in fingerprints.items() if key in recompute),
+        appended=sorted(round_id for round_id in new_rounds if fingerprints[round_id][0] not in recompute),
+        new_rounds=len(new_rounds),
+    )
+
+
+def refresh_batches(store: sqlite3.Connection, source: sqlite3.Connection, plan: RefreshPlan,
+                    tables: Sequence[str], key_column: str, load_batch: Callable, apply_batch: Callable,
+                    batch_keys: Callable) -> Set[Hashable]:
+    """
+    Apply a plan inside the caller's transaction: the recomputed keys' rows
+    are deleted from `tables` and rebuilt (keys that lost every round keep
+    none), then the appended rounds are added in. apply_batch(batch,
+    replace) folds one batch into the store and batch_keys(batch) lists its
+    keys. Returns the keys that only gained rounds.
+    """
+    if plan.recompute:
+        set_affected(store, plan.recompute)
+        delete_affected(store, tables, key_column)
+        if plan.recompute_rounds:
+            apply_batch(load_batch(source, plan.recompute_rounds), True)
+    if not plan.appended:
+        return set()
+    batch = load_batch(source, plan.appended)
+    apply_batch(batch, False)
+    return set(batch_keys(batch))
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def show_row(store: sqlite3.Connection, table: str, key_column: str, value, missing: str) -> None:
+    """Print one stored (computed_at, stats) row as JSON, or exit with `missing`."""
+    row = store.execute(f"select computed_at, stats from {table} where {key_column} = ?", (value,)).fetchone()
+    if row is None:
+        print(f"Error: {missing}")
+        sys.exit(1)
+    print(json.dumps({"computedAt": row[0], **json.loads(row[1])}, indent=2, ensure_ascii=False))
+
+
+def standin_path(path: Optional[str], prefix: str) -> Tuple[str, bool]:
+    """
+    Where a --synthetic stand-in database goes: `path` (which must not
+    exist yet), or a new temporary file. Returns (path, whether the caller
+    removes it when done).
+    """
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".sqlite", prefix=prefix)
+        os.close(fd)
+        return path, True
+    if os.path.exists(path):
+        print(f"Error: {path} already exists")
+        sys.exit(1)
+    return path, False